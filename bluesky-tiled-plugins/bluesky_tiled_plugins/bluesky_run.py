@@ -3,6 +3,7 @@ import keyword
 import warnings
 from datetime import datetime
 
+import numpy
 from tiled.client.container import Container
 from tiled.client.utils import handle_error
 
@@ -20,6 +21,41 @@ _document_types = {
 }
 
 
+def _to_document(item):
+    name, doc = item["name"], item["doc"]
+    if name == "event_page":
+        # Filled data arrives as nested lists. Make it an array again.
+        for key, filled in doc.get("filled", {}).items():
+            if filled and all(filled):
+                doc["data"][key] = numpy.asarray(doc["data"][key])
+    return (name, _document_types[name](doc))
+
+
+def _stream_documents(http_client, link, params):
+    "Request (name, doc) pairs as newline-delimited JSON and yield them."
+    with http_client.stream(
+        "GET",
+        link,
+        params=params,
+        headers={"Accept": "application/json-seq"},
+    ) as response:
+        if response.is_error:
+            response.read()
+            handle_error(response)
+        tail = ""
+        for chunk in response.iter_bytes():
+            for line in chunk.decode().splitlines(keepends=True):
+                if line[-1] == "\n":
+                    item = json.loads(tail + line)
+                    yield _to_document(item)
+                    tail = ""
+                else:
+                    tail += line
+        if tail:
+            item = json.loads(tail)
+            yield _to_document(item)
+
+
 class BlueskyRun(Container):
     """
     This encapsulates the data and metadata for one Bluesky 'run'.
@@ -63,7 +99,51 @@ class BlueskyRun(Container):
     def v2(self):
         return self
 
-    def documents(self, fill=False):
+    def documents(
+        self,
+        fill=False,
+        *,
+        stream_name=None,
+        min_seq_num=None,
+        max_seq_num=None,
+        since=None,
+        until=None,
+        after=None,
+        fields=None,
+    ):
+        """
+        Yield ``(name, document)`` items from the run.
+
+        Parameters
+        ----------
+        fill : bool, optional
+            Whether to fill externally-stored data on the server.
+        stream_name : str or List[str], optional
+            Only include the streams with these names.
+        min_seq_num, max_seq_num : int, optional
+            Only include Events with ``min_seq_num <= seq_num < max_seq_num``.
+        since, until : float, optional
+            Only include Events with ``since <= time < until``.
+        after : str, optional
+            A token from :meth:`resume_token`. Resume the stream after the
+            document it was made from.
+        fields : List[str], optional
+            Only include these keys in the ``data``, ``timestamps``, and
+            ``filled`` of Events. The server does not read the others.
+
+        Examples
+        --------
+        Resume an interrupted download.
+
+        >>> token = None
+        >>> try:
+        ...     for name, doc in run.documents():
+        ...         token = run.resume_token(name, doc) or token
+        ...         ...
+        ... except httpx.TransportError:
+        ...     for name, doc in run.documents(after=token):
+        ...         ...
+        """
         # For back-compat with v2:
         if fill == "yes":
             fill = True
@@ -73,28 +153,73 @@ class BlueskyRun(Container):
             raise NotImplementedError("fill='delayed' is not supported")
         else:
             fill = bool(fill)
+        if isinstance(stream_name, str):
+            stream_name = [stream_name]
+        if isinstance(fields, str):
+            fields = [fields]
+        elif fields is not None:
+            fields = list(fields)
+        params = {"fill": fill}
+        for key, value in [
+            ("stream_name", stream_name),
+            ("min_seq_num", min_seq_num),
+            ("max_seq_num", max_seq_num),
+            ("since", since),
+            ("until", until),
+            ("after", after),
+            ("fields", fields),
+        ]:
+            if value is not None:
+                params[key] = value
         link = self.item["links"]["self"].replace("/metadata", "/documents", 1)
-        with self.context.http_client.stream(
-            "GET",
-            link,
-            params={"fill": fill},
-            headers={"Accept": "application/json-seq"},
-        ) as response:
-            if response.is_error:
-                response.read()
-                handle_error(response)
-            tail = ""
-            for chunk in response.iter_bytes():
-                for line in chunk.decode().splitlines(keepends=True):
-                    if line[-1] == "\n":
-                        item = json.loads(tail + line)
-                        yield (item["name"], _document_types[item["name"]](item["doc"]))
-                        tail = ""
-                    else:
-                        tail += line
-            if tail:
-                item = json.loads(tail)
-                yield (item["name"], _document_types[item["name"]](item["doc"]))
+        yield from _stream_documents(self.context.http_client, link, params)
+
+    def resources(self):
+        """
+        List the Resource documents of the run, without streaming its Events.
+        """
+        return [Resource(item["resource"]) for item in self._get_resources(files=False)]
+
+    def resource_files(self):
+        """
+        Map the uid of each Resource of the run to the list of its files.
+
+        The paths are as seen by the server.
+        """
+        return {
+            resource["uid"]: files for resource, files in self.resources_and_files()
+        }
+
+    def resources_and_files(self):
+        """
+        List (Resource, files) pairs for the run, in one request.
+
+        The paths are as seen by the server.
+        """
+        return [
+            (Resource(item["resource"]), item["files"])
+            for item in self._get_resources(files=True)
+        ]
+
+    def _get_resources(self, files):
+        link = self.item["links"]["self"].replace("/metadata", "/resources", 1)
+        response = self.context.http_client.get(link, params={"files": files})
+        handle_error(response)
+        return response.json()["resources"]
+
+    @staticmethod
+    def resume_token(name, doc):
+        """
+        Make a token for resuming :meth:`documents` after this document.
+
+        Resource and Datum documents do not mark a position in the stream, so
+        for those this returns None; keep the most recent token instead.
+        """
+        if name in ("start", "descriptor", "event", "stop"):
+            return f"{doc['time']!r}:{doc['uid']}"
+        if name == "event_page":
+            return f"{doc['time'][-1]!r}:{doc['uid'][-1]}"
+        return None
 
     def __getattr__(self, key):
         """
@@ -1,12 +1,14 @@
 import collections.abc
 import numbers
 import operator
+from urllib.parse import parse_qs, urlparse
 
 from tiled.adapters.utils import IndexCallable
 from tiled.client.container import Container
 from tiled.client.utils import handle_error
 from tiled.utils import safe_json_dump
 
+from .bluesky_run import _stream_documents
 from .queries import PartialUID, RawMongo, ScanID
 
 
@@ -138,9 +140,156 @@ class CatalogOfBlueskyRuns(Container):
             self._v1 = Broker(self)
         return self._v1
 
+    def documents(self, fill=False):
+        """
+        Yield ``(name, document)`` items from every run in this catalog.
+
+        The runs are streamed in one request, in this catalog's sorting. Each
+        run's documents are contiguous and in order, beginning with its Run
+        Start document.
+
+        Parameters
+        ----------
+        fill : bool, optional
+            Whether to fill externally-stored data on the server.
+
+        Examples
+        --------
+        >>> for name, doc in catalog.search(Key("plan_name") == "scan").documents():
+        ...     ...
+        """
+        params = {**self._queries_as_params, **self._sorting_params, "fill": bool(fill)}
+        link = self.item["links"]["self"].replace("/metadata", "/documents_search", 1)
+        yield from _stream_documents(self.context.http_client, link, params)
+
+    def start_documents(self):
+        """
+        Yield the RunStart document of each run in this catalog.
+
+        Only the RunStart documents are transferred, a page of runs at a
+        time, in this catalog's sorting.
+        """
+        next_page_url = f"{self.item['links']['search']}?page[offset]=0"
+        while next_page_url is not None:
+            params = {
+                **parse_qs(urlparse(next_page_url).query),
+                **self._queries_as_params,
+                **self._sorting_params,
+                # Do not transfer the RunStop documents, structures, etc.
+                "fields": "metadata",
+                "select_metadata": "start",
+            }
+            content = handle_error(
+                self.context.http_client.get(next_page_url.split("?")[0], params=params)
+            ).json()
+            for item in content["data"]:
+                yield item["attributes"]["metadata"]["selected"]
+            next_page_url = content["links"]["next"]
+
+    def clear_fill_cache(self):
+        """
+        Empty the server's caches of handlers, Resources, and Datums.
+
+        Runs filled on the server share open handlers and fetched Datums until
+        the caches are cleared or their entries are evicted. The caches serve
+        every user of the server, so this requires the write:data scope.
+        """
+        link = self.item["links"]["self"].replace("/metadata", "/fill_cache", 1)
+        handle_error(self.context.http_client.delete(link))
+
     def post_document(self, name, doc):
         link = self.item["links"]["self"].replace("/metadata", "/documents", 1)
         response = self.context.http_client.post(
             link, content=safe_json_dump({"name": name, "doc": doc})
         )
         handle_error(response)
+
+    def post_documents(self, documents):
+        """
+        Insert many ``(name, document)`` pairs in one request.
+
+        Unlike :meth:`post_document`, a document that is rejected does not
+        prevent the others from being inserted.
+
+        Parameters
+        ----------
+        documents : iterable of (name, doc) pairs
+
+        Returns
+        -------
+        errors : list
+            One dict per rejected document, with its ``index`` in
+            ``documents``, its ``name``, and the ``detail`` of the error.
+        """
+        content = b"".join(
+            safe_json_dump({"name": name, "doc": doc}) + b"\n"
+            for name, doc in documents
+        )
+        if not content:
+            return []
+        link = self.item["links"]["self"].replace("/metadata", "/documents_batch", 1)
+        response = self.context.http_client.post(
+            link, content=content, headers={"Content-Type": "application/json-seq"}
+        )
+        handle_error(response)
+        return response.json()["errors"]
+
+    def document_buffer(self, size=1000):
+        """
+        Return a callback that buffers documents and posts them in batches.
+
+        The buffer is flushed when it holds ``size`` documents, when a Run Stop
+        document arrives, and on exiting a ``with`` block.
+
+        Parameters
+        ----------
+        size : int, optional
+            The maximum number of documents to hold before flushing.
+
+        Examples
+        --------
+        >>> with catalog.document_buffer() as buffer:
+        ...     RE.subscribe(buffer)
+        ...     RE(count([det]))
+        >>> buffer.errors
+        []
+        """
+        return DocumentBuffer(self.post_documents, size)
+
+
+class DocumentBuffer:
+    """
+    Buffer (name, doc) pairs and pass them to post_documents in batches.
+
+    Errors reported for rejected documents accumulate in ``errors``, each
+    with the rejected document under ``doc``.
+    """
+
+    def __init__(self, post_documents, size):
+        if size < 1:
+            raise ValueError(f"size must be a positive integer, not {size!r}")
+        self._post_documents = post_documents
+        self._size = size
+        self._buffer = []
+        self.errors = []
+
+    def __call__(self, name, doc):
+        self._buffer.append((name, doc))
+        if name == "stop" or len(self._buffer) >= self._size:
+            self.flush()
+
+    def flush(self):
+        "Post any buffered documents, returning the errors from this batch."
+        buffer, self._buffer = self._buffer, []
+        errors = self._post_documents(buffer)
+        for error in errors:
+            # The index is only meaningful within this batch.
+            error["doc"] = buffer[error.pop("index")][1]
+        self.errors.extend(errors)
+        return errors
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
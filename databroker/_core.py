@@ -1921,8 +1921,7 @@ class BrokerES(object):
 
         for k in fill_keys:
             reg = registry_map[k]
-            # TODO someday we will have bulk retrieve on assets.Registry
-            table[k] = [reg.retrieve(value) for value in table[k]]
+            table[k] = reg.retrieve_many(table[k])
 
         return table
 
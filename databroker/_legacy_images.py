@@ -1,3 +1,6 @@
+import bisect
+import collections
+
 from pims import FramesSequence, Frame
 
 
@@ -40,3 +43,77 @@ class Images(FramesSequence):
     def get_frame(self, i):
         img = self._data_array[i]
         return Frame(img.data, frame_no=i)
+
+
+class ChunkedImages(FramesSequence):
+    def __init__(self, arrays, cache_size=4):
+        """
+        Load images from a detector, one chunk at a time, across runs.
+
+        Each frame is located by a precomputed index of the arrays' chunks
+        along their first dimension, and only the chunk holding it is
+        fetched. The most recently used chunks are cached.
+
+        Parameters
+        ----------
+        arrays : list of tiled ArrayClient
+            one column of image data per run
+        cache_size : int, optional
+            number of chunks to keep in memory
+        """
+        self._arrays = list(arrays)
+        frame_shapes = {tuple(array.shape[1:]) for array in self._arrays}
+        if len(frame_shapes) > 1:
+            raise ValueError(
+                f"The runs' images do not have the same shape: {frame_shapes}"
+            )
+        self._shape = frame_shapes.pop() if frame_shapes else ()
+        self._dtype = self._arrays[0].dtype if self._arrays else None
+        # For each chunk, (array index, start row, stop row), and separately
+        # the global frame number of its first row, for bisection.
+        self._chunks = []
+        self._chunk_starts = []
+        total = 0
+        for array_index, array in enumerate(self._arrays):
+            start = 0
+            for size in array.chunks[0]:
+                if size:
+                    self._chunks.append((array_index, start, start + size))
+                    self._chunk_starts.append(total)
+                    start += size
+                    total += size
+        self._len = total
+        self._cache = collections.OrderedDict()
+        self._cache_size = cache_size
+
+    @property
+    def pixel_type(self):
+        return self._dtype
+
+    @property
+    def frame_shape(self):
+        return self._shape
+
+    def __len__(self):
+        return self._len
+
+    def get_frame(self, i):
+        if not 0 <= i < self._len:
+            raise IndexError(f"Frame {i} is out of range for {self._len} frames.")
+        chunk_index = bisect.bisect_right(self._chunk_starts, i) - 1
+        chunk = self._get_chunk(chunk_index)
+        img = chunk[i - self._chunk_starts[chunk_index]]
+        return Frame(img, frame_no=i)
+
+    def _get_chunk(self, chunk_index):
+        try:
+            self._cache.move_to_end(chunk_index)
+            return self._cache[chunk_index]
+        except KeyError:
+            pass
+        array_index, start, stop = self._chunks[chunk_index]
+        chunk = self._arrays[array_index][start:stop]
+        self._cache[chunk_index] = chunk
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return chunk
@@ -2,7 +2,9 @@ from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
 import six
+import concurrent.futures
 from contextlib import contextmanager
+import hashlib
 import logging
 import os.path
 import shutil
@@ -14,11 +16,82 @@ from ..utils import ensure_path_exists
 from pkg_resources import resource_filename
 import json
 from .utils import _ChainMap
-from .handlers_base import DuplicateHandler
+from .handlers_base import DuplicateHandler, HandlerCache
 
 
 logger = logging.getLogger(__name__)
 
+# Bytes read at a time when copying a file with verification.
+_COPY_CHUNK_SIZE = 4 * 2**20
+
+
+def _file_digest(path, algorithm):
+    h = hashlib.new(algorithm)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_COPY_CHUNK_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _transfer_file(fin, fout, algorithm=None, resume=False):
+    """
+    Copy a file and its metadata. Return False if the copy was skipped.
+
+    If ``algorithm`` names a hashlib hash, the source is hashed as it is
+    copied. The copy is then read back and checked against that digest; the
+    read-back is deliberate, as it is the only way to catch a bad write.
+
+    If ``resume``, a destination that already has the same size (and, with
+    ``algorithm``, the same digest as the source) is kept without writing
+    anything. Checking a destination reads both files once; only if they
+    differ is the source copied, reading it again.
+    """
+    if (resume and os.path.isfile(fout) and
+            os.path.getsize(fout) == os.path.getsize(fin)):
+        if (algorithm is None or
+                _file_digest(fin, algorithm) == _file_digest(fout, algorithm)):
+            return False
+    ensure_path_exists(os.path.dirname(fout))
+    # Copy to a temporary name, so that an interrupted copy is never mistaken
+    # for a complete one.
+    partial = fout + '.part'
+    if algorithm is None:
+        shutil.copy2(fin, partial)
+    else:
+        h = hashlib.new(algorithm)
+        with open(fin, 'rb') as src, open(partial, 'wb') as dst:
+            for chunk in iter(lambda: src.read(_COPY_CHUNK_SIZE), b''):
+                h.update(chunk)
+                dst.write(chunk)
+        shutil.copystat(fin, partial)
+        if _file_digest(partial, algorithm) != h.hexdigest():
+            os.unlink(partial)
+            raise RuntimeError('The {} checksum of the copy of {} to {} does '
+                               'not match'.format(algorithm, fin, fout))
+    os.replace(partial, fout)
+    return True
+
+
+def _transfer_files(file_pairs, max_workers, algorithm, resume,
+                    file_rename_hook):
+    "Copy (old, new) pairs of files using up to max_workers threads."
+    total = len(file_pairs)
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        futures = {executor.submit(_transfer_file, fin, fout, algorithm,
+                                   resume): (fin, fout)
+                   for fin, fout in file_pairs}
+        try:
+            for n, future in enumerate(
+                    concurrent.futures.as_completed(futures)):
+                future.result()
+                fin, fout = futures[future]
+                file_rename_hook(n, total, fin, fout)
+        except BaseException:
+            # Do not start any more copies.
+            for future in futures:
+                future.cancel()
+            raise
+
 
 class BaseRegistryRO(object):
     """This is the base-class for asset registries.
@@ -148,8 +221,8 @@ class BaseRegistryRO(object):
                 raise RuntimeError('did not find resource {!r}'.format(k))
             return ret
 
-        self._datum_cache = boltons.cacheutils.LRU(max_size=1000000)
-        self._handler_cache = boltons.cacheutils.LRU()
+        self._datum_cache = core.DatumCache()
+        self._handler_cache = HandlerCache()
         self._resource_cache = boltons.cacheutils.LRU(on_miss=_r_on_miss)
 
         # copy the class level known spec to an instance attribute
@@ -174,8 +247,28 @@ class BaseRegistryRO(object):
     # Users typically should not need anything outside of these methods
     def retrieve(self, datum_id):
         return self._api.retrieve(self._datum_col, datum_id,
-                                  self._datum_cache, self.get_spec_handler,
-                                  logger)
+                                  self._datum_cache,
+                                  self.checkout_spec_handler, logger)
+
+    def retrieve_many(self, datum_ids):
+        """
+        Retrieve the data referenced by many Datums.
+
+        Handlers that implement ``get_many`` read all the requested Datums
+        of a Resource in one call.
+
+        Parameters
+        ----------
+        datum_ids : iterable of str
+
+        Returns
+        -------
+        values : list
+            The data for each Datum, in order
+        """
+        return self._api.retrieve_many(self._datum_col, list(datum_ids),
+                                       self._datum_cache,
+                                       self.checkout_spec_handler, logger)
 
     def get_datum(self, datum_id):
         warnings.warn('get_datum is deprecated, use retrieve instead',
@@ -223,8 +316,10 @@ class BaseRegistryRO(object):
         Given a document from the registry_template FS collection return
         the proper Handler
 
-        This should get memozied or shoved into a class eventually
-        to minimize open/close thrashing.
+        Handlers are kept in a `HandlerCache`, so that each Resource's
+        handler is constructed once and reused until it is evicted. A handler
+        returned here may be closed once it is evicted; use
+        `checkout_spec_handler` to hold on to it while reading.
 
         Parameters
         ----------
@@ -239,29 +334,47 @@ class BaseRegistryRO(object):
             document returns the externally stored data
 
         """
-        resource = self._resource_cache[resource]
+        key, factory = self._spec_handler_factory(resource)
+        ret = self._handler_cache.get(key)
+        if ret is not None:
+            return ret
+        return self._handler_cache.setdefault(key, factory())
+
+    def checkout_spec_handler(self, resource):
+        """
+        Lend the Handler of a resource for the duration of a with block.
 
-        h_cache = self._handler_cache
+        The handler is not closed while it is checked out, and it is lent to
+        one thread at a time.
+
+        Parameters
+        ----------
+        resource : ObjectId
+            ObjectId of a resource document
+
+        Returns
+        -------
+        context manager
+            Yielding the handler
+        """
+        key, factory = self._spec_handler_factory(resource)
+        return self._handler_cache.checkout(key, factory)
+
+    def _spec_handler_factory(self, resource):
+        resource = self._resource_cache[resource]
 
         spec = resource['spec']
         handler = self.handler_reg[spec]
 
         key = (str(resource['uid']), handler.__name__)
 
-        try:
-            return h_cache[key]
-        except KeyError:
-            pass
-
         kwargs = resource['resource_kwargs']
         rpath = resource['resource_path']
         root = resource.get('root', '')
         root = self.root_map.get(root, root)
         if root:
             rpath = os.path.join(root, rpath)
-        ret = handler(rpath, **kwargs)
-        h_cache[key] = ret
-        return ret
+        return key, lambda: handler(rpath, **kwargs)
 
     def get_file_list(self, resource_or_uid, datum_kwarg_gen):
         """Given a resource or resource uid and an iterable of datum kwargs,
@@ -325,7 +438,8 @@ class BaseRegistryRO(object):
     # ## File-related API
     # This may move to a mix-in class or something
     def copy_files(self, resource_or_uid, new_root,
-                   verify=False, file_rename_hook=None):
+                   verify=False, file_rename_hook=None, max_workers=1,
+                   resume=False):
         """
         Copy files associated with a resource to a new directory.
 
@@ -353,9 +467,10 @@ class BaseRegistryRO(object):
         new_root : str
             The new 'root' to copy the files into
 
-        verify : bool, optional (False)
-            Verify that the move happened correctly.  This currently
-            is not implemented and will raise if ``verify == True``.
+        verify : bool or str, optional (False)
+            Check each copy against a checksum of its original, computed
+            while the original is read for copying.  If a string, the name
+            of the hashlib algorithm to use; True means 'sha256'.
 
         file_rename_hook : callable, optional
             If provided, must be a callable with signature ::
@@ -363,9 +478,17 @@ class BaseRegistryRO(object):
                def hook(file_counter, total_number, old_name, new_name):
                    pass
 
-            This will be run in the inner loop of the file copy step and is
+            This will be run after each file is copied (or skipped,
+            with ``resume``), in the order the copies finish, and is
             run inside of an unconditional try/except block.
 
+        max_workers : int, optional (1)
+            The number of files to copy at a time
+
+        resume : bool, optional (False)
+            Skip the files already at the new location with the same size
+            as the original and, if ``verify``, the same checksum.
+
         See Also
         --------
         `RegistryMoving.shift_root`
@@ -374,8 +497,9 @@ class BaseRegistryRO(object):
         if self.version == 0:
             raise NotImplementedError('V0 has no notion of root so can not '
                                       'change it')
-        if verify:
-            raise NotImplementedError('Verification is not implemented yet')
+        if verify is True:
+            verify = 'sha256'
+        algorithm = verify or None
 
         def rename_hook_wrapper(hook):
             if hook is None:
@@ -418,13 +542,9 @@ class BaseRegistryRO(object):
         new_file_list = [os.path.join(new_root,
                                       os.path.relpath(f, old_root))
                          for f in file_list]
-        N = len(new_file_list)
         # copy the files to the new location
-        for n, (fin, fout) in enumerate(zip(file_list, new_file_list)):
-            # copy files
-            file_rename_hook(n, N, fin, fout)
-            ensure_path_exists(os.path.dirname(fout))
-            shutil.copy2(fin, fout)
+        _transfer_files(list(zip(file_list, new_file_list)), max_workers,
+                        algorithm, resume, file_rename_hook)
 
         return zip(file_list, new_file_list)
 
@@ -785,7 +905,8 @@ class RegistryTemplate(BaseRegistryRO):
 class RegistryMovingTemplate(RegistryTemplate):
     '''Registry object that knows how to move files.'''
     def move_files(self, resource_or_uid, new_root, remove_origin=True,
-                   verify=False, file_rename_hook=None):
+                   verify=False, file_rename_hook=None, max_workers=1,
+                   resume=False):
         '''Change the root directory of a given resource
 
         The registered handler must have a `get_file_list` method and the
@@ -813,9 +934,9 @@ class RegistryMovingTemplate(RegistryTemplate):
         remove_origin : bool, optional (True)
             If the source files should be removed
 
-        verify : bool, optional (False)
-            Verify that the move happened correctly.  This currently
-            is not implemented and will raise if ``verify == True``.
+        verify : bool or str, optional (False)
+            Check each copy against a checksum of its original before
+            anything is removed.  See `copy_files`.
 
         file_rename_hook : callable, optional
             If provided, must be a callable with signature ::
@@ -823,9 +944,17 @@ class RegistryMovingTemplate(RegistryTemplate):
                def hook(file_counter, total_number, old_name, new_name):
                    pass
 
-            This will be run in the inner loop of the file copy step and is
+            This will be run after each file is copied (or skipped,
+            with ``resume``), in the order the copies finish, and is
             run inside of an unconditional try/except block.
 
+        max_workers : int, optional (1)
+            The number of files to copy at a time
+
+        resume : bool, optional (False)
+            Skip the files already copied by an earlier, interrupted move.
+            See `copy_files`.
+
         See Also
         --------
         `Registry.shift_root`
@@ -842,12 +971,15 @@ class RegistryMovingTemplate(RegistryTemplate):
 
         try:
             file_lists = self.copy_files(resource, new_root, verify,
-                                         file_rename_hook)
+                                         file_rename_hook,
+                                         max_workers=max_workers,
+                                         resume=resume)
         except:
             # TODO clean up partially copied files if this fails
             raise
         try:
-            updates = self.correct_root(resource, new_root, verify)
+            # The copies were verified above, if at all.
+            updates = self.correct_root(resource, new_root)
         except:
             # TODO clean up copied files if this fails
             raise
@@ -1,6 +1,7 @@
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
+import boltons.cacheutils
 import six
 import h5py
 import os
@@ -13,6 +14,7 @@ except ImportError:
 import itertools
 import numpy as np
 import hashlib
+from collections import OrderedDict
 
 # from .base_registry import BaseRegistry
 from .base_registry import (BaseRegistryRO,
@@ -23,10 +25,15 @@ from .sqlite import (ResourceCollection,
                      RegistryDatabase)
 from .core import (resource_given_uid, insert_resource,
                    update_resource, get_resource_history,
-                   doc_or_uid_to_uid, get_file_list)
+                   doc_or_uid_to_uid, get_file_list, call_handlers)
+from .handlers import HDF5FilePool
 from ..headersource.hdf5 import append
 from ..utils import ensure_path_exists as makedirs
 
+# Number of datum files kept open between reads.
+DATUM_FILE_POOL_SIZE = int(os.getenv("DATABROKER_DATUM_FILE_POOL_SIZE", "16"))
+_DATUM_FILE_POOL = HDF5FilePool(max_files=DATUM_FILE_POOL_SIZE)
+
 
 class DatumNotFound(Exception):
     pass
@@ -87,37 +94,117 @@ def bulk_register_datum_table(datum_col,
     return ['{}/{}'.format(resource_uid, d) for d in d_ids]
 
 
-def retrieve(col, datum_id, datum_cache, get_spec_handler, logger):
+class _DatumTable(object):
+    "The datum kwargs of one Resource, as numpy columns indexed by datum id."
+    def __init__(self, columns):
+        columns = dict(columns)
+        datum_ids = columns.pop('datum_id')
+        # Datum ids are appended in increasing order, but sort them in case
+        # the file was written otherwise, as rows() relies on the order.
+        if np.any(datum_ids[1:] < datum_ids[:-1]):
+            order = np.argsort(datum_ids, kind='stable')
+            datum_ids = datum_ids[order]
+            columns = {k: v[order] for k, v in columns.items()}
+        self.datum_ids = datum_ids
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.datum_ids)
+
+    def rows(self, d_ids):
+        "Return the row of each datum id, or None if any of them are missing."
+        d_ids = np.asarray(d_ids, dtype=self.datum_ids.dtype)
+        if not len(self.datum_ids):
+            return None
+        rows = np.searchsorted(self.datum_ids, d_ids)
+        rows = np.minimum(rows, len(self.datum_ids) - 1)
+        if not np.array_equal(self.datum_ids[rows], d_ids):
+            return None
+        return rows
+
+    def kwargs(self, rows):
+        "Return the datum kwargs of each row."
+        if not self.columns:
+            return [{} for _ in rows]
+        keys = list(self.columns)
+        values = zip(*(self.columns[k][rows] for k in keys))
+        return [dict(zip(keys, v)) for v in values]
+
+
+def _split_datum_id(datum_id):
     if '/' not in datum_id:
-        raise DatumNotFound
-    r_uid, _, d_uid = datum_id.partition('/')
-    d_uid = int(d_uid)
-    handler = get_spec_handler(r_uid)
-    try:
-        df = datum_cache[r_uid]
-    except:
-        path, fname = make_file_name(col, r_uid)
-        with h5py.File(os.path.join(path, fname), 'r') as fin:
-            df = pd.DataFrame({k: fin[k][:] for k in fin})
-            df = df.set_index('datum_id')
-        datum_cache[r_uid] = df
+        raise DatumNotFound(datum_id)
+    r_uid, _, d_id = datum_id.partition('/')
+    return r_uid, int(d_id)
+
+
+def _datum_file(col, r_uid):
+    path, fname = make_file_name(col, r_uid)
+    return os.path.join(path, fname)
 
-    return handler(**dict(df.loc[d_uid]))
+
+def _get_datum_table(col, r_uid, d_ids, datum_cache):
+    """
+    Return the table of a Resource and the rows of the given datum ids.
+
+    The cached table is reread if it lacks any of them, as datums may have
+    been appended to the file since it was read.
+    """
+    filename = _datum_file(col, r_uid)
+    try:
+        table = datum_cache[r_uid]
+    except KeyError:
+        pass
+    else:
+        rows = table.rows(d_ids)
+        if rows is not None:
+            return table, rows
+        _DATUM_FILE_POOL.discard(filename)
+    with _DATUM_FILE_POOL.open(filename) as fin:
+        table = _DatumTable({k: fin[k][:] for k in fin})
+    datum_cache[r_uid] = table
+    rows = table.rows(d_ids)
+    if rows is None:
+        raise DatumNotFound("Resource {} does not have all of the datums {}"
+                            "".format(r_uid, list(d_ids)))
+    return table, rows
+
+
+def retrieve(col, datum_id, datum_cache, checkout_handler, logger):
+    r_uid, d_id = _split_datum_id(datum_id)
+    table, rows = _get_datum_table(col, r_uid, [d_id], datum_cache)
+    datum_kwargs, = table.kwargs(rows)
+    with checkout_handler(r_uid) as handler:
+        return handler(**datum_kwargs)
+
+
+def retrieve_many(col, datum_ids, datum_cache, checkout_handler, logger):
+    # Look up the datums of each Resource in one go.
+    positions_by_resource = OrderedDict()
+    for i, datum_id in enumerate(datum_ids):
+        r_uid, d_id = _split_datum_id(datum_id)
+        positions_by_resource.setdefault(r_uid, []).append((i, d_id))
+    resources_and_kwargs = [None] * len(datum_ids)
+    for r_uid, positions in positions_by_resource.items():
+        indices, d_ids = zip(*positions)
+        table, rows = _get_datum_table(col, r_uid, d_ids, datum_cache)
+        for i, datum_kwargs in zip(indices, table.kwargs(rows)):
+            resources_and_kwargs[i] = (r_uid, datum_kwargs)
+    return call_handlers(resources_and_kwargs, checkout_handler)
 
 
 def get_datum_by_res_gen(datum_col, resource_uid):
-    path, fname = make_file_name(datum_col, resource_uid)
-    fpath = Path(path) / Path(fname)
-    if not fpath.is_file():
+    filename = _datum_file(datum_col, resource_uid)
+    if not os.path.isfile(filename):
         return
-    with h5py.File(str(fpath), 'r') as fin:
-        df = pd.DataFrame({k: fin[k][:] for k in fin})
-        df = df.set_index('datum_id')
+    with _DATUM_FILE_POOL.open(filename) as fin:
+        table = _DatumTable({k: fin[k][:] for k in fin})
 
-    for i, r in df.iterrows():
-        yield {'datum_id': i,
+    rows = np.arange(len(table))
+    for d_id, datum_kwargs in zip(table.datum_ids, table.kwargs(rows)):
+        yield {'datum_id': d_id,
                'resource': resource_uid,
-               'datum_kwargs': dict(r)}
+               'datum_kwargs': datum_kwargs}
 
 
 def resource_given_datum_id(col, datum_id, datum_cache, logger):
@@ -164,8 +251,9 @@ def insert_datum(datum_col, resource, datum_id, datum_kwargs,
     # compatible with both the new model and the old model. Thus, we need to
     # ignore the second attempt to insert.
     if p.is_file():
-        # Append to an existing file.
-        with h5py.File(str(p), 'a') as fout:
+        # Append to an existing file, once no one has it open to read.
+        with _DATUM_FILE_POOL.writing(_datum_file(datum_col, resource)), \
+                h5py.File(str(p), 'a') as fout:
             last = fout['datum_id'][-1]
             cur_max = fout['datum_id'][-1]
             d_id = cur_max + 1  # the integer in datum_id
@@ -193,6 +281,7 @@ api = SimpleNamespace(
     bulk_register_datum_table=bulk_register_datum_table,
     resource_given_uid=resource_given_uid,
     retrieve=retrieve,
+    retrieve_many=retrieve_many,
     update_resource=update_resource,
     DatumNotFound=DatumNotFound,
     get_resource_history=get_resource_history,
@@ -212,9 +301,8 @@ class RegistryRO(BaseRegistryRO):
     def __init__(self, config):
         super(RegistryRO, self).__init__(config)
         makedirs(self.config['dbpath'], exist_ok=True)
-        # we are going to be caching dataframes so be
-        # smaller!
-        self._datum_cache.max_size = 100
+        # Cache a _DatumTable per Resource, rather than Datums.
+        self._datum_cache = boltons.cacheutils.LRU(max_size=100)
         self.__resource_col = None
         self.__db = None
         self.__resource_update_col = None
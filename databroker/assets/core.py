@@ -2,13 +2,21 @@ from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
 import six
+from collections import OrderedDict
 from jsonschema import validate as js_validate
+import numpy as np
+import os
+import sys
+import threading
 import warnings
 import uuid
 import time as ttime
 import pandas as pd
 from ..utils import sanitize_np, apply_to_dict_recursively
 
+# Default bound on the size of a Registry's cache of Datums (256 MiB).
+DATUM_CACHE_BYTES = int(os.getenv("DATABROKER_DATUM_CACHE_BYTES", "268435456"))
+
 
 class DatumNotFound(Exception):
     """
@@ -56,36 +64,211 @@ def doc_or_uid_to_uid(doc_or_uid):
     return doc_or_uid
 
 
+# Marks the rows of a column whose Datum does not have that datum_kwarg.
+_MISSING = object()
+
+
+def _compact_column(values):
+    """
+    Store the values of one datum_kwarg as an array if they are all plain
+    numbers of one type, and otherwise as a list sharing equal values.
+    """
+    types = set(type(v) for v in values)
+    if len(types) == 1 and types <= {bool, int, float}:
+        array = np.array(values)
+        # Integers too large for int64 make an object array.
+        if array.dtype.kind in 'biuf':
+            return array
+    shared = {}
+    column = []
+    for v in values:
+        try:
+            v = shared.setdefault(v, v)
+        except TypeError:
+            # unhashable, such as a list
+            pass
+        column.append(v)
+    return column
+
+
+class _ResourceDatums(object):
+    "The Datums of one Resource, as a datum_id -> row mapping and columns."
+    def __init__(self, resource, datums):
+        self.resource = resource
+        self.rows = {}
+        kwargs_list = []
+        for datum in datums:
+            self.rows[datum['datum_id']] = len(kwargs_list)
+            kwargs_list.append(datum['datum_kwargs'])
+        keys = []
+        for kwargs in kwargs_list:
+            keys.extend(k for k in kwargs if k not in keys)
+        self.columns = {
+            k: _compact_column([kwargs.get(k, _MISSING)
+                                for kwargs in kwargs_list])
+            for k in keys}
+        # An estimate, counting the datum ids once more for the Registry-wide
+        # index of datum_id -> Resource.
+        self.nbytes = (2 * sys.getsizeof(self.rows) +
+                       sum(sys.getsizeof(d) for d in self.rows))
+        for column in self.columns.values():
+            if isinstance(column, np.ndarray):
+                self.nbytes += column.nbytes
+            else:
+                distinct = {id(v): v for v in column}
+                self.nbytes += sys.getsizeof(column) + sum(
+                    sys.getsizeof(v) for v in distinct.values())
+
+    def datum(self, datum_id):
+        row = self.rows[datum_id]
+        kwargs = {}
+        for k, column in self.columns.items():
+            value = column[row]
+            if isinstance(column, np.ndarray):
+                kwargs[k] = value.item()
+            elif value is not _MISSING:
+                kwargs[k] = value
+        return {'datum_id': datum_id, 'resource': self.resource,
+                'datum_kwargs': kwargs}
+
+
+class DatumCache(object):
+    """
+    A cache of Datum documents, grouped by Resource.
+
+    The Datums of each Resource are stored together, as a mapping of datum_id
+    to row and a column per datum_kwarg. Columns of plain numbers are numpy
+    arrays. The Resources least recently used are evicted whole to keep the
+    estimated size under ``max_bytes``.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Bound on the estimated size of the cache
+    """
+    def __init__(self, max_bytes=DATUM_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        # Map Resource uid to _ResourceDatums, least recently used first.
+        self._resources = OrderedDict()
+        # Map datum_id to Resource uid.
+        self._index = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, datum_id):
+        return datum_id in self._index
+
+    def get(self, datum_id):
+        "Return a Datum document, or None if it is not cached."
+        with self._lock:
+            resource = self._index.get(datum_id)
+            if resource is None:
+                return None
+            self._resources.move_to_end(resource)
+            return self._resources[resource].datum(datum_id)
+
+    def put(self, resource, datums):
+        """
+        Cache all the Datums of a Resource, replacing any cached before.
+
+        Returns the estimated size of the Resource's Datums.
+        """
+        entry = _ResourceDatums(resource, datums)
+        with self._lock:
+            self._discard(resource)
+            self._resources[resource] = entry
+            self._index.update(dict.fromkeys(entry.rows, resource))
+            self.nbytes += entry.nbytes
+            # Keep the newest entry, even if it alone is too large.
+            while self.nbytes > self.max_bytes and len(self._resources) > 1:
+                self._discard(next(iter(self._resources)))
+        return entry.nbytes
+
+    def _discard(self, resource):
+        entry = self._resources.pop(resource, None)
+        if entry is None:
+            return
+        for datum_id in entry.rows:
+            if self._index.get(datum_id) == resource:
+                del self._index[datum_id]
+        self.nbytes -= entry.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._resources.clear()
+            self._index.clear()
+            self.nbytes = 0
+
+
 def _get_datum_from_datum_id(col, datum_id, datum_cache, logger):
-    try:
-        datum = datum_cache[datum_id]
-    except KeyError:
+    datum = datum_cache.get(datum_id)
+    if datum is None:
         # find the current document
         edoc = col.find_one({'datum_id': datum_id})
         if edoc is None:
             raise DatumNotFound(datum_id=datum_id)
-        # save it for later
         datum = dict(edoc)
 
+        # save all the datums of its resource for later
         res = edoc['resource']
-        count = 0
-        for dd in col.find({'resource': res}):
-            count += 1
-            d_id = dd['datum_id']
-            if d_id not in datum_cache:
-                datum_cache[d_id] = dict(dd)
-        if count > datum_cache.max_size:
-            logger.warn("More datum in a resource than your "
-                        "datum cache can hold.")
+        nbytes = datum_cache.put(res, col.find({'resource': res}))
+        if nbytes > datum_cache.max_bytes:
+            logger.warning("The datums of resource %s are larger than your "
+                           "datum cache can hold.", res)
 
     datum.pop('_id', None)
     return datum
 
 
-def retrieve(col, datum_id, datum_cache, get_spec_handler, logger):
+def retrieve(col, datum_id, datum_cache, checkout_handler, logger):
     datum = _get_datum_from_datum_id(col, datum_id, datum_cache, logger)
-    handler = get_spec_handler(datum['resource'])
-    return handler(**datum['datum_kwargs'])
+    with checkout_handler(datum['resource']) as handler:
+        return handler(**datum['datum_kwargs'])
+
+
+def retrieve_many(col, datum_ids, datum_cache, checkout_handler, logger):
+    datums = [_get_datum_from_datum_id(col, datum_id, datum_cache, logger)
+              for datum_id in datum_ids]
+    return call_handlers([(datum['resource'], datum['datum_kwargs'])
+                          for datum in datums],
+                         checkout_handler)
+
+
+def call_handlers(resources_and_kwargs, checkout_handler):
+    """
+    Call the handlers for many datums, batching those of each Resource.
+
+    Parameters
+    ----------
+    resources_and_kwargs : list
+        (resource uid, datum_kwargs) pairs
+    checkout_handler : callable
+        Given a resource uid, return a context manager lending its handler
+
+    Returns
+    -------
+    values : list
+        The data for each pair, in order. Handlers that implement
+        ``get_many`` are called once per Resource.
+    """
+    values = [None] * len(resources_and_kwargs)
+    indices_by_resource = {}
+    for i, (resource, _) in enumerate(resources_and_kwargs):
+        indices_by_resource.setdefault(resource, []).append(i)
+    for resource, indices in indices_by_resource.items():
+        kwargs_list = [resources_and_kwargs[i][1] for i in indices]
+        with checkout_handler(resource) as handler:
+            get_many = getattr(handler, 'get_many', None)
+            if get_many is None:
+                results = [handler(**kwargs) for kwargs in kwargs_list]
+            else:
+                results = get_many(kwargs_list)
+        for i, result in zip(indices, results):
+            values[i] = result
+    return values
 
 
 def resource_given_datum_id(col, datum_id, datum_cache, logger):
@@ -1,8 +1,15 @@
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
+import boltons.cacheutils
+import collections
+import concurrent.futures
+import contextlib
 import logging
 import numpy as np
+import os
 import os.path
+import threading
+import time
 
 from .handlers_base import HandlerBase
 from .readers.spe import PrincetonSPEFile
@@ -10,6 +17,269 @@ from pims import FramesSequence, Frame
 
 logger = logging.getLogger(__name__)
 
+# Bounds of the pool of HDF5 files shared by all the handlers in the process.
+HDF5_POOL_SIZE = int(os.getenv("DATABROKER_HDF5_POOL_SIZE", "128"))
+HDF5_IDLE_TIMEOUT = float(os.getenv("DATABROKER_HDF5_IDLE_TIMEOUT", "300"))
+# Default number of threads decoding the files of one datum (1 is serial).
+DECODE_WORKERS = int(os.getenv("DATABROKER_DECODE_WORKERS", "1"))
+# Default bound on the bytes of Xspress3 spectra read at a time to sum ROIs.
+XS3_ROI_CHUNK_BYTES = int(os.getenv("DATABROKER_XS3_ROI_CHUNK_BYTES", "67108864"))
+
+
+class HDF5FilePool(object):
+    """
+    A least-recently-used pool of open HDF5 files, shared by handlers.
+
+    Files are opened on first use and kept open for the next one. When there
+    are more than ``max_files`` open, or a file has not been used for
+    ``idle_timeout`` seconds, it is closed, to be reopened transparently if it
+    is needed again. Files in use are never closed. To modify a file, close
+    it with :meth:`writing`, which waits for its users. Files are opened and
+    closed outside of the pool's lock, so a slow file system only holds up
+    the users of that file.
+
+    Parameters
+    ----------
+    max_files : int, optional
+        Maximum number of files kept open while not in use
+    idle_timeout : float, optional
+        Seconds after which an unused file is closed
+    """
+    def __init__(self, max_files=HDF5_POOL_SIZE, idle_timeout=HDF5_IDLE_TIMEOUT):
+        self.max_files = max_files
+        self.idle_timeout = idle_timeout
+        # Map (filename, swmr) to [Future of h5py.File, number of users,
+        # time last used]
+        self._files = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        # Names of the files being written, which are not to be opened
+        self._writing = set()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @contextlib.contextmanager
+    def open(self, filename, swmr=False):
+        "Check out the open h5py.File for the duration of a with block."
+        import h5py
+        key = (filename, swmr)
+        with self._lock:
+            self._released.wait_for(lambda: filename not in self._writing)
+            to_close = self._close_idle()
+            entry = self._files.get(key)
+            opener = entry is None
+            if opener:
+                # Reserve the entry, so that other users wait for this open.
+                self.misses += 1
+                entry = [concurrent.futures.Future(), 0, None]
+                self._files[key] = entry
+            else:
+                self.hits += 1
+                self._files.move_to_end(key)
+            entry[1] += 1
+            to_close.extend(self._evict())
+        try:
+            if opener:
+                try:
+                    entry[0].set_result(h5py.File(filename, 'r', swmr=swmr))
+                except BaseException as ex:
+                    with self._lock:
+                        if self._files.get(key) is entry:
+                            del self._files[key]
+                    entry[0].set_exception(ex)
+            _close_files(to_close)
+            yield entry[0].result()
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                entry[2] = time.monotonic()
+                if not entry[1]:
+                    self._released.notify_all()
+
+    @contextlib.contextmanager
+    def writing(self, filename):
+        """
+        Close a file and keep it from being opened during a with block.
+
+        This waits for the file's current users to finish, so that it can be
+        modified without a read handle open on it.
+        """
+        with self._lock:
+            self._released.wait_for(lambda: filename not in self._writing)
+            self._writing.add(filename)
+            try:
+                keys = [key for key in self._files if key[0] == filename]
+                self._released.wait_for(
+                    lambda: not any(self._files[key][1] for key in keys
+                                    if key in self._files))
+                to_close = [self._pop(key) for key in keys
+                            if key in self._files]
+            except BaseException:
+                self._writing.discard(filename)
+                self._released.notify_all()
+                raise
+        try:
+            _close_files(to_close)
+            yield
+        finally:
+            with self._lock:
+                self._writing.discard(filename)
+                self._released.notify_all()
+
+    def _close_idle(self):
+        "Remove the idle files, returning them to be closed."
+        if self.idle_timeout is None:
+            return []
+        deadline = time.monotonic() - self.idle_timeout
+        return [self._pop(key)
+                for key, (future, users, last_used) in list(self._files.items())
+                if users == 0 and last_used < deadline]
+
+    def _evict(self):
+        "Remove the excess files, returning them to be closed."
+        excess = len(self._files) - self.max_files
+        to_close = []
+        # Oldest first, skipping the files in use
+        for key, (future, users, last_used) in list(self._files.items()):
+            if excess <= 0:
+                break
+            if users == 0:
+                to_close.append(self._pop(key))
+                self.evictions += 1
+                excess -= 1
+        return to_close
+
+    def _pop(self, key):
+        # A file with no users has been opened, by its first user.
+        future, _, _ = self._files.pop(key)
+        return future.result()
+
+    def discard(self, filename):
+        "Close a file unless it is in use, so that it is reopened next time."
+        with self._lock:
+            to_close = [self._pop(key) for key in list(self._files)
+                        if key[0] == filename and self._files[key][1] == 0]
+        _close_files(to_close)
+
+    def close_idle(self):
+        "Close the files that have been unused for longer than idle_timeout."
+        with self._lock:
+            to_close = self._close_idle()
+        _close_files(to_close)
+
+    def clear(self):
+        "Close all the files that are not in use."
+        with self._lock:
+            to_close = [self._pop(key)
+                        for key, (future, users, last_used)
+                        in list(self._files.items()) if users == 0]
+        _close_files(to_close)
+
+    def stats(self):
+        "Return counts of open files, hits, misses, and evictions."
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'open_files': len(self._files),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / requests if requests else None,
+            }
+
+
+def _close_files(files):
+    for file in files:
+        try:
+            file.close()
+        except Exception as ex:
+            logger.warning('Failed to close file', exc_info=ex)
+
+
+HDF5_FILE_POOL = HDF5FilePool()
+
+
+class _PooledFile(object):
+    "Stands in for an open h5py.File, checking it out of HDF5_FILE_POOL."
+    def __init__(self, filename, swmr=False):
+        self.filename = filename
+        self.swmr = swmr
+        # Fail now, rather than on first read, if the file cannot be opened.
+        with self.checkout():
+            pass
+
+    def checkout(self):
+        return HDF5_FILE_POOL.open(self.filename, swmr=self.swmr)
+
+    def __getitem__(self, key):
+        return _PooledDataset(self, key)
+
+
+class _PooledDataset(object):
+    """
+    Stands in for an h5py.Dataset, reading it through HDF5_FILE_POOL.
+
+    The dataset's dtype and chunks, and its shape unless the file is being
+    written (SWMR), are read once, on first checkout.
+    """
+    def __init__(self, file, key):
+        self._file = file
+        self._key = key
+        # The (h5py.File, h5py.Dataset) last checked out
+        self._source = (None, None)
+        self._layout = None
+
+    @contextlib.contextmanager
+    def _checkout(self):
+        with self._file.checkout() as file:
+            # Look up the dataset again only if the file has been reopened.
+            source, dataset = self._source
+            if file is not source:
+                dataset = file[self._key]
+                self._source = (file, dataset)
+            if self._file.swmr:
+                dataset.id.refresh()
+            if self._layout is None:
+                self._layout = (dataset.dtype, dataset.chunks, dataset.shape)
+            yield dataset
+
+    def _describe(self, i):
+        if self._layout is None:
+            with self._checkout():
+                pass
+        return self._layout[i]
+
+    def __getitem__(self, index):
+        with self._checkout() as dataset:
+            return dataset[index]
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self[()], dtype=dtype)
+
+    def __len__(self):
+        return self.shape[0]
+
+    @property
+    def dtype(self):
+        return self._describe(0)
+
+    @property
+    def chunks(self):
+        return self._describe(1)
+
+    @property
+    def shape(self):
+        if self._file.swmr:
+            # The dataset may have grown since it was last read.
+            with self._checkout() as dataset:
+                return dataset.shape
+        return self._describe(2)
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
 
 # The ImageCube class is used for a per event representation of
 # a dataset
@@ -52,26 +322,119 @@ class IntegrityError(Exception):
     pass
 
 
+_decode_executors = {}
+_decode_executors_lock = threading.Lock()
+
+
+def _get_decode_executor(max_workers):
+    "Return a thread pool of this size, shared by all handlers."
+    with _decode_executors_lock:
+        executor = _decode_executors.get(max_workers)
+        if executor is None:
+            executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers, thread_name_prefix='databroker-decode')
+            _decode_executors[max_workers] = executor
+        return executor
+
+
+def _decode_files(fnames, decode, max_workers=1):
+    """
+    Decode one frame per file into a new array stacking them.
+
+    Parameters
+    ----------
+    fnames : list
+        Paths of the files
+    decode : callable
+        ``decode(fname, out)`` returns the frame in ``fname``, written into
+        the array ``out`` unless it is None
+    max_workers : int, optional
+        Number of threads decoding files concurrently. The codecs release
+        the GIL, so this helps when decoding is CPU-bound.
+
+    Returns
+    -------
+    frames : ndarray
+        Shaped ``(len(fnames),) + frame_shape``
+    """
+    if not fnames:
+        return np.empty((0,))
+    # The first frame determines the shape and dtype of the rest.
+    first = decode(fnames[0], None)
+    out = np.empty((len(fnames),) + first.shape, dtype=first.dtype)
+    out[0] = first
+
+    def decode_into(i):
+        decode(fnames[i], out[i])
+
+    indices = range(1, len(fnames))
+    if max_workers > 1 and len(indices) > 1:
+        executor = _get_decode_executor(max_workers)
+        # Consume the results to raise the first error, if any.
+        for _ in executor.map(decode_into, indices):
+            pass
+    else:
+        for i in indices:
+            decode_into(i)
+    return out
+
+
+def _decode_tiff(fname, out):
+    import tifffile
+    with tifffile.TiffFile(fname) as tif:
+        return tif.asarray(out=out)
+
+
+def _decode_cbf(fname, out):
+    import fabio
+    data = fabio.open(fname).data
+    if out is not None:
+        out[...] = data
+    return data
+
+
 class AreaDetectorSPEHandler(HandlerBase):
+    """
+    Handler for the 'AD_SPE' spec, one Princeton SPE file per point.
+
+    Parameters
+    ----------
+    fpath : string
+        path to the directory of the files
+    template : string
+        %-style template of the file names, given the path, the filename,
+        and the point number
+    filename : string
+        stem of the file names
+    frame_per_point : integer, optional
+        number of frames to return as one datum, default 1
+    mmap : bool, optional
+        map the frames into memory when they are read, rather than loading
+        each file whole. Default is True.
+    cache_size : integer, optional
+        number of recently read files kept, default 16
+    """
     specs = {'AD_SPE'} | HandlerBase.specs
 
     def __init__(self, fpath, template, filename,
-                 frame_per_point=1):
+                 frame_per_point=1, mmap=True, cache_size=16):
         self._path = os.path.join(fpath, '')
         self._fpp = frame_per_point
         self._template = template
         self._filename = filename
-        self._f_cache = dict()
+        self._mmap = mmap
+        self._f_cache = boltons.cacheutils.LRU(max_size=cache_size)
 
     def __call__(self, point_number):
-        if point_number not in self._f_cache:
+        try:
+            spe = self._f_cache[point_number]
+        except KeyError:
             fname = self._template % (self._path,
                                       self._filename,
                                       point_number)
-            spe_obj = PrincetonSPEFile(fname)
-            self._f_cache[point_number] = spe_obj
+            spe = PrincetonSPEFile(fname, mmap=self._mmap)
+            self._f_cache[point_number] = spe
 
-        spe = self._f_cache[point_number]
         data = spe.getData()
 
         if data.shape[0] != self._fpp:
@@ -87,13 +450,35 @@ class AreaDetectorSPEHandler(HandlerBase):
 
 
 class AreaDetectorTiffHandler(HandlerBase):
+    """
+    Handler for the 'AD_TIFF' spec used by Area Detectors.
+
+    Parameters
+    ----------
+    fpath : string
+        path to the directory of the files
+    template : string
+        %-style template of the file names, given the path, the filename,
+        and the frame number
+    filename : string
+        stem of the file names
+    frame_per_point : integer, optional
+        number of frames to return as one datum, default 1
+    decode_workers : integer, optional
+        number of threads decoding the files of a datum concurrently.
+        Default is DATABROKER_DECODE_WORKERS, or 1 (serially).
+    """
     specs = {'AD_TIFF'} | HandlerBase.specs
 
-    def __init__(self, fpath, template, filename, frame_per_point=1):
+    def __init__(self, fpath, template, filename, frame_per_point=1,
+                 decode_workers=None):
         self._path = os.path.join(fpath, '')
         self._fpp = frame_per_point
         self._template = template
         self._filename = filename
+        if decode_workers is None:
+            decode_workers = DECODE_WORKERS
+        self._decode_workers = decode_workers
 
     def _fnames_for_point(self, point_number):
         start = int(point_number * self._fpp)
@@ -102,12 +487,25 @@ class AreaDetectorTiffHandler(HandlerBase):
             yield self._template % (self._path, self._filename, j)
 
     def __call__(self, point_number):
-        import tifffile
-        ret = []
-        for fn in self._fnames_for_point(point_number):
-            with tifffile.TiffFile(fn) as tif:
-                ret.append(tif.asarray())
-        return np.array(ret).squeeze()
+        fnames = list(self._fnames_for_point(point_number))
+        return _decode_files(fnames, _decode_tiff,
+                             self._decode_workers).squeeze()
+
+    def get_many(self, datum_kwargs_list):
+        """
+        Read the frames of many points into one array.
+
+        Each frame is decoded straight into its place in the result.
+        """
+        fnames = [fn for d_kw in datum_kwargs_list
+                  for fn in self._fnames_for_point(**d_kw)]
+        if not fnames:
+            return np.empty((0,))
+        out = _decode_files(fnames, _decode_tiff, self._decode_workers)
+        # Match the squeezed shape that __call__ returns for each point.
+        point_shape = np.empty((self._fpp,) + out.shape[1:],
+                               dtype=bool).squeeze().shape
+        return out.reshape((len(datum_kwargs_list),) + point_shape)
 
     def get_file_list(self, datum_kwargs):
         ret = []
@@ -142,7 +540,12 @@ class HDF5DatasetSliceHandler(HandlerBase):
     swmr : bool, optional
         Open the hdf5 file in SWMR read mode. Only used when mode = 'r'.
         Default is False.
+
+    The file is opened through the process-wide HDF5_FILE_POOL, which may
+    close it while it is not being read and reopen it when it is needed.
     """
+    _swmr = False
+
     def __init__(self, filename, key, frame_per_point=1):
         self._fpp = frame_per_point
         self._filename = filename
@@ -157,7 +560,7 @@ class HDF5DatasetSliceHandler(HandlerBase):
 
     def __call__(self, point_number):
         # Don't read out the dataset until it is requested for the first time.
-        if not self._dataset:
+        if self._dataset is None:
             self._dataset = self._file[self._key]
 
         if point_number not in self._data_objects:
@@ -168,16 +571,17 @@ class HDF5DatasetSliceHandler(HandlerBase):
         return self._data_objects[point_number]
 
     def open(self):
-        import h5py
         if self._file:
             return
 
-        self._file = h5py.File(self._filename, 'r')
+        self._file = _PooledFile(self._filename, swmr=self._swmr)
 
     def close(self):
         super(HDF5DatasetSliceHandler, self).close()
-        self._file.close()
+        # The file itself is left to the pool, which other handlers share.
         self._file = None
+        self._dataset = None
+        self._data_objects.clear()
 
 
 class AreaDetectorHDF5Handler(HDF5DatasetSliceHandler):
@@ -202,6 +606,30 @@ class AreaDetectorHDF5Handler(HDF5DatasetSliceHandler):
             filename=filename, key=hardcoded_key,
             frame_per_point=frame_per_point)
 
+    def get_many(self, datum_kwargs_list):
+        """
+        Read the frames of many points into one array.
+
+        Runs of consecutive point numbers are read with one hyperslab each.
+        """
+        if self._dataset is None:
+            self._dataset = self._file[self._key]
+        points = np.array([d_kw['point_number'] for d_kw in datum_kwargs_list],
+                          dtype=int)
+        out = np.empty((len(points), self._fpp) + self._dataset.shape[1:],
+                       dtype=self._dataset.dtype)
+        # Split wherever the next point does not follow the previous one.
+        breaks = np.flatnonzero(np.diff(points) != 1) + 1
+        for run in np.split(np.arange(len(points)), breaks):
+            if not len(run):
+                continue
+            start = points[run[0]] * self._fpp
+            stop = (points[run[-1]] + 1) * self._fpp
+            frames = self._dataset[start:stop]
+            out[run[0]:run[-1] + 1] = frames.reshape(
+                (len(run), self._fpp) + frames.shape[1:])
+        return out
+
 
 class AreaDetectorHDF5SWMRHandler(AreaDetectorHDF5Handler):
     """
@@ -218,21 +646,8 @@ class AreaDetectorHDF5SWMRHandler(AreaDetectorHDF5Handler):
         number of frames to return as one datum, default 1
     """
     specs = {'AD_HDF5_SWMR'} | HDF5DatasetSliceHandler.specs
-
-    def open(self):
-        import h5py
-        if self._file:
-            return
-
-        self._file = h5py.File(self._filename, 'r', swmr=True)
-
-    def __call__(self, point_number):
-        if self._dataset is not None:
-            self._dataset.id.refresh()
-        rtn = super(AreaDetectorHDF5SWMRHandler, self).__call__(
-            point_number)
-
-        return rtn
+    # The dataset is refreshed on each read.
+    _swmr = True
 
 
 class AreaDetectorHDF5TimestampHandler(HandlerBase):
@@ -248,6 +663,7 @@ class AreaDetectorHDF5TimestampHandler(HandlerBase):
         number of frames to return as one datum, default 1
     """
     specs = {'AD_HDF5_TS'} | HandlerBase.specs
+    _swmr = False
 
     def __init__(self, filename, frame_per_point=1):
         self._fpp = frame_per_point
@@ -261,9 +677,9 @@ class AreaDetectorHDF5TimestampHandler(HandlerBase):
 
     def __call__(self, point_number):
         # Don't read out the dataset until it is requested for the first time.
-        if not self._dataset1:
+        if self._dataset1 is None:
             self._dataset1 = self._file[self._key[0]]
-        if not self._dataset2:
+        if self._dataset2 is None:
             self._dataset2 = self._file[self._key[1]]
         start, stop = point_number * self._fpp, (point_number + 1) * self._fpp
         rtn = self._dataset1[start:stop].squeeze()
@@ -271,15 +687,16 @@ class AreaDetectorHDF5TimestampHandler(HandlerBase):
         return rtn
 
     def open(self):
-        import h5py
         if self._file:
             return
-        self._file = h5py.File(self._filename, 'r')
+        self._file = _PooledFile(self._filename, swmr=self._swmr)
 
     def close(self):
         super(AreaDetectorHDF5TimestampHandler, self).close()
-        self._file.close()
+        # The file itself is left to the pool, which other handlers share.
         self._file = None
+        self._dataset1 = None
+        self._dataset2 = None
 
 
 class AreaDetectorHDF5SWMRTimestampHandler(AreaDetectorHDF5TimestampHandler):
@@ -296,19 +713,8 @@ class AreaDetectorHDF5SWMRTimestampHandler(AreaDetectorHDF5TimestampHandler):
         number of frames to return as one datum, default 1
     """
     specs = {'AD_HDF5_SWMR_TS'} | HandlerBase.specs
-
-    def open(self):
-        import h5py
-        if self._file:
-            return
-        self._file = h5py.File(self._filename, 'r', swmr=True)
-
-    def __call__(self, point_number):
-        if (self._dataset1 is not None) and (self._dataset2 is not None):
-            self._dataset.id.refresh()
-        rtn = super(AreaDetectorHDF5SWMRTimestampHandler, self).__call__(
-            point_number)
-        return rtn
+    # The datasets are refreshed on each read.
+    _swmr = True
 
 
 class _HdfMapsHandlerBase(HDF5DatasetSliceHandler):
@@ -330,7 +736,7 @@ class _HdfMapsHandlerBase(HDF5DatasetSliceHandler):
         self._dset_path = dset_path
         self._file = None
         self._dset = None
-        self._swmr = False
+        self._data_objects = {}
         self.open()
 
     def open(self):
@@ -342,14 +748,15 @@ class _HdfMapsHandlerBase(HDF5DatasetSliceHandler):
         super(_HdfMapsHandlerBase, self).open()
         self._dset = self._file['/'.join(['MAPS', self._dset_path])]
 
+    def close(self):
+        super(_HdfMapsHandlerBase, self).close()
+        self._dset = None
+
     def __call__(self):
 
         if not self._file:
             raise RuntimeError("File is not open")
 
-        if self._swmr:
-            self._dataset.id.refresh()
-
 
 class HDFMapsSpectrumHandler(_HdfMapsHandlerBase):
     """
@@ -444,6 +851,10 @@ class NpyFrameWise(HandlerBase):
     def __call__(self, frame_no):
         return self._data[frame_no]
 
+    def get_many(self, datum_kwargs_list):
+        frames = [d_kw['frame_no'] for d_kw in datum_kwargs_list]
+        return self._data[np.asarray(frames, dtype=int)]
+
     def get_file_list(self, datum_kwarg_gen):
         return [self._fpath]
 
@@ -482,24 +893,23 @@ class PilatusCBFHandler(HandlerBase):
     specs = {'AD_CBF'} | HandlerBase.specs
 
     def __init__(self, rpath, template, filename, frame_per_point=1,
-                 initial_number=1):
+                 initial_number=1, decode_workers=None):
         self._path = os.path.join(rpath, '')
         self._fpp = frame_per_point
         self._template = template
         self._filename = filename
         self._initial_number = initial_number
+        if decode_workers is None:
+            decode_workers = DECODE_WORKERS
+        self._decode_workers = decode_workers
 
     def __call__(self, point_number):
-        import fabio
         start, stop = (self._initial_number + point_number *
                        self._fpp, (point_number + 2) * self._fpp)
-        ret = []
-        # commented out by LY to test scan speed imperovement, 2017-01-24
-        for j in range(start, stop):
-            fn = self._template % (self._path, self._filename, j)
-            img = fabio.open(fn)
-            ret.append(img.data)
-        return np.array(ret).squeeze()
+        fnames = [self._template % (self._path, self._filename, j)
+                  for j in range(start, stop)]
+        return _decode_files(fnames, _decode_cbf,
+                             self._decode_workers).squeeze()
 
     def get_file_list(self, datum_kwargs_gen):
         file_list = []
@@ -523,6 +933,7 @@ class Xspress3HDF5Handler(HandlerBase):
     def __init__(self, filename, key=XS3_XRF_DATA_KEY):
         import h5py
         if isinstance(filename, h5py.File):
+            # Use (and, on close, close) the caller's file, not a pooled one.
             self._file = filename
             self._filename = self._file.filename
         else:
@@ -534,16 +945,16 @@ class Xspress3HDF5Handler(HandlerBase):
         self.open()
 
     def open(self):
-        import h5py
         if self._file:
             return
 
-        self._file = h5py.File(self._filename, 'r')
+        self._file = _PooledFile(self._filename)
 
     def close(self):
         super(Xspress3HDF5Handler, self).close()
         if self._file is not None:
-            self._file.close()
+            if not isinstance(self._file, _PooledFile):
+                self._file.close()
             self._file = None
         self._dataset = None
 
@@ -555,6 +966,7 @@ class Xspress3HDF5Handler(HandlerBase):
         if self._dataset is not None:
             return
 
+        # A pooled dataset is read through the pool, and not kept open.
         hdf_dataset = self._file[self._key]
         try:
             self._dataset = np.asarray(hdf_dataset)
@@ -575,21 +987,97 @@ class Xspress3HDF5Handler(HandlerBase):
         self._get_dataset()
         return self._dataset[frame, channel - 1, :].squeeze()
 
-    def get_roi(self, chan, bin_low, bin_high, frame=None, max_points=None):
+    def get_many(self, datum_kwargs_list):
         self._get_dataset()
+        frames = [d_kw.get('frame') for d_kw in datum_kwargs_list]
+        channels = [d_kw.get('channel') for d_kw in datum_kwargs_list]
+        if (not isinstance(self._dataset, np.ndarray) or
+                None in frames or None in channels):
+            # h5py does not support indexing with two lists.
+            return np.stack([self(**d_kw) for d_kw in datum_kwargs_list])
+        spectra = self._dataset[np.asarray(frames, dtype=int),
+                                np.asarray(channels, dtype=int) - 1, :]
+        # Match the squeezed shape that __call__ returns for each datum.
+        point_shape = np.empty(spectra.shape[1:], dtype=bool).squeeze().shape
+        return spectra.reshape((len(spectra),) + point_shape)
 
-        roi = np.sum(self._dataset[:, chan - 1, bin_low:bin_high], axis=1)
-        if max_points is not None:
-            roi = roi[:max_points]
-
-            if len(roi) < max_points:
-                roi = np.pad(roi, ((0, max_points - len(roi)), ), 'constant')
+    def get_roi(self, chan, bin_low, bin_high, frame=None, max_points=None):
+        roi = self.get_rois([(chan, bin_low, bin_high)],
+                            max_points=max_points)[:, 0]
 
         if frame is not None:
             roi = roi[frame, :]
 
         return roi
 
+    def get_rois(self, rois, max_points=None, chunk_bytes=None, start=None,
+                 stop=None):
+        """
+        Sum many regions of interest in one pass over the dataset.
+
+        The frames are read a chunk at a time, and only the frames, channels,
+        and bins that the ROIs cover are read.
+
+        Parameters
+        ----------
+        rois : list
+            (channel, bin_low, bin_high) triples. Channels count from 1, and
+            each ROI is the bins ``bin_low:bin_high``.
+        max_points : int, optional
+            Truncate, or pad with zeros, to this many frames.
+        chunk_bytes : int, optional
+            Bound on the bytes of data read at a time. By default,
+            ``XS3_ROI_CHUNK_BYTES``.
+        start, stop : int, optional
+            Sum only the frames ``start:stop``, clipped to those in the file.
+            Row 0 of the result is frame ``start``.
+
+        Returns
+        -------
+        sums : ndarray
+            Shape (frames, len(rois))
+        """
+        if chunk_bytes is None:
+            chunk_bytes = XS3_ROI_CHUNK_BYTES
+        # Use the data in memory if __call__ has loaded it.
+        dataset = (self._dataset if self._dataset is not None
+                   else self._file[self._key])
+        num_frames, _, num_bins = dataset.shape
+        start, stop, _ = slice(start, stop).indices(num_frames)
+        stop = max(start, stop)
+        rois = np.asarray(rois, dtype=int).reshape(-1, 3)
+        channels = rois[:, 0] - 1
+        # Clip like slicing does.
+        lows = np.clip(rois[:, 1], 0, num_bins)
+        highs = np.maximum(np.clip(rois[:, 2], 0, num_bins), lows)
+        sum_dtype = np.sum(np.zeros(1, dtype=dataset.dtype)).dtype
+        sums = np.zeros((stop - start, len(rois)), dtype=sum_dtype)
+        if len(rois) and highs.max() > lows.min():
+            c0, c1 = channels.min(), channels.max() + 1
+            b0, b1 = lows.min(), highs.max()
+            frame_bytes = (c1 - c0) * (b1 - b0) * dataset.dtype.itemsize
+            step = max(1, chunk_bytes // frame_bytes)
+            # Read whole HDF5 chunks, so that none is decompressed twice.
+            hdf_chunks = getattr(dataset, 'chunks', None)
+            if hdf_chunks and step > hdf_chunks[0]:
+                step -= step % hdf_chunks[0]
+            # Blocks end on multiples of step, so they align with chunks.
+            edges = [start, *range(start - start % step + step, stop, step),
+                     stop]
+            for f0, f1 in zip(edges[:-1], edges[1:]):
+                block = np.asarray(dataset[f0:f1, c0:c1, b0:b1])
+                for j, (c, lo, hi) in enumerate(zip(channels, lows, highs)):
+                    sums[f0 - start:f1 - start, j] = block[
+                        :, c - c0, lo - b0:hi - b0].sum(axis=1)
+        if max_points is not None:
+            sums = sums[:max_points]
+
+            if len(sums) < max_points:
+                sums = np.pad(sums, ((0, max_points - len(sums)), (0, 0)),
+                              'constant')
+
+        return sums
+
     def get_file_list(self, datum_kwarg_gen):
         return [self._filename]
 
@@ -2,16 +2,36 @@ from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
 import six
+from collections import OrderedDict
+import contextlib
 import logging
+import os
+import threading
+import time
 
 from ..utils import DuplicateHandler
 
 
+logger = logging.getLogger(__name__)
+
+# Bound on the number of handler instances a HandlerCache keeps, and the
+# seconds after which an unused one is closed (unset for no timeout).
+HANDLER_CACHE_SIZE = int(os.getenv("DATABROKER_HANDLER_CACHE_SIZE", "64"))
+HANDLER_IDLE_TIMEOUT = os.getenv("DATABROKER_HANDLER_IDLE_TIMEOUT")
+if HANDLER_IDLE_TIMEOUT is not None:
+    HANDLER_IDLE_TIMEOUT = float(HANDLER_IDLE_TIMEOUT)
+
+
 class HandlerBase(object):
     """
     Base-class for Handlers to provide the boiler plate to
     make them usable in context managers by provding stubs of
     ``__enter__``, ``__exit__`` and ``close``
+
+    Handlers may also implement ``get_many(datum_kwargs_list)``, which
+    returns one array stacking the results of calling the handler with each
+    of the datum_kwargs in turn. Callers use it, when it is present, to read
+    many Datums from the same Resource at once.
     """
     specs = set()
 
@@ -23,3 +43,235 @@ class HandlerBase(object):
 
     def close(self):
         pass
+
+
+class _CachedHandler(object):
+    "A handler in a HandlerCache, with the count of its current users."
+    def __init__(self, handler):
+        self.handler = handler
+        self.users = 0
+        self.last_used = time.monotonic()
+        # Held while the handler is checked out, so one thread uses it at a
+        # time.
+        self.lock = threading.RLock()
+        # Set once it is removed from the cache, to be closed when released.
+        self.retired = False
+
+
+class HandlerCache(object):
+    """
+    A least-recently-used cache of handler instances, shared by threads.
+
+    Handlers are keyed by the Resource they read, e.g. (resource uid, handler
+    name). Handlers are closed when they are evicted to keep at most
+    ``max_size``, when they have not been used for ``idle_timeout`` seconds,
+    and when they are deleted or the cache is cleared.
+
+    `checkout` lends a handler to one thread at a time, for the duration of
+    a with block; a handler that is checked out is never closed, and if it
+    is removed meanwhile it is closed when it is returned. Handlers fetched
+    by key, as `event_model.Filler` does, are not protected this way. The
+    number of handlers constructed and reused is counted, see `stats`.
+
+    Parameters
+    ----------
+    max_size : int, optional
+        Maximum number of handlers kept while not in use
+    idle_timeout : float, optional
+        Seconds after which an unused handler is closed
+    """
+    def __init__(self, max_size=HANDLER_CACHE_SIZE,
+                 idle_timeout=HANDLER_IDLE_TIMEOUT):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        # Map key to _CachedHandler, least recently used first.
+        self._handlers = OrderedDict()
+        self._lock = threading.RLock()
+        self.constructions = 0
+        self.reuses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._handlers)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._handlers))
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._handlers
+
+    def __getitem__(self, key):
+        with self._lock:
+            to_close = self._close_idle()
+            entry = self._handlers.get(key)
+            if entry is not None:
+                self._reuse(key, entry)
+        _close_handlers(to_close)
+        if entry is None:
+            raise KeyError(key)
+        return entry.handler
+
+    def __setitem__(self, key, handler):
+        with self._lock:
+            self.constructions += 1
+            entry = self._handlers.get(key)
+            if entry is not None and entry.handler is handler:
+                return
+            to_close = self._retire(key)
+            self._handlers[key] = _CachedHandler(handler)
+            to_close.extend(self._evict())
+        _close_handlers(to_close)
+
+    def __delitem__(self, key):
+        with self._lock:
+            if key not in self._handlers:
+                raise KeyError(key)
+            to_close = self._retire(key)
+        _close_handlers(to_close)
+
+    def __repr__(self):
+        return '<{} {}>'.format(type(self).__name__, self.stats())
+
+    def get(self, key, default=None):
+        "Return a cached handler, or ``default`` if there is none."
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def setdefault(self, key, handler):
+        """
+        Cache a newly constructed handler and return it.
+
+        If another thread has cached a handler for the same key meanwhile,
+        ``handler`` is closed and that one is returned instead.
+        """
+        return self._add(key, handler).handler
+
+    @contextlib.contextmanager
+    def checkout(self, key, factory):
+        """
+        Lend the handler for ``key`` for the duration of a with block.
+
+        If it is not cached, ``factory()`` constructs it. Other threads that
+        check out the same handler wait until it is returned.
+        """
+        with self._lock:
+            to_close = self._close_idle()
+            entry = self._handlers.get(key)
+            if entry is not None:
+                self._reuse(key, entry)
+                entry.users += 1
+        _close_handlers(to_close)
+        if entry is None:
+            # Construct it without holding up the other handlers.
+            entry = self._add(key, factory(), checkout=True)
+        try:
+            with entry.lock:
+                yield entry.handler
+        finally:
+            with self._lock:
+                entry.users -= 1
+                entry.last_used = time.monotonic()
+                release = entry.retired and not entry.users
+            if release:
+                _close_handlers([entry.handler])
+
+    def _add(self, key, handler, checkout=False):
+        with self._lock:
+            self.constructions += 1
+            entry = self._handlers.get(key)
+            if entry is None:
+                to_close = []
+                entry = self._handlers[key] = _CachedHandler(handler)
+            else:
+                to_close = [handler]
+                self._reuse(key, entry)
+            if checkout:
+                entry.users += 1
+            to_close.extend(self._evict())
+        _close_handlers(to_close)
+        return entry
+
+    def _reuse(self, key, entry):
+        self.reuses += 1
+        entry.last_used = time.monotonic()
+        self._handlers.move_to_end(key)
+
+    def _retire(self, key):
+        # Remove a handler, returning it in a list if it can be closed now.
+        entry = self._handlers.pop(key, None)
+        if entry is None:
+            return []
+        entry.retired = True
+        return [] if entry.users else [entry.handler]
+
+    def _evict(self):
+        excess = len(self._handlers) - self.max_size
+        to_close = []
+        # Oldest first, skipping the handlers in use
+        for key, entry in list(self._handlers.items()):
+            if excess <= 0:
+                break
+            if not entry.users:
+                to_close.extend(self._retire(key))
+                self.evictions += 1
+                excess -= 1
+        return to_close
+
+    def _close_idle(self):
+        if self.idle_timeout is None:
+            return []
+        deadline = time.monotonic() - self.idle_timeout
+        to_close = []
+        for key, entry in list(self._handlers.items()):
+            if not entry.users and entry.last_used < deadline:
+                to_close.extend(self._retire(key))
+                self.expirations += 1
+        return to_close
+
+    def close_idle(self):
+        "Close the handlers that have been unused for longer than idle_timeout."
+        with self._lock:
+            to_close = self._close_idle()
+        _close_handlers(to_close)
+
+    def clear(self):
+        "Close all the handlers, those in use once they are returned."
+        with self._lock:
+            to_close = []
+            for key in list(self._handlers):
+                to_close.extend(self._retire(key))
+        _close_handlers(to_close)
+
+    def stats(self):
+        "Return counts of cached handlers, constructions, reuses, and evictions."
+        with self._lock:
+            requests = self.constructions + self.reuses
+            return {
+                'handlers': len(self._handlers),
+                'in_use': sum(1 for entry in self._handlers.values()
+                              if entry.users),
+                'constructions': self.constructions,
+                'reuses': self.reuses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'reuse_rate': self.reuses / requests if requests else None,
+            }
+
+
+def _close_handlers(handlers):
+    # Called without holding the cache's lock, because closing may be slow.
+    # Handlers need not be HandlerBase subclasses, or have a close method.
+    for handler in handlers:
+        close = getattr(handler, 'close', None)
+        if close is None:
+            continue
+        try:
+            close()
+        except Exception as ex:
+            logger.warning('Failed to close handler %r', handler, exc_info=ex)
@@ -6,9 +6,9 @@ import six
 import pymongo
 from collections import deque
 from .core import (DatumNotFound, _get_datum_from_datum_id, retrieve,
-                   resource_given_datum_id, insert_datum, insert_resource,
-                   update_resource, get_datum_by_res_gen, get_file_list,
-                   bulk_register_datum_table, register_datum)
+                   retrieve_many, resource_given_datum_id, insert_datum,
+                   insert_resource, update_resource, get_datum_by_res_gen,
+                   get_file_list, bulk_register_datum_table, register_datum)
 
 
 DuplicateKeyError = pymongo.errors.DuplicateKeyError
@@ -37,19 +37,22 @@ class PrincetonSPEFile(FramesSequence):
     DATEMAX = 10
     TIMEMAX = 7
 
-    def __init__(self, fname):
+    def __init__(self, fname, mmap=False):
         """Initialize class.
 
         Parameters
         ----------
         fname : Filename of SPE file
         fid : File ID of open stream
+        mmap : If True, read only the header now, and map the frames into
+            memory (``numpy.memmap``) when they are first accessed
 
         This function initializes the class and, if either a filename or fid is
         provided opens the datafile and reads the contents"""
 
         self._array = None
         self._fname = fname
+        self._mmap = mmap
         with open(fname, "rb") as fid:
             self.readData(fid)
 
@@ -105,7 +108,7 @@ class PrincetonSPEFile(FramesSequence):
         """Return the array with zdimension n
 
         This method can be used to quickly obtain a 2-D array of the data"""
-        return self._array[n]
+        return self._getArray()[n]
 
     def __len__(self):
         return self._shape[0]
@@ -116,7 +119,7 @@ class PrincetonSPEFile(FramesSequence):
 
     @property
     def pixel_type(self):
-        return self._array.dtype
+        return numpy.dtype(self._dataType)
 
     @classmethod
     def class_exts(cls):
@@ -125,20 +128,23 @@ class PrincetonSPEFile(FramesSequence):
 
     def getData(self):
         """Return the array of data"""
-        return self._array
+        return self._getArray()
 
     def getBinnedData(self):
         """Return the binned (sum of all frames) data"""
-        return self._array.sum(0)
+        return self._getArray().sum(0)
 
     def readData(self, fid):
-        """Read all the data into the class"""
+        """Read all the data into the class
+
+        In mmap mode, only the header is read."""
         self._readHeader(fid)
         self._readSize(fid)
         self._readComments(fid)
         self._readAllROI(fid)
         self._readDate(fid)
-        self._readArray(fid)
+        if not self._mmap:
+            self._readArray(fid)
 
     def getSize(self):
         """Return a tuple of the size of the data array"""
@@ -247,3 +253,13 @@ class PrincetonSPEFile(FramesSequence):
         fid.seek(self.DATASTART)
         in_array = numpy.fromfile(fid, dtype=self._dataType, count=-1)
         self._array = in_array.reshape(self._shape)
+
+    def _getArray(self):
+        if self._array is None:
+            # Map the frames, which follow the header, without reading them.
+            # The header stores the dimensions as small numpy integers, which
+            # would overflow when multiplied.
+            self._array = numpy.memmap(self._fname, dtype=self._dataType,
+                                       mode='r', offset=self.DATASTART,
+                                       shape=tuple(int(n) for n in self._shape))
+        return self._array
@@ -109,8 +109,11 @@ def cursor(connection):
 
 
 class _CursorWrapper(object):
-    def __init__(self, work_queue):
+    def __init__(self, work_queue, lock):
         self._wq = work_queue
+        # Held from creation until close, as the writer has a single cursor.
+        self._lock = lock
+        self._open = True
         self.cursor()
 
     def __getattr__(self, key):
@@ -127,11 +130,24 @@ class _CursorWrapper(object):
             return ret.get('return', None)
         return inner
 
+    def close(self):
+        if not self._open:
+            return
+        self._open = False
+        try:
+            self.__getattr__('close')()
+        finally:
+            self._lock.release()
+
 
 class _ConnWrapper(object):
-    def __init__(self, fp):
+    def __init__(self, fp, wal=False):
         self._fp = fp
+        self._wal = wal
         self._cursor_lock = threading.RLock()
+        # Set once the schema has been checked, and the journal mode set.
+        self.ready = threading.Event()
+        self._c = None
         # Create a special thread for interacting with sqlite. This thread will
         # create all connections and do all insertions.
         self.__process_request_queue_thread = threading.Thread(
@@ -144,7 +160,12 @@ class _ConnWrapper(object):
         self.__process_request_queue_thread.start()
 
     def cursor(self):
-        self._c = _CursorWrapper(self.__request_queue)
+        self._cursor_lock.acquire()
+        try:
+            self._c = _CursorWrapper(self.__request_queue, self._cursor_lock)
+        except BaseException:
+            self._cursor_lock.release()
+            raise
         return self._c
 
     def __getattr__(self, key):
@@ -162,35 +183,18 @@ class _ConnWrapper(object):
         return inner
 
     def close(self):
-        self._c.close()
+        if self._c is not None:
+            self._c.close()
         self._c = None
 
     def __process_request_queue(self):
         conn = sqlite3.connect(self._fp, timeout=30.0)
         # Return rows as objects that support getitem.
         conn.row_factory = sqlite3.Row
-
-        with cursor(conn) as c:
-            c.execute(LIST_TABLES)
-            tables = set([row['name'] for row in c.fetchall()])
-        if tables == set():
-            with cursor(conn) as c:
-                c.execute(CREATE_RESOURCES_TABLE)
-                c.execute(CREATE_DATUMS_TABLE)
-                c.execute(CREATE_RESOURCE_UPDATES_TABLE)
-        else:
-            have_tables = False
-            for res in ['Resources_{}'.format(RESOURCE_VERSION),
-                        'Resources']:
-                EXPECTED_TABLES = [res, 'Datums', 'ResourceUpdates']
-                if tables == set(EXPECTED_TABLES):
-                    have_tables = True
-                    break
-            if not have_tables:
-                raise RuntimeError("Database exists at {} but does not "
-                                   "have expected schema. Expected "
-                                   "tables: {}; found tables: {}".format(
-                                       self._fp, EXPECTED_TABLES, tables))
+        try:
+            self.__prepare(conn)
+        finally:
+            self.ready.set()
         cur_cursor = None
         while not self.__shutdown_event.is_set():
             finished_event = None
@@ -235,16 +239,109 @@ class _ConnWrapper(object):
                     # that we are done trying to handle it
                     finished_event.set()
 
+    def __prepare(self, conn):
+        if self._wal:
+            # Let readers on other connections proceed while this one writes.
+            conn.execute('PRAGMA journal_mode=WAL;')
+        with cursor(conn) as c:
+            c.execute(LIST_TABLES)
+            tables = set([row['name'] for row in c.fetchall()])
+        if tables == set():
+            with cursor(conn) as c:
+                c.execute(CREATE_RESOURCES_TABLE)
+                c.execute(CREATE_DATUMS_TABLE)
+                c.execute(CREATE_RESOURCE_UPDATES_TABLE)
+        else:
+            have_tables = False
+            for res in ['Resources_{}'.format(RESOURCE_VERSION),
+                        'Resources']:
+                EXPECTED_TABLES = [res, 'Datums', 'ResourceUpdates']
+                if tables == set(EXPECTED_TABLES):
+                    have_tables = True
+                    break
+            if not have_tables:
+                raise RuntimeError("Database exists at {} but does not "
+                                   "have expected schema. Expected "
+                                   "tables: {}; found tables: {}".format(
+                                       self._fp, EXPECTED_TABLES, tables))
+
+
+class _ReadConnections(object):
+    """
+    Per-thread connections for reading a database in WAL mode.
+
+    Each thread reads on its own connection, so readers wait neither on each
+    other nor on the thread that does the writing. Only the parts of the
+    sqlite3.Connection interface that ``cursor`` uses are provided.
+    """
+    def __init__(self, fp, ready):
+        self._fp = fp
+        self._ready = ready
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._conns = []
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Do not read before the writer has created the tables.
+            self._ready.wait()
+            # Only this thread uses the connection, but close() may be called
+            # from any thread.
+            conn = sqlite3.connect(self._fp, timeout=30.0,
+                                   check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+            with self._lock:
+                self._conns.append(conn)
+        return conn
+
+    def cursor(self):
+        return self._connection().cursor()
+
+    def commit(self):
+        self._connection().commit()
+
+    def rollback(self):
+        self._connection().rollback()
+
+    def close(self):
+        with self._lock:
+            conns, self._conns = self._conns, []
+            self._local = threading.local()
+        for conn in conns:
+            conn.close()
+
 
 class RegistryDatabase(object):
-    def __init__(self, fp):
+    """
+    The connections to a registry database.
+
+    Parameters
+    ----------
+    fp : str
+        Path to the database file
+    wal : bool, optional
+        If True, put the database in write-ahead-log mode and read it on
+        per-thread connections (``read_conn``). Writes always go through
+        the single writer thread behind ``conn``.
+    """
+    def __init__(self, fp, wal=False):
         self._fp = fp
+        self._wal = wal
         self.reconnect()
 
     def reconnect(self):
-        self.conn = _ConnWrapper(self._fp)
+        self.conn = _ConnWrapper(self._fp, wal=self._wal)
+        if self._wal:
+            self.read_conn = _ReadConnections(self._fp, self.conn.ready)
+        else:
+            self.read_conn = self.conn
 
     def disconnect(self):
+        if self.read_conn is not self.conn:
+            self.read_conn.close()
+        self.read_conn = None
         self.conn.close()
         self.conn = None
 
@@ -255,8 +352,9 @@ def shadow_with_json(d, keys):
 
 
 class DatumCollection(object):
-    def __init__(self, conn):
+    def __init__(self, conn, read_conn=None):
         self._conn = conn
+        self._read_conn = conn if read_conn is None else read_conn
 
     def insert_one(self, datum):
         datum = shadow_with_json(datum, ['datum_kwargs'])
@@ -274,7 +372,7 @@ class DatumCollection(object):
             c.executemany(INSERT_DATUM, ([d[k] for k in keys] for d in datums))
 
     def find_one(self, query):
-        with cursor(self._conn) as c:
+        with cursor(self._read_conn) as c:
             c.execute(SELECT_DATUM_BY_UID, (query['datum_id'],))
             raw = c.fetchone()
         if raw is None:
@@ -284,7 +382,7 @@ class DatumCollection(object):
         return doc
 
     def find(self, query):
-        with cursor(self._conn) as c:
+        with cursor(self._read_conn) as c:
             c.execute(SELECT_DATUM_BY_RESOURCE, (query['resource'],))
             raw = c.fetchall()
         for row in raw:
@@ -296,8 +394,9 @@ class DatumCollection(object):
 class ResourceUpdatesCollection(object):
     _JSONIFY_KEYS = ['old', 'new', 'cmd_kwargs']
 
-    def __init__(self, conn):
+    def __init__(self, conn, read_conn=None):
         self._conn = conn
+        self._read_conn = conn if read_conn is None else read_conn
 
     def insert_one(self, log_object):
         log_object = shadow_with_json(log_object, self._JSONIFY_KEYS)
@@ -306,7 +405,7 @@ class ResourceUpdatesCollection(object):
             c.execute(INSERT_RESOURCE_UPDATE, [log_object[k] for k in keys])
 
     def find(self, query):
-        with cursor(self._conn) as c:
+        with cursor(self._read_conn) as c:
             c.execute(SELECT_RESOURCE_UPDATES, (query['resource'],))
             raw = c.fetchall()
         for row in raw:
@@ -317,8 +416,9 @@ class ResourceUpdatesCollection(object):
 
 
 class ResourceCollection(object):
-    def __init__(self, conn):
+    def __init__(self, conn, read_conn=None):
         self._conn = conn
+        self._read_conn = conn if read_conn is None else read_conn
 
     def insert_one(self, resource):
         resource = shadow_with_json(resource, ['resource_kwargs'])
@@ -363,7 +463,7 @@ class ResourceCollection(object):
         # Cycle through the resource tables if we can't find something look
         # it up in an older one.
         for select in [SELECT_RESOURCE, OLD_SELECT_RESOURCE]:
-            with cursor(self._conn) as c:
+            with cursor(self._read_conn) as c:
                 c.execute(select, (query['uid'],))
                 raw = c.fetchone()
                 if raw is not None:
@@ -378,6 +478,7 @@ class ResourceCollection(object):
 
 
 class RegistryRO(BaseRegistryRO):
+    # Set 'wal': True in the config to let threads read concurrently.
     REQ_CONFIG = ('dbpath', )
 
     def __init__(self, *args, **kwargs):
@@ -399,26 +500,29 @@ class RegistryRO(BaseRegistryRO):
     @property
     def _db(self):
         if self.__db is None:
-            self.__db = RegistryDatabase(self.config['dbpath'])
+            self.__db = RegistryDatabase(self.config['dbpath'],
+                                         wal=self.config.get('wal', False))
         return self.__db
 
     @property
     def _resource_col(self):
         if self.__resource_col is None:
-            self.__resource_col = ResourceCollection(self._db.conn)
+            self.__resource_col = ResourceCollection(self._db.conn,
+                                                     self._db.read_conn)
         return self.__resource_col
 
     @property
     def _resource_update_col(self):
         if self.__resource_update_col is None:
             self.__resource_update_col = ResourceUpdatesCollection(
-                self._db.conn)
+                self._db.conn, self._db.read_conn)
         return self.__resource_update_col
 
     @property
     def _datum_col(self):
         if self.__datum_col is None:
-            self.__datum_col = DatumCollection(self._db.conn)
+            self.__datum_col = DatumCollection(self._db.conn,
+                                               self._db.read_conn)
         return self.__datum_col
 
     @property
@@ -31,6 +31,21 @@ def sqlite_fs_factory():
     return fs, delete_dm
 
 
+def sqlite_wal_fs_factory():
+    from databroker.assets import sqlite as sqlfs
+    import tempfile
+    import shutil
+    tp = tempfile.mkdtemp()
+    fs = sqlfs.RegistryMoving({'dbpath': tp + '/registry.sqlite',
+                               'wal': True})
+
+    def delete_dm():
+        fs.disconnect()
+        shutil.rmtree(tp)
+
+    return fs, delete_dm
+
+
 def hdf5_fs_factory():
     from databroker.assets import column_hdf5 as chdf5
     import tempfile
@@ -56,8 +71,9 @@ def _use_factory(request):
 
 
 @pytest.fixture(scope='function', params=[mongo_fs_factory, sqlite_fs_factory,
+                                          sqlite_wal_fs_factory,
                                           hdf5_fs_factory],
-                ids=['mongo', 'sqlite', 'column_hdf5'])
+                ids=['mongo', 'sqlite', 'sqlite-wal', 'column_hdf5'])
 def fs(request):
     '''Provide a function level scoped Registry instance talking to
     temporary database on localhost:27017 with v1.
@@ -56,5 +56,15 @@ def test_single_datum_register(lh_registry, dd):
     _verify_datums(d_ids, dd, registry)
 
 
+def test_datum_table_unsorted_ids():
+    from databroker.assets.column_hdf5 import _DatumTable
+
+    table = _DatumTable({'datum_id': np.array([2, 0, 1]),
+                         'a': np.array([20, 0, 10])})
+    rows = table.rows([1, 2])
+    assert table.kwargs(rows) == [{'a': 10}, {'a': 20}]
+    assert table.rows([3]) is None
+
+
 def test_pkg_resources():
     from databroker.assets.base_registry import BaseRegistryRO
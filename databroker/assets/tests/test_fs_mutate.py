@@ -201,6 +201,45 @@ def test_moving(moving_files, remove):
         assert np.prod(shape) * j == np.sum(datum)
 
 
+def test_moving_concurrent_resume(moving_files):
+    fs, res, datum_ids, shape, cnt, fnames = moving_files
+    fs.register_handler('npy_series', FileMoveTestingHandler)
+    old_root = res['root']
+    new_root = os.path.join(old_root, 'archive')
+    new_fnames = [f.replace(old_root, new_root) for f in fnames]
+
+    # Copy some files ahead of time, as if by an interrupted move, and
+    # truncate one of them and corrupt another without changing its size.
+    copied = list(fs.copy_files(res, new_root))
+    assert [new for old, new in copied] == new_fnames
+    for f in new_fnames[5:]:
+        os.unlink(f)
+    with open(new_fnames[0], 'r+b') as f:
+        f.truncate(10)
+    with open(new_fnames[2], 'r+b') as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 0xff]))
+    skipped_mtime = os.path.getmtime(new_fnames[1])
+
+    progress = []
+
+    def hook(n, total, old_name, new_name):
+        progress.append((n, total, old_name, new_name))
+
+    fs.move_files(res, new_root, verify=True, file_rename_hook=hook,
+                  max_workers=4, resume=True)
+    assert sorted(n for n, *_ in progress) == list(range(cnt))
+    assert set(new for *_, new in progress) == set(new_fnames)
+    assert os.path.getmtime(new_fnames[1]) == skipped_mtime
+    for f in fnames:
+        assert not os.path.exists(f)
+    for j, d_id in enumerate(datum_ids):
+        datum = fs.retrieve(d_id)
+        assert np.prod(shape) * j == np.sum(datum)
+
+
 @pytest.mark.flaky(reruns=5, reruns_delay=2)
 def test_no_root(fs_v1, tmpdir):
     fs = fs_v1
@@ -262,3 +301,33 @@ def test_temporary_root(fs_v1):
         path = fs.retrieve(dm['datum_id'])
 
     assert path == os.path.join('baz2', 'foo')
+
+
+@pytest.mark.parametrize('algorithm', [None, 'sha256'])
+def test_transfer_file_resume_keeps_match(tmpdir, monkeypatch, algorithm):
+    from .. import base_registry
+
+    fin = str(tmpdir.join('src.bin'))
+    fout = str(tmpdir.join('dest', 'src.bin'))
+    with open(fin, 'wb') as f:
+        f.write(os.urandom(1000))
+    assert base_registry._transfer_file(fin, fout, algorithm)
+    before = os.stat(fout)
+    opened = []
+
+    def tracking_open(path, mode='r', *args, **kwargs):
+        opened.append((path, mode))
+        return open(path, mode, *args, **kwargs)
+
+    def no_copy(*args, **kwargs):
+        raise AssertionError('The file should not be copied.')
+
+    monkeypatch.setattr(base_registry, 'open', tracking_open, raising=False)
+    monkeypatch.setattr(base_registry.shutil, 'copy2', no_copy)
+    assert not base_registry._transfer_file(fin, fout, algorithm,
+                                            resume=True)
+    after = os.stat(fout)
+    assert after.st_ino == before.st_ino
+    assert after.st_mtime_ns == before.st_mtime_ns
+    assert [mode for _, mode in opened if 'r' not in mode] == []
+    assert not os.path.exists(fout + '.part')
@@ -9,6 +9,7 @@ import time
 import tifffile
 import uuid
 
+from .. import handlers
 from ..handlers import AreaDetectorHDF5Handler
 from ..handlers import AreaDetectorHDF5SWMRHandler
 from ..handlers import AreaDetectorHDF5TimestampHandler
@@ -18,6 +19,7 @@ from ..handlers import DummyAreaDetectorHandler
 from ..handlers import HDFMapsSpectrumHandler as HDFM
 from ..handlers import HDFMapsEnergyHandler as HDFE
 from ..handlers import NpyFrameWise
+from ..handlers import Xspress3HDF5Handler
 from ..path_only_handlers import (AreaDetectorTiffPathOnlyHandler,
                                   RawHandler)
 from numpy.testing import assert_array_equal
@@ -131,6 +133,14 @@ class Test_np_FW(_with_file):
                 known_data = i * np.ones((9, 8))
                 assert_array_equal(data, known_data)
 
+    def test_retrieve_many(self):
+        order = [3, 4, 0, 7]
+        with self.fs.handler_context({'npy_FRAMEWISE': NpyFrameWise}):
+            values = self.fs.retrieve_many([self.datum_ids[i] for i in order])
+        assert len(values) == len(order)
+        for i, data in zip(order, values):
+            assert_array_equal(data, i * np.ones((9, 8)))
+
 
 class Test_AD_hdf5_files(_with_file):
     # test the HDF5 product emitted by the hdf5 plugin to area detector
@@ -161,6 +171,14 @@ class Test_AD_hdf5_files(_with_file):
             known_data = i * np.ones((1, 2, 2))
             assert_array_equal(data, known_data)
 
+    def test_get_many(self):
+        points = [1, 2, 3, 0, 4, 2]
+        hand = self.handler(self.filename)
+        data = hand.get_many([dict(point_number=i) for i in points])
+        assert data.shape == (len(points), 1, 2, 2)
+        for i, frames in zip(points, data):
+            assert_array_equal(frames, np.asarray(hand(i)))
+
     def test_context_manager(self):
         # make sure context manager works
         with self.handler(self.filename) as hand:
@@ -339,6 +357,27 @@ class Test_ADTiff_files(_with_path):
                 assert np.all(fr == abs_count)
                 abs_count += 1
 
+    def test_read_parallel(self):
+        serial = AreaDetectorTiffHandler(self.filepath, self.template,
+                                         self.fname, self.fpp)
+        parallel = AreaDetectorTiffHandler(self.filepath, self.template,
+                                           self.fname, self.fpp,
+                                           decode_workers=4)
+        for j in range(self.n_frames):
+            assert_array_equal(parallel(j), serial(j))
+        datum_kwargs = [dict(point_number=j) for j in range(self.n_frames)]
+        assert_array_equal(parallel.get_many(datum_kwargs),
+                           serial.get_many(datum_kwargs))
+
+    def test_get_many(self):
+        hand = AreaDetectorTiffHandler(self.filepath, self.template,
+                                       self.fname, self.fpp)
+        points = [4, 0, 9]
+        data = hand.get_many([dict(point_number=j) for j in points])
+        assert data.shape == (len(points), self.fpp) + self.fr_shape
+        for j, frames in zip(points, data):
+            assert_array_equal(frames, hand(j))
+
     def test_filename_list(self):
         inp = sorted(self.fn_list)
         hand = AreaDetectorTiffHandler(self.filepath, self.template,
@@ -376,3 +415,160 @@ def test_raw_handler():
     h = RawHandler('path', a=1)
     result = h(b=2)
     assert result == ('path', {'a': 1}, {'b': 2})
+
+
+def test_hdf5_file_pool(tmpdir, monkeypatch):
+    pool = handlers.HDF5FilePool(max_files=2, idle_timeout=None)
+    monkeypatch.setattr(handlers, 'HDF5_FILE_POOL', pool)
+    filenames = []
+    for i in range(3):
+        filename = str(tmpdir.join('{}.h5'.format(i)))
+        with h5py.File(filename, 'w') as f:
+            f.create_dataset('/entry/data/data', data=i * np.ones((3, 2, 2)))
+        filenames.append(filename)
+    hands = [AreaDetectorHDF5Handler(filename) for filename in filenames]
+    # Only the two most recently used files are kept open.
+    assert pool.stats()['open_files'] == 2
+    assert pool.stats()['evictions'] == 1
+    for i in reversed(range(3)):
+        assert_array_equal(hands[i](1), i * np.ones((1, 2, 2)))
+    # The first file was closed, and is reopened transparently.
+    assert pool.stats()['misses'] == 4
+    assert_array_equal(hands[1](2), np.ones((1, 2, 2)))
+    stats = pool.stats()
+    assert stats['misses'] == 4
+    assert stats['hits'] > 0
+    assert stats['hit_rate'] == stats['hits'] / (stats['hits'] + 4)
+    pool.idle_timeout = 0
+    pool.close_idle()
+    assert pool.stats()['open_files'] == 0
+    assert_array_equal(hands[0](0), np.zeros((1, 2, 2)))
+
+
+def test_hdf5_file_pool_opens_outside_lock(tmpdir, monkeypatch):
+    import threading
+
+    pool = handlers.HDF5FilePool(idle_timeout=None)
+    slow, fast = str(tmpdir.join('slow.h5')), str(tmpdir.join('fast.h5'))
+    for filename in (slow, fast):
+        with h5py.File(filename, 'w') as f:
+            f.create_dataset('data', data=np.arange(4))
+    opening = threading.Event()
+    proceed = threading.Event()
+    h5py_file = h5py.File
+
+    def slow_file(filename, *args, **kwargs):
+        if filename == slow:
+            opening.set()
+            assert proceed.wait(10)
+        return h5py_file(filename, *args, **kwargs)
+
+    monkeypatch.setattr(h5py, 'File', slow_file)
+    opened = []
+
+    def read_slow():
+        with pool.open(slow) as f:
+            opened.append(f)
+
+    threads = [threading.Thread(target=read_slow) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    assert opening.wait(10)
+    # Another file is opened while the slow one is still opening.
+    with pool.open(fast) as f:
+        assert_array_equal(f['data'][:], np.arange(4))
+    proceed.set()
+    for thread in threads:
+        thread.join()
+    # The second user waited for the first one's open.
+    assert opened[0] is opened[1]
+    assert pool.stats()['misses'] == 2
+
+
+def test_hdf5_file_pool_writing(tmpdir):
+    import threading
+
+    pool = handlers.HDF5FilePool(idle_timeout=None)
+    filename = str(tmpdir.join('data.h5'))
+    with h5py.File(filename, 'w') as f:
+        f.create_dataset('data', data=np.arange(4), maxshape=(None,))
+    checked_out = threading.Event()
+    release = threading.Event()
+
+    def read():
+        with pool.open(filename):
+            checked_out.set()
+            assert release.wait(10)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    assert checked_out.wait(10)
+    writing = threading.Event()
+
+    def write():
+        with pool.writing(filename), h5py.File(filename, 'a') as f:
+            writing.set()
+            f['data'].resize((5,))
+            f['data'][4] = 4
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    # The writer waits for the reader to be done with the file.
+    assert not writing.wait(0.2)
+    release.set()
+    reader.join()
+    writer.join()
+    assert writing.is_set()
+    with pool.open(filename) as f:
+        assert_array_equal(f['data'][:], np.arange(5))
+
+
+def test_pooled_dataset_layout(tmpdir, monkeypatch):
+    pool = handlers.HDF5FilePool(idle_timeout=None)
+    monkeypatch.setattr(handlers, 'HDF5_FILE_POOL', pool)
+    filename = str(tmpdir.join('data.h5'))
+    with h5py.File(filename, 'w') as f:
+        f.create_dataset('data', data=np.ones((3, 2)), chunks=(1, 2))
+    dataset = handlers._PooledFile(filename)['data']
+    assert_array_equal(dataset[0], np.ones(2))
+    hits = pool.stats()['hits']
+    # The layout is known from the first read, without checking out the file.
+    assert dataset.shape == (3, 2)
+    assert dataset.dtype == np.float64
+    assert dataset.chunks == (1, 2)
+    assert len(dataset) == 3
+    assert pool.stats()['hits'] == hits
+
+
+def test_xspress3_rois(tmpdir):
+    filename = str(tmpdir.join('xs3.h5'))
+    data = np.arange(7 * 4 * 50, dtype=np.uint32).reshape((7, 4, 50))
+    with h5py.File(filename, 'w') as f:
+        f.create_dataset(handlers.XS3_XRF_DATA_KEY, data=data,
+                         chunks=(2, 4, 50))
+    rois = [(1, 10, 20), (3, 0, 5), (4, 45, 60), (2, 30, 30)]
+    expected = np.stack([data[:, c - 1, lo:hi].sum(axis=1)
+                         for c, lo, hi in rois], axis=1)
+    hand = Xspress3HDF5Handler(filename)
+    try:
+        # A chunk smaller than one frame still makes progress.
+        for chunk_bytes in (1, 3 * 4 * 60, None):
+            assert_array_equal(hand.get_rois(rois, chunk_bytes=chunk_bytes),
+                               expected)
+        assert_array_equal(hand.get_roi(3, 0, 5), expected[:, 1])
+        padded = hand.get_rois(rois, max_points=9)
+        assert_array_equal(padded[:7], expected)
+        assert not padded[7:].any()
+        # A range of frames, read in chunks that do not start at 0
+        for chunk_bytes in (1, 2 * 3 * 60, None):
+            assert_array_equal(
+                hand.get_rois(rois, chunk_bytes=chunk_bytes, start=3, stop=6),
+                expected[3:6])
+        # Clipped to the frames in the file, like slicing
+        assert_array_equal(hand.get_rois(rois, start=5, stop=10), expected[5:])
+        assert hand.get_rois(rois, start=8, stop=10).shape == (0, len(rois))
+        # The same, from the data __call__ loads into memory
+        hand(frame=0, channel=1)
+        assert_array_equal(hand.get_rois(rois), expected)
+    finally:
+        hand.close()
@@ -39,7 +39,9 @@ from __future__ import (absolute_import, division, print_function,
 import six
 import logging
 
+import numpy as np
 from .. import handlers as fs_read
+from ..readers.spe import PrincetonSPEFile
 import pytest
 import uuid
 
@@ -49,3 +51,51 @@ def test_npy_nofile_fail():
     path = str(uuid.uuid4())
     with pytest.raises(IOError):
         fs_read.NpyHandler(path)
+
+
+def _write_spe(fname, data):
+    "Write a minimal SPE file of uint16 frames."
+    header = np.zeros(PrincetonSPEFile.DATASTART, dtype=np.uint8)
+
+    def put(pos, value, dtype):
+        raw = np.array([value], dtype=dtype).view(np.uint8)
+        header[pos:pos + len(raw)] = raw
+
+    num_frames, ydim, xdim = data.shape
+    put(42, xdim, np.int16)
+    put(656, ydim, np.int16)
+    put(1446, num_frames, np.uint32)
+    put(108, 3, np.int16)  # uint16
+    header[20:29] = np.frombuffer(b'01Jan2020', dtype=np.uint8)
+    header[172:178] = np.frombuffer(b'120000', dtype=np.uint8)
+    with open(fname, 'wb') as f:
+        f.write(header.tobytes())
+        f.write(data.astype(np.uint16).tobytes())
+
+
+def test_spe_mmap(tmpdir):
+    data = np.arange(3 * 4 * 5).reshape(3, 4, 5)
+    fname = str(tmpdir.join('a.spe'))
+    _write_spe(fname, data)
+    eager = PrincetonSPEFile(fname)
+    lazy = PrincetonSPEFile(fname, mmap=True)
+    # Only the header has been read.
+    assert lazy._array is None
+    assert len(lazy) == 3
+    assert lazy.frame_shape == (4, 5)
+    assert lazy.pixel_type == eager.pixel_type == np.uint16
+    assert isinstance(lazy.getData(), np.memmap)
+    np.testing.assert_array_equal(lazy.getData(), eager.getData())
+    np.testing.assert_array_equal(lazy.get_frame(2), data[2])
+
+
+def test_spe_handler_cache(tmpdir):
+    template = '%s%s_%d.spe'
+    for point in range(4):
+        _write_spe(template % (str(tmpdir) + '/', 'spe', point),
+                   np.full((1, 4, 5), point))
+    hand = fs_read.AreaDetectorSPEHandler(str(tmpdir), template, 'spe',
+                                          cache_size=2)
+    for point in range(4):
+        np.testing.assert_array_equal(hand(point), np.full((4, 5), point))
+    assert len(hand._f_cache) == 2
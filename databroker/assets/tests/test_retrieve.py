@@ -37,12 +37,15 @@ from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
 import six
+from concurrent.futures import ThreadPoolExecutor
 import logging
 
 
 import numpy as np
 
 from .utils import SynHandlerMod, SynHandlerEcho
+from ..core import DatumCache
+from ..handlers_base import HandlerBase, HandlerCache
 import uuid
 import pytest
 logger = logging.getLogger(__name__)
@@ -98,3 +101,156 @@ def test_deregister(fs):
     assert test_reg[test_spec_name] is SynHandlerMod
     fs.deregister_handler(test_spec_name)
     assert test_spec_name not in test_reg
+
+
+def test_retrieve_many(fs):
+    shape = (3, 2)
+    res_a = fs.register_resource('syn-mod', '', '', {'shape': shape})
+    res_b = fs.register_resource('syn-mod', '', '', {'shape': shape})
+    datum_ids = [fs.register_datum(res, {'n': n})
+                 for res in (res_a, res_b) for n in range(1, 5)]
+    # Retrieve a datum first, so that its table is cached before more datums
+    # are added to its Resource.
+    fs.retrieve(datum_ids[0])
+    datum_ids.append(fs.register_datum(res_a, {'n': 5}))
+    expected = [np.mod(np.arange(6), n).reshape(shape)
+                for n in [1, 2, 3, 4, 1, 2, 3, 4, 5]]
+
+    order = [8, 3, 4, 0, 7, 1]
+    values = fs.retrieve_many([datum_ids[i] for i in order])
+    assert len(values) == len(order)
+    for i, value in zip(order, values):
+        np.testing.assert_array_equal(value, expected[i])
+        np.testing.assert_array_equal(fs.retrieve(datum_ids[i]), expected[i])
+
+
+def test_retrieve_threads(fs):
+    shape = (3, 2)
+    datum_ids = []
+    for _ in range(4):
+        res = fs.register_resource('syn-mod', '', '', {'shape': shape})
+        datum_ids.extend(fs.register_datum(res, {'n': n})
+                         for n in range(1, 6))
+    expected = [np.mod(np.arange(6), n).reshape(shape)
+                for n in list(range(1, 6)) * 4]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        values = list(executor.map(fs.retrieve, datum_ids))
+    for value, expected_value in zip(values, expected):
+        np.testing.assert_array_equal(value, expected_value)
+
+
+def test_datum_cache():
+    def datums(resource, num):
+        return [{'datum_id': '{}/{}'.format(resource, i),
+                 'resource': resource,
+                 'datum_kwargs': {'point_number': i, 'filename': 'a.h5'}}
+                for i in range(num)]
+
+    cache = DatumCache()
+    nbytes = cache.put('a', datums('a', 100))
+    assert len(cache) == 100
+    assert cache.nbytes == nbytes
+    assert cache.get('a/7') == datums('a', 100)[7]
+    assert type(cache.get('a/7')['datum_kwargs']['point_number']) is int
+    assert cache.get('b/7') is None
+
+    # Room for about two Resources of Datums: the least recently used one
+    # is evicted whole.
+    cache = DatumCache(max_bytes=2.5 * nbytes)
+    cache.put('a', datums('a', 100))
+    cache.put('b', datums('b', 100))
+    cache.get('a/0')
+    cache.put('c', datums('c', 100))
+    assert 'b/0' not in cache
+    assert cache.get('a/0') is not None
+    assert cache.get('c/99') is not None
+    assert len(cache) == 200
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.nbytes == 0
+
+
+def test_retrieve_small_datum_cache(fs):
+    if not isinstance(fs._datum_cache, DatumCache):
+        pytest.skip('This Registry caches Datums differently.')
+    fs._datum_cache.max_bytes = 1
+    shape = (3, 2)
+    for _ in range(3):
+        res = fs.register_resource('syn-mod', '', '', {'shape': shape})
+        for n in range(1, 4):
+            datum_id = fs.register_datum(res, {'n': n})
+            np.testing.assert_array_equal(
+                fs.retrieve(datum_id), np.mod(np.arange(6), n).reshape(shape))
+    # Only the most recently used Resource is kept.
+    assert len(fs._datum_cache) == 3
+
+
+def test_handler_cache(fs):
+    if not isinstance(fs._handler_cache, HandlerCache):
+        pytest.skip('This Registry caches handlers differently.')
+    closed = []
+
+    class ClosingHandler(HandlerBase):
+        def __init__(self, fpath, value):
+            self.value = value
+
+        def __call__(self):
+            return self.value
+
+        def close(self):
+            closed.append(self.value)
+
+    fs.register_handler('closing', ClosingHandler)
+    cache = fs._handler_cache
+    cache.max_size = 2
+    datum_ids = []
+    for value in range(3):
+        res = fs.register_resource('closing', '', '', {'value': value})
+        datum_ids.append(fs.register_datum(res, {}))
+
+    assert [fs.retrieve(d) for d in datum_ids[:2]] == [0, 1]
+    assert fs.retrieve(datum_ids[0]) == 0
+    assert cache.stats()['reuses'] == 1
+    # The least recently used handler is evicted and closed.
+    assert fs.retrieve(datum_ids[2]) == 2
+    assert closed == [1]
+    assert len(cache) == 2
+    stats = cache.stats()
+    assert stats['constructions'] == 3
+    assert stats['evictions'] == 1
+
+    # An idle handler is closed when the cache is next used.
+    cache.idle_timeout = 0
+    assert fs.retrieve(datum_ids[1]) == 1
+    assert sorted(closed) == [0, 1, 2]
+    assert cache.stats()['expirations'] == 2
+    cache.idle_timeout = None
+
+    fs.clear_process_cache()
+    assert sorted(closed) == [0, 1, 1, 2]
+    assert len(cache) == 0
+
+
+def test_handler_cache_checkout():
+    closed = []
+
+    class ClosingHandler(HandlerBase):
+        def __init__(self, value):
+            self.value = value
+
+        def close(self):
+            closed.append(self.value)
+
+    cache = HandlerCache(max_size=1)
+    with cache.checkout('a', lambda: ClosingHandler('a')) as handler:
+        # Neither eviction nor clearing closes a handler in use.
+        cache['b'] = ClosingHandler('b')
+        cache.clear()
+        assert closed == ['b']
+        assert len(cache) == 0
+        assert handler.value == 'a'
+    assert closed == ['b', 'a']
+    with cache.checkout('a', lambda: ClosingHandler('a2')) as handler:
+        assert handler.value == 'a2'
+    assert cache.stats()['constructions'] == 3
@@ -372,14 +372,12 @@ class EventSourceShim(object):
         for field in tab.columns:
             if external_map.get(field) is not None:
                 logger.debug('filling data for %s', field)
-                # TODO someday we will have bulk get_datum in FS
                 if handler_overrides:
                     hr = mock_registries.get(field, handler_registry)
                 else:
                     hr = handler_registry
                 with self.fs.handler_context(hr) as _fs:
-                    values = [_fs.retrieve(value)
-                              for value in tab[field]]
+                    values = _fs.retrieve_many(tab[field])
                 tab[field] = values
         return tab
 
@@ -1,6 +1,7 @@
 import builtins
 import collections
 import collections.abc
+import concurrent.futures
 import copy
 from datetime import datetime, timedelta, timezone
 import functools
@@ -10,6 +11,7 @@ import logging
 import os
 import sys
 import threading
+import time
 
 from bson.objectid import ObjectId, InvalidId
 import cachetools
@@ -62,11 +64,23 @@ from .query_impl import (
     time_range,
     regex,
 )
+from .assets.handlers_base import HANDLER_CACHE_SIZE, HandlerCache
 from .server import router
+from .utils import _read_ahead
 
 
 CHUNK_SIZE_LIMIT = os.getenv("DATABROKER_CHUNK_SIZE_LIMIT", "100MB")
 MAX_AD_FRAMES_PER_CHUNK = int(os.getenv("DATABROKER_MAX_AD_FRAMES_PER_CHUNK", "10"))
+# Number of threads used to resolve external data when streaming filled documents.
+FILL_WORKERS = int(os.getenv("DATABROKER_FILL_WORKERS", "4"))
+# Number of runs read ahead in parallel when streaming documents from many runs,
+# and the number of pages of documents each may read ahead of the consumer.
+EXPORT_WORKERS = int(os.getenv("DATABROKER_EXPORT_WORKERS", "4"))
+EXPORT_READ_AHEAD = int(os.getenv("DATABROKER_EXPORT_READ_AHEAD", "16"))
+# Bounds of the Resource and Datum caches shared by all runs' Fillers. The
+# handler cache is bounded by DATABROKER_HANDLER_CACHE_SIZE, see HandlerCache.
+RESOURCE_CACHE_SIZE = int(os.getenv("DATABROKER_RESOURCE_CACHE_SIZE", "10000"))
+DATUM_CACHE_SIZE = int(os.getenv("DATABROKER_DATUM_CACHE_SIZE", "100000"))
 
 logger = logging.getLogger(__name__)
 
@@ -217,6 +231,122 @@ class DatasetMapAdapter(MapAdapter):
 BLUESKYRUN_SPEC = Spec("BlueskyRun", version="1")
 
 
+class _LockedLRUCache(cachetools.LRUCache):
+    """
+    An LRUCache that may be used from several threads at once.
+
+    Every method of the mapping API takes the lock. Iteration is over a
+    snapshot of the keys.
+    """
+
+    def __init__(self, maxsize):
+        super().__init__(maxsize)
+        self.lock = threading.RLock()
+
+    def __getitem__(self, key):
+        with self.lock:
+            return super().__getitem__(key)
+
+    def __setitem__(self, key, value):
+        with self.lock:
+            super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        with self.lock:
+            super().__delitem__(key)
+
+    def __contains__(self, key):
+        with self.lock:
+            return super().__contains__(key)
+
+    def __len__(self):
+        with self.lock:
+            return super().__len__()
+
+    def __iter__(self):
+        with self.lock:
+            return iter(list(super().__iter__()))
+
+    def __repr__(self):
+        with self.lock:
+            return super().__repr__()
+
+    def get(self, key, default=None):
+        with self.lock:
+            return super().get(key, default)
+
+    def pop(self, key, *default):
+        with self.lock:
+            return super().pop(key, *default)
+
+    def setdefault(self, key, default=None):
+        with self.lock:
+            return super().setdefault(key, default)
+
+    def popitem(self):
+        with self.lock:
+            return super().popitem()
+
+    def update(self, *args, **kwargs):
+        with self.lock:
+            super().update(*args, **kwargs)
+
+    def clear(self):
+        with self.lock:
+            super().clear()
+
+    def items(self):
+        with self.lock:
+            return [(key, super(_LockedLRUCache, self).__getitem__(key))
+                    for key in list(super().__iter__())]
+
+    def values(self):
+        return [value for _, value in self.items()]
+
+
+class FillCache:
+    """
+    Bounded caches of handlers, Resources, and Datums shared by all runs.
+
+    Runs that read the same files reuse the open handlers, and the Datums
+    fetched for one run are available to the next. Handlers are closed when
+    they are evicted. Used as a context manager, it empties the caches and
+    closes the handlers on exit.
+
+    Parameters
+    ----------
+    handler_cache_size : int, optional
+        Maximum number of handler instances, keyed on (Resource uid, spec)
+        and kept in a `HandlerCache`
+    resource_cache_size : int, optional
+        Maximum number of Resource documents
+    datum_cache_size : int, optional
+        Maximum number of Datum documents
+    """
+
+    def __init__(
+        self,
+        handler_cache_size=HANDLER_CACHE_SIZE,
+        resource_cache_size=RESOURCE_CACHE_SIZE,
+        datum_cache_size=DATUM_CACHE_SIZE,
+    ):
+        self.handlers = HandlerCache(max_size=handler_cache_size)
+        self.resources = _LockedLRUCache(resource_cache_size)
+        self.datums = _LockedLRUCache(datum_cache_size)
+
+    def clear(self):
+        "Empty the caches, closing the handlers once they are not in use."
+        self.handlers.clear()
+        self.resources.clear()
+        self.datums.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.clear()
+
+
 class BlueskyRun(MapAdapter):
     def __init__(
         self,
@@ -228,6 +358,7 @@ class BlueskyRun(MapAdapter):
         root_map,
         datum_collection,
         resource_collection,
+        fill_cache=None,
         specs=None,
         **kwargs,
     ):
@@ -240,6 +371,9 @@ class BlueskyRun(MapAdapter):
         self.root_map = root_map
         self._datum_collection = datum_collection
         self._resource_collection = resource_collection
+        if fill_cache is None:
+            fill_cache = FillCache()
+        self._fill_cache = fill_cache
         # This is used to create the Filler on first access.
         self._init_handler_registry = handler_registry
         self._filler = None
@@ -328,6 +462,9 @@ class BlueskyRun(MapAdapter):
                 filler = event_model.Filler(
                     handler_registry=self._init_handler_registry,
                     root_map=self.root_map,
+                    handler_cache=self._fill_cache.handlers,
+                    resource_cache=self._fill_cache.resources,
+                    datum_cache=self._fill_cache.datums,
                     inplace=False,
                 )
                 for descriptor in itertools.chain(
@@ -359,6 +496,7 @@ class BlueskyRun(MapAdapter):
             root_map=self.root_map,
             datum_collection=self._datum_collection,
             resource_collection=self._resource_collection,
+            fill_cache=self._fill_cache,
             **kwargs,
         )
 
@@ -393,9 +531,285 @@ class BlueskyRun(MapAdapter):
             raise ValueError(f"Could not find Datum with datum_id={datum_id}")
         return doc["resource"]
 
-    def single_documents(self, fill):
+    def resources(self):
+        """
+        Yield the Resource documents of the run.
+
+        Resources are looked up by their ``run_start``. Legacy Resources lack
+        it, so if there are none, the run's Events are scanned for the
+        Resources they reference instead.
+        """
+        run_start_uid = self.metadata()["start"]["uid"]
+        found = False
+        for doc in self._resource_collection.find(
+            {"run_start": run_start_uid}, {"_id": False}
+        ):
+            found = True
+            if "resource" in self.transforms:
+                doc = self.transforms["resource"](doc)
+            yield doc
+        if not found:
+            yield from self._scan_resources()
+
+    def _scan_resources(self):
+        """
+        Yield the Resource documents referenced by the run's Events.
+
+        Only the externally-stored fields of the Events are read, and the
+        Datums of each Resource are fetched once, so that the rest of its
+        Events are recognized without further queries.
+        """
+        resource_uids = set()
+        known_datum_ids = set()
+        for stream in self.values():
+            external_fields = {
+                key
+                for descriptor in stream.metadata()["descriptors"]
+                for key, value in descriptor["data_keys"].items()
+                if value.get("external")
+            }
+            if not external_fields:
+                continue
+            for name, doc in stream.iter_descriptors_and_events(fields=external_fields):
+                if name != "event":
+                    continue
+                filled = doc.get("filled", {})
+                for key, datum_id in doc["data"].items():
+                    if filled.get(key) or (datum_id in known_datum_ids):
+                        continue
+                    resource_uid = self.lookup_resource_for_datum(datum_id)
+                    known_datum_ids.update(
+                        datum["datum_id"]
+                        for datum in self.get_datum_for_resource(resource_uid)
+                    )
+                    if resource_uid not in resource_uids:
+                        resource_uids.add(resource_uid)
+                        yield self.get_resource(resource_uid)
+
+    def get_file_list(self, resource):
+        """
+        List the files of a Resource, as paths on the server.
+
+        The handler registered for the Resource's spec must implement
+        ``get_file_list``.
+        """
+        handler = self.filler.get_handler(resource)
+        datum_kwarg_gen = (
+            datum["datum_kwargs"]
+            for datum in self.get_datum_for_resource(resource["uid"])
+        )
+        return list(handler.get_file_list(datum_kwarg_gen))
+
+    def fill_datum(self, descriptor_uid, key, datum_id):
+        "Load the external data referenced by one datum_id."
+        datum = self._get_datum(datum_id)
+        resource = self._get_cached_resource(datum["resource"])
+        with self._checkout_handler(resource) as handler:
+            return _call_handler(
+                handler, datum, resource, self.filler.retry_intervals
+            )
+
+    def fill_datums(self, descriptor_uid, key, datum_ids):
+        """
+        Load the external data referenced by many datum_ids, in order.
+
+        The Datums of each Resource are read with one call to its handler's
+        ``get_many``, if the handler has one.
+        """
+        values = [None] * len(datum_ids)
+        # Map each Resource uid to the indexes and datum_kwargs of its Datums.
+        datums_by_resource = {}
+        for i, datum_id in enumerate(datum_ids):
+            try:
+                datum = self._fill_cache.datums[datum_id]
+            except KeyError:
+                # Fill this one the usual way, which also fetches the other
+                # Datums of its Resource.
+                values[i] = self.fill_datum(descriptor_uid, key, datum_id)
+            else:
+                datums_by_resource.setdefault(datum["resource"], []).append(
+                    (i, datum["datum_kwargs"])
+                )
+        for resource_uid, datums in datums_by_resource.items():
+            resource = self._get_cached_resource(resource_uid)
+            with self._checkout_handler(resource) as handler:
+                get_many = getattr(handler, "get_many", None)
+                if get_many is not None:
+                    results = get_many([datum_kwargs for _, datum_kwargs in datums])
+                    for (i, _), result in zip(datums, results):
+                        values[i] = result
+                    continue
+            for i, _ in datums:
+                values[i] = self.fill_datum(descriptor_uid, key, datum_ids[i])
+        return values
+
+    def _checkout_handler(self, resource):
+        """
+        Lend the handler of a Resource for the duration of a with block.
+
+        The handler is shared with the other runs through the FillCache. It is
+        not closed while it is checked out, and other threads that check it
+        out wait until it is returned.
+        """
+        return self._fill_cache.handlers.checkout(
+            (resource["uid"], resource["spec"]),
+            lambda: self.filler.get_handler(resource),
+        )
+
+    def _get_cached_resource(self, resource_uid):
+        try:
+            return self._fill_cache.resources[resource_uid]
+        except KeyError:
+            resource = self.get_resource(resource_uid)
+            self.filler("resource", resource)
+            return resource
+
+    def _get_datum(self, datum_id):
+        "Look up a Datum, caching the other Datums of its Resource too."
+        try:
+            return self._fill_cache.datums[datum_id]
+        except KeyError:
+            pass
+        resource_uid = self.lookup_resource_for_datum(datum_id)
+        filler = self.filler
+        filler("resource", self.get_resource(resource_uid))
+        for datum in self.get_datum_for_resource(resource_uid):
+            filler("datum", datum)
+        return self._fill_cache.datums[datum_id]
+
+    def roi_sums(self, descriptor_uid, key, datum_ids, bin_ranges):
+        """
+        Sum ranges of bins of the spectra referenced by many datum_ids.
+
+        For handlers with ``get_rois``, such as the Xspress3 handler, the sums
+        for all the Datums of a Resource are computed in one chunked pass over
+        its file, without loading the spectra. Other spectra are filled and
+        then summed.
+
+        Parameters
+        ----------
+        descriptor_uid : str
+        key : str
+            The field of the Events that holds the datum_ids
+        datum_ids : list
+        bin_ranges : list
+            (bin_low, bin_high) pairs, each summing bins ``bin_low:bin_high``
+
+        Returns
+        -------
+        sums : numpy.ndarray
+            Shape (len(datum_ids), len(bin_ranges))
+        """
+        sums = numpy.zeros((len(datum_ids), len(bin_ranges)))
+        datums_by_resource = {}
+        for i, datum_id in enumerate(datum_ids):
+            datum = self._get_datum(datum_id)
+            datums_by_resource.setdefault(datum["resource"], []).append(
+                (i, datum["datum_kwargs"])
+            )
+        for resource_uid, datums in datums_by_resource.items():
+            indices = [i for i, _ in datums]
+            resource = self._get_cached_resource(resource_uid)
+            with self._checkout_handler(resource) as handler:
+                get_rois = getattr(handler, "get_rois", None)
+                if get_rois is not None and all(
+                    datum_kwargs.get("frame") is not None and "channel" in datum_kwargs
+                    for _, datum_kwargs in datums
+                ):
+                    channels = sorted(
+                        {datum_kwargs["channel"] for _, datum_kwargs in datums}
+                    )
+                    frames = numpy.asarray(
+                        [datum_kwargs["frame"] for _, datum_kwargs in datums], dtype=int
+                    )
+                    # Read only the range of frames these Datums refer to.
+                    start, stop = int(frames.min()), int(frames.max()) + 1
+                    table = get_rois(
+                        [
+                            (channel, *bin_range)
+                            for channel in channels
+                            for bin_range in bin_ranges
+                        ],
+                        start=start,
+                        stop=stop,
+                    ).reshape((-1, len(channels), len(bin_ranges)))
+                    if start + len(table) < stop:
+                        # The file is still being written, or was cut short.
+                        raise event_model.DataNotAccessible(
+                            f"Frames {start + len(table)} to {stop - 1} of "
+                            f"Resource {resource_uid} are not in its file."
+                        )
+                    channel_indices = [
+                        channels.index(datum_kwargs["channel"])
+                        for _, datum_kwargs in datums
+                    ]
+                    sums[indices] = table[frames - start, channel_indices]
+                    continue
+            spectra = self.fill_datums(
+                descriptor_uid, key, [datum_ids[i] for i in indices]
+            )
+            for i, spectrum in zip(indices, spectra):
+                spectrum = numpy.asarray(spectrum)
+                sums[i] = [spectrum[..., low:high].sum() for low, high in bin_ranges]
+        return sums
+
+    def single_documents(
+        self,
+        fill,
+        *,
+        stream_name=None,
+        min_seq_num=None,
+        max_seq_num=None,
+        since=None,
+        until=None,
+        after=None,
+        fields=None,
+    ):
+        """
+        Yield ``(name, document)`` items from the run, one Event or Datum at a time.
+
+        See :meth:`documents` for the parameters.
+        """
+        filters = dict(
+            stream_name=stream_name,
+            min_seq_num=min_seq_num,
+            max_seq_num=max_seq_num,
+            since=since,
+            until=until,
+            fields=fields,
+        )
         if fill:
-            raise NotImplementedError("Only fill=False is implemented.")
+            # Filling is done page-wise, so fill pages and unpack them.
+            for name, doc in self.documents(fill=True, after=after, **filters):
+                if name == "event_page":
+                    for event in event_model.unpack_event_page(doc):
+                        yield ("event", event)
+                elif name == "datum_page":
+                    for datum in event_model.unpack_datum_page(doc):
+                        yield ("datum", datum)
+                else:
+                    yield (name, doc)
+            return
+        if after is None:
+            yield from self._single_documents(**filters)
+        else:
+            after_time, after_uid = after
+            # Skip the Events that were emitted before the resume point in
+            # the query itself, and drop the remaining documents that precede
+            # it below.
+            if since is None or since < after_time:
+                filters["since"] = after_time
+            yield from _resume_after(
+                self._single_documents(**filters), after_time, after_uid
+            )
+
+    def _single_documents(
+        self, stream_name, min_seq_num, max_seq_num, since, until, fields
+    ):
+        if stream_name is None:
+            streams = list(self.values())
+        else:
+            streams = [stream for key, stream in self.items() if key in stream_name]
         external_fields = {}  # map descriptor uid to set of external fields
         datum_cache = {}  # map datum_id to datum document
         # Track which Resource and Datum documents we have yielded so far.
@@ -403,7 +817,16 @@ class BlueskyRun(MapAdapter):
         datum_ids = set()
         # Interleave the documents from the streams in time order.
         merged_iter = toolz.itertoolz.merge_sorted(
-            *(stream.iter_descriptors_and_events() for stream in self.values()),
+            *(
+                stream.iter_descriptors_and_events(
+                    min_seq_num=min_seq_num,
+                    max_seq_num=max_seq_num,
+                    since=since,
+                    until=until,
+                    fields=fields,
+                )
+                for stream in streams
+            ),
             key=lambda item: item[1]["time"],
         )
         yield ("start", self.metadata()["start"])
@@ -442,21 +865,166 @@ class BlueskyRun(MapAdapter):
                 external_fields[doc["uid"]] = {
                     key
                     for key, value in doc["data_keys"].items()
-                    if value.get("external")
+                    if value.get("external") and (fields is None or key in fields)
                 }
             yield name, doc
         stop_doc = self.metadata()["stop"]
         if stop_doc is not None:
             yield ("stop", stop_doc)
 
-    def documents(self, fill, size=25):
+    def documents(
+        self,
+        fill,
+        size=25,
+        *,
+        stream_name=None,
+        min_seq_num=None,
+        max_seq_num=None,
+        since=None,
+        until=None,
+        after=None,
+        fields=None,
+    ):
         """
         Yield ``(name, document)`` items from the run.
 
         Batch Event and Datum documents into pages of up to ``size`` rows,
         while preserving time-ordering.
+
+        If ``fill`` is True, externally-stored data in Event Pages is loaded
+        using a pool of ``DATABROKER_FILL_WORKERS`` threads.
+
+        Parameters
+        ----------
+        fill : bool
+        size : int, optional
+            Maximum number of rows in an Event Page or Datum Page.
+        stream_name : List[str], optional
+            Only include the streams with these names.
+        min_seq_num, max_seq_num : int, optional
+            Only include Events with ``min_seq_num <= seq_num < max_seq_num``.
+        since, until : float, optional
+            Only include Events with ``since <= time < until``.
+        after : Tuple[float, str], optional
+            The ``(time, uid)`` of the last Run Start, Event Descriptor, Event,
+            or Run Stop received by the caller. Resume the stream after that
+            document. Resource and Datum documents needed by the remaining
+            Events may be repeated.
+        fields : List[str], optional
+            Only include these keys in the ``data``, ``timestamps``, and
+            ``filled`` of Events. The other keys are not read from the
+            database. Event Descriptors are not modified.
         """
-        yield from batch_documents(self.single_documents(fill=fill), size)
+        pages = batch_documents(
+            self.single_documents(
+                fill=False,
+                stream_name=stream_name,
+                min_seq_num=min_seq_num,
+                max_seq_num=max_seq_num,
+                since=since,
+                until=until,
+                after=after,
+                fields=fields,
+            ),
+            size,
+        )
+        if fill:
+            yield from self._fill_pages(pages)
+        else:
+            yield from pages
+
+    def _fill_pages(self, pages):
+        # Fill Event Pages in a bounded thread pool, yielding documents in the
+        # order they were received. Each Event Page is split into tasks, one per
+        # Resource. A task checks out its Resource's handler for its whole group,
+        # so tasks for the same Resource from different pages (or other requests)
+        # wait for each other, and each reads through its rows in order.
+        # Map descriptor uid to set of external fields. Collect these up front
+        # because the stream may have been resumed after its descriptors.
+        external_fields = {
+            descriptor["uid"]: {
+                key
+                for key, value in descriptor["data_keys"].items()
+                if value.get("external")
+            }
+            for stream in self.values()
+            for descriptor in stream.metadata()["descriptors"]
+        }
+        datum_resources = {}  # map datum_id to resource uid
+        # Documents waiting to be yielded, with the futures they depend on.
+        pending = collections.deque()
+        # Bound how far ahead of the consumer we read and fill.
+        max_pending = 2 * FILL_WORKERS
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=FILL_WORKERS, thread_name_prefix="databroker-fill"
+        )
+
+        def fill_group(descriptor_uid, resource_uid, group):
+            def fill():
+                return [
+                    (key, row, datum_id, self.fill_datum(descriptor_uid, key, datum_id))
+                    for key, row, datum_id in group
+                ]
+
+            if resource_uid is None:
+                # The Datums were not in this stream; fill_datum looks them up.
+                return fill()
+            resource = self._get_cached_resource(resource_uid)
+            with self._checkout_handler(resource):
+                return fill()
+
+        def emit(name, doc, futures):
+            if not futures:
+                return (name, doc)
+            filled_page = dict(doc)
+            filled_page["data"] = {key: list(value) for key, value in doc["data"].items()}
+            filled_page["filled"] = {
+                key: list(value) for key, value in doc.get("filled", {}).items()
+            }
+            for future in futures:
+                for key, row, datum_id, value in future.result():
+                    filled_page["data"][key][row] = value
+                    filled_page["filled"].setdefault(key, [False] * len(doc["uid"]))
+                    filled_page["filled"][key][row] = datum_id
+            return ("event_page", filled_page)
+
+        try:
+            for name, doc in pages:
+                futures = []
+                if name == "datum_page":
+                    datum_resources.update(
+                        zip(doc["datum_id"], itertools.repeat(doc["resource"]))
+                    )
+                elif name == "event_page":
+                    # Group the datum_ids in this page by Resource.
+                    groups = collections.defaultdict(list)
+                    filled = doc.get("filled", {})
+                    for key in external_fields[doc["descriptor"]]:
+                        for row, datum_id in enumerate(doc["data"].get(key, [])):
+                            if key in filled and filled[key][row]:
+                                continue
+                            resource_uid = datum_resources.get(datum_id)
+                            groups[resource_uid].append((key, row, datum_id))
+                    for resource_uid in sorted(groups, key=str):
+                        futures.append(
+                            executor.submit(
+                                fill_group,
+                                doc["descriptor"],
+                                resource_uid,
+                                groups[resource_uid],
+                            )
+                        )
+                pending.append((name, doc, futures))
+                while len(pending) > max_pending:
+                    yield emit(*pending.popleft())
+            while pending:
+                yield emit(*pending.popleft())
+        finally:
+            # If the consumer stopped early, do not do any more work.
+            for _, _, futures in pending:
+                for future in futures:
+                    future.cancel()
+            executor.shutdown(wait=True)
 
 
 class BlueskyEventStream(MapAdapter):
@@ -536,19 +1104,38 @@ class BlueskyEventStream(MapAdapter):
             **kwargs,
         )
 
-    def iter_descriptors_and_events(self):
+    def iter_descriptors_and_events(
+        self, min_seq_num=None, max_seq_num=None, since=None, until=None, fields=None
+    ):
+        seq_num_query = {"$lte": self._cutoff_seq_num}
+        if min_seq_num is not None:
+            seq_num_query["$gte"] = min_seq_num
+        if max_seq_num is not None:
+            seq_num_query["$lt"] = max_seq_num
+        time_query = {}
+        if since is not None:
+            time_query["$gte"] = since
+        if until is not None:
+            time_query["$lt"] = until
         for descriptor in sorted(
             self.metadata()["descriptors"], key=lambda d: d["time"]
         ):
             yield ("descriptor", descriptor)
+            query = {"descriptor": descriptor["uid"], "seq_num": seq_num_query}
+            if time_query:
+                query["time"] = time_query
+            projection = {"_id": False}
+            if fields is not None:
+                # Exclude, rather than include, so that any keys other than
+                # the standard ones are still returned.
+                for key in set(descriptor["data_keys"]).difference(fields):
+                    for sub_dict in ("data", "timestamps", "filled"):
+                        projection[f"{sub_dict}.{key}"] = False
             # TODO Grab paginated chunks.
             events = list(
                 self._event_collection.find(
-                    {
-                        "descriptor": descriptor["uid"],
-                        "seq_num": {"$lte": self._cutoff_seq_num},
-                    },
-                    {"_id": False},
+                    query,
+                    projection,
                     sort=[("time", pymongo.ASCENDING)],
                 )
             )
@@ -604,6 +1191,7 @@ class DatasetFromDocuments:
         root_map,
         sub_dict,
         validate_shape,
+        roi_columns=None,
     ):
         self._run = run
         self._stream_name = stream_name
@@ -613,6 +1201,9 @@ class DatasetFromDocuments:
         self._sub_dict = sub_dict
         self.root_map = root_map
         self.validate_shape = validate_shape
+        # Derived columns, each the sum of a range of bins of the spectra in
+        # an external field, computed when read
+        self._roi_columns = {}
 
         # metadata should look like
         # {
@@ -654,6 +1245,28 @@ class DatasetFromDocuments:
         self.array_structures, self.array_metadata = structure_from_descriptor(
             descriptor, self._sub_dict, self._cutoff_seq_num, unicode_columns
         )
+        if self._sub_dict == "data":
+            for name, (field, bin_low, bin_high) in (roi_columns or {}).items():
+                data_key = descriptor["data_keys"].get(field)
+                if (
+                    data_key is None
+                    or "external" not in data_key
+                    or name in self.array_structures
+                ):
+                    continue
+                self._roi_columns[name] = (field, bin_low, bin_high)
+                time_structure = self.array_structures["time"]
+                self.array_structures[name] = ArrayStructure(
+                    shape=time_structure.shape,
+                    chunks=time_structure.chunks,
+                    dims=["time"],
+                    data_type=FLOAT_DTYPE,
+                )
+                self.array_metadata[name] = {
+                    "attrs": {
+                        "roi": {"field": field, "bin_low": bin_low, "bin_high": bin_high}
+                    }
+                }
         self._contents = MapAdapter(
             OneShotCachedMap(
                 {
@@ -866,7 +1479,13 @@ class DatasetFromDocuments:
             min_seq_num = 1 + slice_.start
             max_seq_num = 1 + slice_.stop
 
-        to_stack = self._inner_get_columns(tuple(keys), min_seq_num, max_seq_num)
+        roi_keys = [key for key in keys if key in self._roi_columns]
+        keys = [key for key in keys if key not in self._roi_columns]
+        to_stack = self._get_roi_columns(roi_keys, min_seq_num, max_seq_num)
+        if keys:
+            to_stack.update(
+                self._inner_get_columns(tuple(keys), min_seq_num, max_seq_num)
+            )
 
         result = {}
         for key, value in to_stack.items():
@@ -879,7 +1498,26 @@ class DatasetFromDocuments:
 
         return result
 
-    def _inner_get_columns(self, keys, min_seq_num, max_seq_num):
+    def _get_roi_columns(self, keys, min_seq_num, max_seq_num):
+        "Compute derived ROI columns, reading the datum_ids of each field once."
+        descriptor_uid = self.metadata()["descriptors"][0]["uid"]
+        rois_by_field = {}
+        for key in keys:
+            field, bin_low, bin_high = self._roi_columns[key]
+            rois_by_field.setdefault(field, []).append((key, (bin_low, bin_high)))
+        columns = {}
+        for field, rois in rois_by_field.items():
+            datum_ids = self._inner_get_columns(
+                (field,), min_seq_num, max_seq_num, fill=False
+            )[field]
+            sums = self._run.roi_sums(
+                descriptor_uid, field, datum_ids, [bin_range for _, bin_range in rois]
+            )
+            for j, (key, _) in enumerate(rois):
+                columns[key] = sums[:, j]
+        return columns
+
+    def _inner_get_columns(self, keys, min_seq_num, max_seq_num, fill=True):
         columns = {key: [] for key in keys}
         # IMPORTANT: Access via self.metadata so that transforms are applied.
         descriptors = self.metadata()["descriptors"]
@@ -1013,26 +1651,9 @@ class DatasetFromDocuments:
             keys, expected_shapes, is_externals
         ):
             column = columns[key]
-            if is_external:
+            if is_external and fill:
                 filled_column = []
-                for datum_id in column:
-                    # HACK to adapt Filler which is designed to consume whole,
-                    # streamed documents, to this column-based access mode.
-                    mock_event = {
-                        "data": {key: datum_id},
-                        "descriptor": descriptor_uid,
-                        "uid": "PLACEHOLDER",
-                        "filled": {key: False},
-                    }
-                    filled_mock_event = _fill(
-                        self._run.filler,
-                        mock_event,
-                        self._run.lookup_resource_for_datum,
-                        self._run.get_resource,
-                        self._run.get_datum_for_resource,
-                        last_datum_id=None,
-                    )
-                    filled_data = filled_mock_event["data"][key]
+                for filled_data in self._run.fill_datums(descriptor_uid, key, column):
                     validated_filled_data = self.validate_shape(
                         key, filled_data, expected_shape
                     )
@@ -1145,6 +1766,7 @@ class MongoAdapter(collections.abc.Mapping, IndexersMixin):
         cache_ttl_complete=60,  # seconds
         cache_ttl_partial=2,  # seconds
         validate_shape=None,
+        roi_columns=None,
     ):
         """
         Create a MongoAdapter from MongoDB with the "normalized" (original) layout.
@@ -1195,6 +1817,13 @@ class MongoAdapter(collections.abc.Mapping, IndexersMixin):
         validate_shape: func
             function that will be used to validate that the shape of the data matches
             the shape in the descriptor document
+        roi_columns: dict, optional
+            Derived columns to add to every stream with the named field, each
+            summing a range of bins of the spectra it references, such as one
+            element's line in an Xspress3 fluorescence spectrum. Maps each new
+            column name to a dict like
+            ``{"field": "xs_channel1", "bin_low": 620, "bin_high": 660}``.
+            The sums are computed on the server when the column is read.
         """
         metadatastore_db = _get_database(uri)
         if asset_registry_uri is None:
@@ -1224,6 +1853,7 @@ class MongoAdapter(collections.abc.Mapping, IndexersMixin):
             metadata=metadata,
             access_policy=access_policy,
             validate_shape=validate_shape,
+            roi_columns=roi_columns,
         )
 
     @classmethod
@@ -1238,6 +1868,7 @@ class MongoAdapter(collections.abc.Mapping, IndexersMixin):
         cache_ttl_complete=60,  # seconds
         cache_ttl_partial=2,  # seconds
         validate_shape=None,
+        roi_columns=None,
     ):
         """
         Create a transient MongoAdapter from backed by "mongomock".
@@ -1284,6 +1915,13 @@ class MongoAdapter(collections.abc.Mapping, IndexersMixin):
         validate_shape: func
             function that will be used to validate that the shape of the data matches
             the shape in the descriptor document
+        roi_columns: dict, optional
+            Derived columns to add to every stream with the named field, each
+            summing a range of bins of the spectra it references, such as one
+            element's line in an Xspress3 fluorescence spectrum. Maps each new
+            column name to a dict like
+            ``{"field": "xs_channel1", "bin_low": 620, "bin_high": 660}``.
+            The sums are computed on the server when the column is read.
         """
         import mongomock
 
@@ -1312,6 +1950,7 @@ class MongoAdapter(collections.abc.Mapping, IndexersMixin):
             metadata=metadata,
             access_policy=access_policy,
             validate_shape=validate_shape,
+            roi_columns=roi_columns,
         )
 
     def __init__(
@@ -1328,6 +1967,8 @@ class MongoAdapter(collections.abc.Mapping, IndexersMixin):
         sorting=None,
         access_policy=None,
         validate_shape=None,
+        fill_cache=None,
+        roi_columns=None,
     ):
         "This is not user-facing. Use MongoAdapter.from_uri."
         self._run_start_collection = metadatastore_db.get_collection("run_start")
@@ -1362,6 +2003,17 @@ class MongoAdapter(collections.abc.Mapping, IndexersMixin):
         elif isinstance(validate_shape, str):
             validate_shape = import_object(validate_shape)
         self.validate_shape = validate_shape
+        if fill_cache is None:
+            fill_cache = FillCache()
+        # Shared by all the runs, so that reading many runs reuses open files
+        self.fill_cache = fill_cache
+        # Map column name to (field, bin_low, bin_high).
+        self.roi_columns = {
+            name: (spec["field"], int(spec["bin_low"]), int(spec["bin_high"]))
+            if isinstance(spec, dict)
+            else tuple(spec)
+            for name, spec in (roi_columns or {}).items()
+        }
         super().__init__()
 
     @property
@@ -1386,6 +2038,20 @@ class MongoAdapter(collections.abc.Mapping, IndexersMixin):
             )
         return self._metadatastore_db
 
+    def lookup_document(self, name, doc):
+        """
+        Return the stored copy of an Event or Datum, or None if there is none.
+
+        Other documents are not looked up, and None is returned.
+        """
+        if name == "event":
+            return self._event_collection.find_one({"uid": doc["uid"]}, {"_id": False})
+        if name == "datum":
+            return self._datum_collection.find_one(
+                {"datum_id": doc["datum_id"]}, {"_id": False}
+            )
+        return None
+
     def get_serializer(self):
         from suitcase.mongo_normalized import Serializer
 
@@ -1439,6 +2105,8 @@ class MongoAdapter(collections.abc.Mapping, IndexersMixin):
             sorting=sorting,
             access_policy=self.access_policy,
             validate_shape=self.validate_shape,
+            fill_cache=self.fill_cache,
+            roi_columns=self.roi_columns,
             **kwargs,
         )
 
@@ -1520,6 +2188,7 @@ class MongoAdapter(collections.abc.Mapping, IndexersMixin):
             root_map=copy.copy(self.root_map),
             datum_collection=self._datum_collection,
             resource_collection=self._resource_collection,
+            fill_cache=self.fill_cache,
         )
 
     def _build_event_stream(self, *, run_start_uid, stream_name, is_complete):
@@ -1566,6 +2235,7 @@ class MongoAdapter(collections.abc.Mapping, IndexersMixin):
                     root_map=self.root_map,
                     sub_dict="data",
                     validate_shape=self.validate_shape,
+                    roi_columns=self.roi_columns,
                 ),
                 "timestamps": lambda: DatasetFromDocuments(
                     run=run,
@@ -1732,6 +2402,49 @@ class MongoAdapter(collections.abc.Mapping, IndexersMixin):
             self._build_mongo_query(),
         )
 
+    def documents(self, fill=False, size=25):
+        """
+        Yield ``(name, document)`` items from every run in this MongoAdapter.
+
+        The documents of each run are contiguous and in order, as from
+        :meth:`BlueskyRun.documents`. Up to ``DATABROKER_EXPORT_WORKERS`` runs
+        are read ahead in parallel while the current one is being consumed,
+        each at most ``DATABROKER_EXPORT_READ_AHEAD`` pages ahead. Runs are
+        filled one at a time, as they are consumed.
+        """
+        pending = collections.deque()
+        cancelled = threading.Event()
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=EXPORT_WORKERS, thread_name_prefix="databroker-export"
+        )
+
+        def emit(run, pages):
+            if fill:
+                return run._fill_pages(pages)
+            return pages
+
+        try:
+            for run_start_doc in self._chunked_find(
+                self._run_start_collection, self._build_mongo_query()
+            ):
+                # The run cache is not threadsafe, so get the run here.
+                run = self._get_run(run_start_doc)
+                pages = _read_ahead(
+                    executor,
+                    functools.partial(run.documents, fill=False, size=size),
+                    EXPORT_READ_AHEAD,
+                    cancelled,
+                )
+                pending.append((run, pages))
+                while len(pending) >= EXPORT_WORKERS:
+                    yield from emit(*pending.popleft())
+            while pending:
+                yield from emit(*pending.popleft())
+        finally:
+            # If the consumer stopped early, stop the readers.
+            cancelled.set()
+            executor.shutdown(wait=True)
+
     def search(self, query):
         """
         Return a MongoAdapter with a subset of the mapping.
@@ -2089,60 +2802,43 @@ JSON_DTYPE_TO_MACHINE_DATA_TYPE = {
 }
 
 
-def _fill(
-    filler,
-    event,
-    lookup_resource_for_datum,
-    get_resource,
-    get_datum_for_resource,
-    last_datum_id=None,
-):
-    try:
-        _, filled_event = filler("event", event)
-        return filled_event
-    except event_model.UnresolvableForeignKeyError as err:
-        datum_id = err.key
-        if datum_id == last_datum_id:
-            # We tried to fetch this Datum on the last trip
-            # trip through this method, and apparently it did not
-            # work. We are in an infinite loop. Bail!
-            raise
-
-        # try to fast-path looking up the resource uid if this works
-        # it saves us a a database hit (to get the datum document)
-        if "/" in datum_id:
-            resource_uid, _ = datum_id.split("/", 1)
-        # otherwise do it the standard way
-        else:
-            resource_uid = lookup_resource_for_datum(datum_id)
-
-        # but, it might be the case that the key just happens to have
-        # a '/' in it and it does not have any semantic meaning so we
-        # optimistically try
+def _call_handler(handler, datum, resource, retry_intervals):
+    # Read the data of a Datum, retrying as event_model.Filler does, because
+    # a file that is still being written may not be visible yet.
+    error = None
+    for interval in [0, *retry_intervals]:
+        time.sleep(interval)
         try:
-            resource = get_resource(uid=resource_uid)
-        # and then fall back to the standard way to be safe
-        except ValueError:
-            resource = get_resource(lookup_resource_for_datum(datum_id))
-
-        filler("resource", resource)
-        # Pre-fetch all datum for this resource.
-        for datum in get_datum_for_resource(resource_uid=resource_uid):
-            filler("datum", datum)
-        # TODO -- When to clear the datum cache in filler?
-
-        # Re-enter and try again now that the Filler has consumed the
-        # missing Datum. There might be another missing Datum in this same
-        # Event document (hence this re-entrant structure) or might be good
-        # to go.
-        return _fill(
-            filler,
-            event,
-            lookup_resource_for_datum,
-            get_resource,
-            get_datum_for_resource,
-            last_datum_id=datum_id,
-        )
+            return handler(**datum["datum_kwargs"])
+        except IOError as error_:
+            error = error_
+    raise event_model.DataNotAccessible(
+        f"Filler was unable to load the data referenced by "
+        f"the Datum document {datum} and the Resource "
+        f"document {resource}."
+    ) from error
+
+
+def _resume_after(singles, after_time, after_uid):
+    # Drop the documents up to and including the one identified by
+    # (after_time, after_uid). Resource and Datum documents do not carry a
+    # time, so hold them until we know whether the document that needs them
+    # is being emitted.
+    held = []
+    singles = iter(singles)
+    for name, doc in singles:
+        if name in ("resource", "datum"):
+            held.append((name, doc))
+            continue
+        if doc["uid"] == after_uid:
+            held.clear()
+            break
+        if doc["time"] > after_time:
+            yield from held
+            yield (name, doc)
+            break
+        held.clear()
+    yield from singles
 
 
 def batch_documents(singles, size):
@@ -1,13 +1,28 @@
+import collections
+import concurrent.futures
 import json
+import logging
+import os
+import queue
+import re
+import threading
 import msgpack
-from typing import Optional
+from typing import List, Optional
 from jsonschema import ValidationError
+from prometheus_client import Counter, Gauge
 
-from event_model import DocumentNames, schema_validators
-from fastapi import APIRouter, HTTPException, Request
+from event_model import (
+    DocumentNames,
+    pack_datum_page,
+    pack_event_page,
+    schema_validators,
+)
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 import pydantic
+from starlette.concurrency import run_in_threadpool
 from starlette.responses import StreamingResponse
-from tiled.server.dependencies import SecureEntry
+from tiled.server.core import apply_search, apply_sort
+from tiled.server.dependencies import SecureEntry, get_query_registry
 
 
 class NamedDocument(pydantic.BaseModel):
@@ -17,12 +32,70 @@ class NamedDocument(pydantic.BaseModel):
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
+# Maximum number of encoded documents a stream may read ahead of the client
+STREAM_QUEUE_SIZE = int(os.getenv("DATABROKER_STREAM_QUEUE_SIZE", "64"))
+# Maximum number of streams reading documents at once; the rest wait
+STREAM_WORKERS = int(os.getenv("DATABROKER_STREAM_WORKERS", "16"))
+_stream_executor = concurrent.futures.ThreadPoolExecutor(
+    STREAM_WORKERS, thread_name_prefix="databroker-document-stream"
+)
+_DONE = object()
+# Maximum size of the body of a /documents_batch request (100 MiB)
+BATCH_MAX_BYTES = int(os.getenv("DATABROKER_BATCH_MAX_BYTES", "104857600"))
+
+STREAMS_IN_FLIGHT = Gauge(
+    "databroker_document_streams_in_flight",
+    "number of document streams currently being sent",
+    ["endpoint"],
+    multiprocess_mode="livesum",
+)
+STREAMS_CANCELLED = Counter(
+    "databroker_document_streams_cancelled",
+    "document streams that ended before all documents were sent",
+    ["endpoint"],
+)
+DOCUMENTS_STREAMED = Counter(
+    "databroker_documents_streamed",
+    "documents sent by document streams",
+    ["endpoint"],
+)
+
+_FILTER_PATTERN = re.compile(r"^filter\[(\w+)\]\[condition\]\[(\w+)\]$")
+
+
+def _parse_resume_token(token):
+    "Parse a token formatted like '{time}:{uid}' into (time, uid)."
+    time_, sep, uid = token.partition(":")
+    try:
+        if not (sep and uid):
+            raise ValueError
+        return float(time_), uid
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid resume token {token!r}")
+
+
+def _default(obj):
+    "Encode the numpy arrays and scalars found in filled documents."
+    try:
+        return obj.tolist()
+    except AttributeError:
+        raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
 
 @router.get("/documents/{path:path}", response_model=NamedDocument)
 @router.get("/documents", response_model=NamedDocument, include_in_schema=False)
 def get_documents(
     request: Request,
     fill: Optional[bool] = False,
+    stream_name: Optional[List[str]] = Query(None),
+    min_seq_num: Optional[int] = None,
+    max_seq_num: Optional[int] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    after: Optional[str] = None,
+    fields: Optional[List[str]] = Query(None),
     run=SecureEntry(scopes=["read:data", "read:metadata"]),
 ):
 
@@ -30,34 +103,259 @@ def get_documents(
 
     if not isinstance(run, BlueskyRun):
         raise HTTPException(status_code=404, detail="This is not a BlueskyRun.")
+    if after is not None:
+        after = _parse_resume_token(after)
+    kwargs = dict(
+        fill=fill,
+        stream_name=stream_name,
+        min_seq_num=min_seq_num,
+        max_seq_num=max_seq_num,
+        since=since,
+        until=until,
+        after=after,
+        fields=fields,
+    )
+    return _documents_response(request, lambda: run.documents(**kwargs), "documents")
+
+
+@router.get("/documents_search/{path:path}", response_model=NamedDocument)
+@router.get("/documents_search", response_model=NamedDocument, include_in_schema=False)
+async def get_documents_search(
+    request: Request,
+    fill: Optional[bool] = False,
+    sort: Optional[str] = None,
+    catalog=SecureEntry(scopes=["read:data", "read:metadata"]),
+    query_registry=Depends(get_query_registry),
+):
+    """
+    Stream the documents of every run that matches the query.
+
+    The query and sorting are given as filter[{name}][condition][{field}] and
+    sort parameters, in the same form used by tiled's /search route. The
+    documents of each run are contiguous and in order, beginning with its Run
+    Start document.
+    """
+    from .mongo_normalized import MongoAdapter
+
+    if not isinstance(catalog, MongoAdapter):
+        raise HTTPException(status_code=404, detail="This is not a CatalogOfBlueskyRuns.")
+    filters = _search_filters(request.query_params, query_registry)
+    catalog = apply_sort(await apply_search(catalog, filters, query_registry), sort)
+    return _documents_response(
+        request, lambda: _search_documents(catalog, fill), "documents_search"
+    )
+
+
+@router.get("/resources/{path:path}")
+@router.get("/resources", include_in_schema=False)
+def get_resources(
+    files: Optional[bool] = False,
+    run=SecureEntry(scopes=["read:metadata"]),
+):
+    """
+    List the Resource documents of a run, optionally with their files.
+
+    This does not stream the run's Events, so it is much cheaper than
+    extracting the Resources from /documents.
+    """
+    from .mongo_normalized import BlueskyRun
+
+    if not isinstance(run, BlueskyRun):
+        raise HTTPException(status_code=404, detail="This is not a BlueskyRun.")
+    resources = []
+    for resource in run.resources():
+        item = {"resource": resource}
+        if files:
+            try:
+                item["files"] = run.get_file_list(resource)
+            except Exception as err:
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Could not list the files of Resource {resource['uid']}: {err!r}",
+                )
+        resources.append(item)
+    return {"resources": resources}
+
+
+@router.delete("/fill_cache/{path:path}")
+@router.delete("/fill_cache", include_in_schema=False)
+def delete_fill_cache(
+    catalog=SecureEntry(scopes=["write:data"]),
+):
+    """
+    Empty the caches of handlers, Resources, and Datums used to fill runs.
+
+    The caches are shared by all the users of the server, so this requires
+    write access. Handlers that are being used by other requests are closed
+    once those requests are done with them.
+    """
+    from .mongo_normalized import MongoAdapter
+
+    if not isinstance(catalog, MongoAdapter):
+        raise HTTPException(status_code=404, detail="This is not a CatalogOfBlueskyRuns.")
+    catalog.fill_cache.clear()
+
+
+def _search_filters(query_params, query_registry):
+    """
+    Collect filter[{name}][condition][{field}] parameters for tiled's apply_search.
+
+    Repeated parameters are separate queries of the same type, so each field
+    of a query type must be given the same number of times.
+    """
+    values = collections.defaultdict(lambda: collections.defaultdict(list))
+    for key, value in query_params.multi_items():
+        match = _FILTER_PATTERN.match(key)
+        if match is None:
+            continue
+        name, field = match.groups()
+        values[name][field].append(value)
+    filters = {}
+    for name, fields in values.items():
+        if name not in query_registry.name_to_query_type:
+            raise HTTPException(status_code=400, detail=f"Unsupported query type {name!r}")
+        if len({len(field_values) for field_values in fields.values()}) > 1:
+            raise HTTPException(
+                status_code=400,
+                detail=f"The fields of the {name!r} queries are not all given the same number of times.",
+            )
+        for field, field_values in fields.items():
+            filters[f"filter___{name}___{field}"] = field_values
+    return filters
+
+
+def _search_documents(catalog, fill):
+    "Yield the documents of each run in a catalog, as narrowed by apply_search."
+    if hasattr(catalog, "documents"):
+        yield from catalog.documents(fill=fill)
+        return
+    # A KeyLookup query narrows the catalog to a MapAdapter of at most one run.
+    for run in catalog.values():
+        yield from run.documents(fill=fill)
+
+
+def _encode_json_seq(name, doc):
+    "Encode a (name, doc) pair as a line of JSON."
+    return (json.dumps({"name": name, "doc": doc}, default=_default) + "\n").encode()
+
+
+def _encode_msgpack(name, doc):
+    "Encode a (name, doc) pair as msgpack."
+    return msgpack.packb({"name": name, "doc": doc}, default=_default)
+
+
+_ENCODERS = {
+    "application/json-seq": _encode_json_seq,
+    "application/x-msgpack": _encode_msgpack,
+}
+
+
+def _documents_response(request, documents, endpoint):
+    "Stream (name, doc) pairs from documents() in a media type the client accepts."
     DEFAULT_MEDIA_TYPE = "application/json-seq"
     media_types = request.headers.get("Accept", DEFAULT_MEDIA_TYPE).split(", ")
     for media_type in media_types:
         if media_type == "*/*":
             media_type = DEFAULT_MEDIA_TYPE
-        if media_type == "application/x-msgpack":
-            # (name, doc) pairs as msgpack
-
-            def generator_func():
-                packer = msgpack.Packer()
-                for name, doc in run.documents(fill=fill):
-                    yield packer.pack({"name": name, "doc": doc})
-
-            generator = generator_func()
-            return StreamingResponse(
-                generator, media_type="application/x-msgpack"
-            )
-        if media_type == "application/json-seq":
-            # (name, doc) pairs as newline-delimited JSON
-            generator = (json.dumps({"name": name, "doc": doc}) + "\n" for name, doc in run.documents(fill=fill))
-            return StreamingResponse(
-                generator, media_type="application/json-seq"
-            )
+        if media_type in _ENCODERS:
+            break
     else:
         raise HTTPException(
             status_code=406,
-            detail=", ".join(["application/json-seq", "application/x-msgpack"]),
+            detail=", ".join(_ENCODERS),
         )
+    return StreamingResponse(
+        _stream_documents(documents, _ENCODERS[media_type], endpoint),
+        media_type=media_type,
+    )
+
+
+async def _stream_documents(documents, encode, endpoint):
+    """
+    Yield encoded documents, produced by a worker thread into a bounded queue.
+
+    The worker, from a pool of STREAM_WORKERS shared by all streams, reads
+    and encodes at most STREAM_QUEUE_SIZE documents ahead of the client.
+    When the client disconnects, starlette cancels this generator, and the
+    worker stops before its next document and closes documents(), so that
+    its database cursors and fill workers are released promptly.
+    """
+    chunks = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+    cancelled = threading.Event()
+    completed = False
+    STREAMS_IN_FLIGHT.labels(endpoint).inc()
+    worker = _stream_executor.submit(
+        _produce_documents, documents, encode, chunks, cancelled
+    )
+    try:
+        while True:
+            chunk = await run_in_threadpool(_get_chunk, chunks)
+            if chunk is None:
+                continue
+            batch = [chunk]
+            # Drain what is already waiting to save a thread hop per document.
+            while len(batch) < STREAM_QUEUE_SIZE and isinstance(batch[-1], bytes):
+                try:
+                    batch.append(chunks.get_nowait())
+                except queue.Empty:
+                    break
+            if not isinstance(batch[-1], bytes):
+                *batch, outcome = batch
+            else:
+                outcome = None
+            if batch:
+                DOCUMENTS_STREAMED.labels(endpoint).inc(len(batch))
+                yield b"".join(batch)
+            if outcome is _DONE:
+                completed = True
+                return
+            if outcome is not None:
+                raise outcome
+    finally:
+        cancelled.set()
+        # A stream still waiting for a worker never starts.
+        worker.cancel()
+        STREAMS_IN_FLIGHT.labels(endpoint).dec()
+        if not completed:
+            STREAMS_CANCELLED.labels(endpoint).inc()
+
+
+def _get_chunk(chunks):
+    # Wait briefly, so that a cancelled stream does not hold a thread.
+    try:
+        return chunks.get(timeout=0.1)
+    except queue.Empty:
+        return None
+
+
+def _produce_documents(documents, encode, chunks, cancelled):
+    "Put encoded documents into chunks, then _DONE or the exception raised."
+
+    def put(item):
+        # Block while the queue is full, but give up once cancelled.
+        while not cancelled.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    generator = None
+    try:
+        if cancelled.is_set():
+            return
+        generator = iter(documents())
+        for name, doc in generator:
+            if cancelled.is_set() or not put(encode(name, doc)):
+                return
+    except Exception as err:
+        put(err)
+    else:
+        put(_DONE)
+    finally:
+        if generator is not None and hasattr(generator, "close"):
+            generator.close()
 
 
 @router.post("/documents/{path:path}")
@@ -78,3 +376,171 @@ def post_documents(
     except ValidationError as err:
         raise HTTPException(status_code=400, detail=err.message)
     serializer(named_doc.name.value, named_doc.doc)
+
+
+@router.post("/documents_batch/{path:path}")
+@router.post("/documents_batch", include_in_schema=False)
+async def post_documents_batch(
+    request: Request,
+    catalog=SecureEntry(scopes=["write:data", "write:metadata"]),
+):
+    """
+    Insert many (name, doc) pairs sent as application/json-seq or msgpack.
+
+    Consecutive Events from the same Event Descriptor and consecutive Datums
+    from the same Resource are written with one bulk insert. A document that
+    fails to decode, validate, or insert does not abort the batch; the
+    response lists the index and reason of each failure. Bodies larger than
+    ``DATABROKER_BATCH_MAX_BYTES`` are rejected.
+    """
+    from .mongo_normalized import MongoAdapter
+
+    if not isinstance(catalog, MongoAdapter):
+        raise HTTPException(status_code=404, detail="This is not a CatalogOfBlueskyRuns.")
+    items = _decode_documents(
+        await _read_body(request, BATCH_MAX_BYTES),
+        request.headers.get("Content-Type", "application/json-seq"),
+    )
+    serializer = catalog.get_serializer()
+    return await run_in_threadpool(
+        _insert_documents, serializer, items, catalog.lookup_document
+    )
+
+
+async def _read_body(request, max_bytes):
+    "Read the request body, failing with 413 once it exceeds max_bytes."
+    too_large = HTTPException(
+        status_code=413, detail=f"The request body is larger than {max_bytes} bytes."
+    )
+    length = request.headers.get("Content-Length")
+    if length is not None and length.isdigit() and int(length) > max_bytes:
+        raise too_large
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            raise too_large
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def _decode_documents(body, content_type):
+    "Decode a request body into a list of items, or exceptions for bad items."
+    media_type = content_type.split(";")[0].strip()
+    if media_type == "application/x-msgpack":
+        # There is no way to resynchronize a corrupt msgpack stream, so any
+        # decoding error fails the whole request.
+        unpacker = msgpack.Unpacker(raw=False)
+        unpacker.feed(body)
+        try:
+            return list(unpacker)
+        except Exception as err:
+            raise HTTPException(status_code=400, detail=f"Invalid msgpack: {err}")
+    if media_type in {"application/json-seq", "application/json"}:
+        items = []
+        for line in body.split(b"\n"):
+            # RFC 7464 prefixes each record with a Record Separator.
+            line = line.strip(b"\x1e \r\t")
+            if not line:
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as err:
+                items.append(err)
+        return items
+    raise HTTPException(
+        status_code=415,
+        detail=", ".join(["application/json-seq", "application/x-msgpack"]),
+    )
+
+
+def _insert_documents(serializer, items, lookup_document):
+    """
+    Validate items and insert the valid ones, collecting per-document errors.
+
+    lookup_document(name, doc) returns the stored copy of an Event or Datum,
+    or None, so that documents written by a bulk insert that then failed are
+    not reported as duplicates when they are retried one at a time.
+    """
+    errors = []
+    valid = []
+    for index, item in enumerate(items):
+        try:
+            if isinstance(item, Exception):
+                raise item
+            name = DocumentNames(item["name"])
+            doc = item["doc"]
+            schema_validators[name].validate(doc)
+        except ValidationError as err:
+            errors.append({"index": index, "name": item["name"], "detail": err.message})
+        except Exception as err:
+            name = item.get("name") if isinstance(item, dict) else None
+            errors.append({"index": index, "name": name, "detail": f"Invalid document: {err!r}"})
+        else:
+            valid.append((index, name.value, doc))
+
+    inserted = 0
+    for name, group in _group_documents(valid):
+        if len(group) > 1:
+            # Bulk insert, falling back to one at a time on failure so
+            # that the error can be pinned on the document(s) responsible.
+            docs = [doc for _, doc in group]
+            try:
+                if name == "event":
+                    serializer("event_page", pack_event_page(*docs))
+                else:
+                    serializer("datum_page", pack_datum_page(*docs))
+            except Exception as err:
+                logger.warning(
+                    "Bulk insert of %d %s documents failed; inserting them one at a time.",
+                    len(group),
+                    name,
+                    exc_info=err,
+                )
+            else:
+                inserted += len(group)
+                continue
+        for index, doc in group:
+            try:
+                serializer(name, doc)
+            except Exception as err:
+                if len(group) > 1 and _is_stored(lookup_document(name, doc), doc):
+                    # The failed bulk insert already wrote this one.
+                    inserted += 1
+                else:
+                    errors.append({"index": index, "name": name, "detail": str(err)})
+            else:
+                inserted += 1
+    errors.sort(key=lambda error: error["index"])
+    return {"inserted": inserted, "errors": errors}
+
+
+def _is_stored(stored, doc):
+    "Whether a stored document has the same contents as doc."
+    return stored is not None and all(stored.get(key) == value for key, value in doc.items())
+
+
+def _group_documents(documents):
+    """
+    Group consecutive (index, name, doc) items that can be bulk inserted.
+
+    Yield (name, [(index, doc), ...]). Events sharing an Event Descriptor and
+    Datums sharing a Resource are grouped; anything else is its own group.
+    """
+    GROUP_KEYS = {"event": "descriptor", "datum": "resource"}
+    group_name = group_key = None
+    group = []
+    for index, name, doc in documents:
+        key = None
+        if name in GROUP_KEYS:
+            # Pages are columnar, so grouped documents must also share keys.
+            columns = doc.get("data") or doc.get("datum_kwargs") or {}
+            key = (doc.get(GROUP_KEYS[name]), tuple(sorted(columns)))
+        if group and (key is None or (name, key) != (group_name, group_key)):
+            yield group_name, group
+            group = []
+        group_name, group_key = name, key
+        group.append((index, doc))
+    if group:
+        yield group_name, group
@@ -1,6 +1,7 @@
 from __future__ import absolute_import, division, print_function
 
 import collections
+import functools
 import tempfile
 import os
 import logging
@@ -23,6 +24,7 @@ import warnings
 import pytest
 import six
 import numpy as np
+import pandas as pd
 import event_model
 import httpx
 
@@ -654,10 +656,10 @@ def test_external_access_with_handler(db, RE, hw):
 
     EXPECTED_SHAPE = (10, 10)  # via ophyd.sim.img
 
-    # Fetching filled events is no longer supported.
-    if hasattr(db, 'v1') or hasattr(db, 'v2'):
-        with pytest.raises(NotImplementedError):
-            next(db.get_events(h, fields=['img'], fill=True))
+    # Filled events are filled on the server side.
+    filled_ev, _ = db.get_events(h, fields=['img'], fill=True)
+    assert not isinstance(filled_ev['data']['img'], str)
+    assert filled_ev['data']['img'].shape == EXPECTED_SHAPE
 
     ev, ev2 = db.get_events(h, fields=['img'])
     assert ev is not ev2
@@ -686,7 +688,6 @@ def test_external_access_with_handler(db, RE, hw):
     assert img.shape == EXPECTED_SHAPE
 
 
-@pytest.mark.xfail(reason="This has been replaced either databroker-pack or tiled export methods.")
 def test_export(broker_factory, RE, hw):
     from ophyd import sim
     db1 = broker_factory()
@@ -721,7 +722,6 @@ def test_export(broker_factory, RE, hw):
     image2, = db2.get_images(db2[uid], 'detfs')
 
 
-@pytest.mark.xfail(reason="File-copying is not supported via the client.")
 def test_export_size_smoke(broker_factory, RE, tmpdir):
     from ophyd import sim
     db1 = broker_factory()
@@ -1069,10 +1069,15 @@ def test_fill_and_multiple_streams(db, RE, tmpdir, hw):
                             baseline_dets)))
 
     h = db[uid]
-    if hasattr(db, 'v1') or hasattr(db, 'v2'):
-        with pytest.raises(NotImplementedError):
-            list(h.documents(stream_name=ALL, fill=True))
-        list(h.documents(stream_name=ALL, fill=False))
+    filled_keys = set()
+    for name, doc in h.documents(stream_name=ALL, fill=True):
+        if name == 'event':
+            for key in ('detfs1', 'detfs2'):
+                if key in doc['data']:
+                    assert doc['data'][key].shape == (5, 5)
+                    filled_keys.add(key)
+    assert filled_keys == {'detfs1', 'detfs2'}
+    list(h.documents(stream_name=ALL, fill=False))
 
 
 def test_repr_html(db, RE, hw):
@@ -1355,3 +1360,775 @@ def test_img_explicit_chunks(db, RE, hw, tmpdir):
     uid, = get_uids(RE(count([img2], 5)))
     c[uid]["primary"]["data"]["img"][:]
     assert c[uid]["primary"]["data"]["img"].chunks[1] == tuple([2] * 5)
+
+
+def test_documents_fill(c, RE, hw):
+    RE.subscribe(c.v1.insert)
+    uid, = get_uids(RE(count([hw.img], 5)))
+    run = c[uid]
+    unfilled = list(run.documents(fill=False))
+    filled = list(run.documents(fill=True))
+    # Filling must not change which documents are emitted or their order.
+    assert [name for name, _ in filled] == [name for name, _ in unfilled]
+    for (name, doc), (_, raw_doc) in zip(filled, unfilled):
+        if name == "event_page":
+            assert doc["uid"] == raw_doc["uid"]
+            assert doc["data"]["img"].shape == (len(raw_doc["uid"]), 10, 10)
+            assert all(doc["filled"]["img"])
+
+
+def test_documents_fill_one_handler_user(RE, tmpdir):
+    from ophyd import sim
+    from databroker.mongo_normalized import MongoAdapter
+
+    active = []
+    overlaps = []
+
+    class SlowNumpySeqHandler(sim.NumpySeqHandler):
+        def __call__(self, index):
+            active.append(index)
+            if len(active) > 1:
+                overlaps.append(tuple(active))
+            ttime.sleep(0.005)
+            try:
+                return super().__call__(index)
+            finally:
+                active.remove(index)
+
+    adapter = MongoAdapter.from_mongomock(
+        handler_registry={"NPY_SEQ": SlowNumpySeqHandler}
+    )
+    detfs = sim.SynSignalWithRegistry(
+        name="detfs", func=lambda: np.ones((5, 5)), save_path=str(tmpdir)
+    )
+    RE.subscribe(adapter.get_serializer())
+    uid, = get_uids(RE(count([detfs], 20)))
+    # Many small pages of the same Resource are filled at once, but its
+    # handler is only used by one worker at a time.
+    pages = [
+        doc for name, doc in adapter[uid].documents(fill=True, size=1)
+        if name == "event_page"
+    ]
+    assert len(pages) == 20
+    assert all(np.array_equal(page["data"]["detfs"][0], np.ones((5, 5))) for page in pages)
+    assert not overlaps
+
+
+def test_documents_restricted_and_resumed(c, RE, hw):
+    RE.subscribe(c.v1.insert)
+    uid, = get_uids(RE(baseline_wrapper(count([hw.det], 10), [hw.motor])))
+    run = c[uid]
+    docs = list(run.documents())
+
+    seq_nums = [
+        seq_num
+        for name, doc in run.documents(stream_name="primary", min_seq_num=3, max_seq_num=6)
+        if name == "event_page"
+        for seq_num in doc["seq_num"]
+    ]
+    assert seq_nums == [3, 4, 5]
+    names = [name for name, _ in run.documents(stream_name="baseline")]
+    assert names.count("descriptor") == 1
+    (descriptor,) = [doc for name, doc in run.documents(stream_name="baseline") if name == "descriptor"]
+    assert descriptor["name"] == "baseline"
+
+    # Resume after each positioned document and check that the remainder of
+    # the stream is exactly what followed it the first time.
+    for i, (name, doc) in enumerate(docs):
+        token = run.resume_token(name, doc)
+        if token is None:
+            continue
+        resumed = list(run.documents(after=token))
+        assert [(name, dict(doc)) for name, doc in resumed] == [
+            (name, dict(doc)) for name, doc in docs[i + 1:]
+        ]
+
+
+def test_catalog_documents(c, RE, hw):
+    from tiled.queries import Key
+
+    RE.subscribe(c.v1.insert)
+    for _ in range(5):
+        RE(count([hw.det], 3), purpose="bulk")
+    RE(count([hw.det], 3))
+    results = c.search(Key("purpose") == "bulk")
+    # Split the stream into runs at each Run Start document.
+    runs = []
+    for name, doc in results.documents():
+        if name == "start":
+            runs.append([])
+        runs[-1].append((name, dict(doc)))
+    assert [run[0][1]["uid"] for run in runs] == list(results)
+    for run in runs:
+        uid = run[0][1]["uid"]
+        assert run == [(name, dict(doc)) for name, doc in c[uid].documents()]
+    # The catalog's sorting is applied on the server.
+    reversed_results = results.sort(("time", -1))
+    starts = [doc["uid"] for name, doc in reversed_results.documents() if name == "start"]
+    assert starts == list(results)[::-1]
+    # Fields of a query type given different numbers of times are rejected.
+    link = results.item["links"]["self"].replace("/metadata", "/documents_search", 1)
+    response = c.context.http_client.get(
+        link,
+        params={
+            "filter[eq][condition][key]": ["purpose", "plan_name"],
+            "filter[eq][condition][value]": ['"bulk"'],
+        },
+    )
+    assert response.status_code == 400
+
+
+def test_post_documents_batch(c, RE, hw):
+    docs = []
+    RE(count([hw.det, hw.img], 5), lambda name, doc: docs.append((name, doc)))
+    start = docs[0][1]
+    invalid = {**start, "time": "not a number"}
+    batch = [docs[0], ("not a name", {}), ("start", invalid)] + docs[1:]
+    errors = c.post_documents(batch)
+    assert [error["index"] for error in errors] == [1, 2]
+    run = c[start["uid"]]
+    assert run.metadata["stop"] is not None
+    assert len(run.primary.read()["img"]) == 5
+    # Posting the same documents again is harmless.
+    assert c.post_documents(docs) == []
+
+    with c.document_buffer(size=3) as buffer:
+        uid, = get_uids(RE(count([hw.det], 5), buffer))
+    assert buffer.errors == []
+    assert c[uid].metadata["stop"]["num_events"] == {"primary": 5}
+
+
+def test_insert_documents_partial_bulk(caplog):
+    from databroker.server import _insert_documents
+
+    stored = {}
+
+    def serializer(name, doc):
+        if name == "event_page":
+            # Write the first two Events, then fail.
+            for event in list(event_model.unpack_event_page(doc))[:2]:
+                stored[event["uid"]] = event
+            raise RuntimeError("connection lost")
+        if doc["uid"] in stored:
+            raise RuntimeError("duplicate key")
+        stored[doc["uid"]] = doc
+
+    events = [
+        {"uid": str(uuid.uuid4()), "descriptor": "d", "seq_num": i + 1, "time": float(i),
+         "data": {"x": i}, "timestamps": {"x": float(i)}, "filled": {}}
+        for i in range(4)
+    ]
+    items = [{"name": "event", "doc": event} for event in events]
+    with caplog.at_level(logging.WARNING, logger="databroker.server"):
+        result = _insert_documents(
+            serializer, items, lambda name, doc: stored.get(doc["uid"])
+        )
+    assert result == {"inserted": 4, "errors": []}
+    assert "Bulk insert of 4 event documents failed" in caplog.text
+
+
+def test_post_documents_batch_too_large(c, monkeypatch):
+    import databroker.server
+
+    monkeypatch.setattr(databroker.server, "BATCH_MAX_BYTES", 10)
+    link = c.item["links"]["self"].replace("/metadata", "/documents_batch", 1)
+    response = c.context.http_client.post(
+        link, content=b"x" * 100, headers={"Content-Type": "application/json-seq"}
+    )
+    assert response.status_code == 413
+
+
+def test_document_stream_cancellation():
+    import asyncio
+    import threading
+    from prometheus_client import REGISTRY
+    from databroker.server import _encode_json_seq, _stream_documents
+
+    closed = threading.Event()
+
+    def documents():
+        try:
+            for i in range(10_000):
+                yield "event", {"seq_num": i}
+        finally:
+            closed.set()
+
+    def in_flight():
+        return REGISTRY.get_sample_value(
+            "databroker_document_streams_in_flight", {"endpoint": "test"}
+        )
+
+    async def read_one_chunk():
+        stream = _stream_documents(documents, _encode_json_seq, "test")
+        chunk = await stream.__anext__()
+        assert in_flight() == 1
+        # This is what happens when the client disconnects.
+        await stream.aclose()
+        return chunk
+
+    chunk = asyncio.run(read_one_chunk())
+    assert chunk.startswith(b'{"name": "event", "doc": {"seq_num": 0}}\n')
+    # The producer gives up and closes the documents generator.
+    assert closed.wait(timeout=5)
+    assert in_flight() == 0
+
+
+def test_document_streams_share_workers(monkeypatch):
+    import asyncio
+    import concurrent.futures
+    import threading
+    from databroker import server
+
+    executor = concurrent.futures.ThreadPoolExecutor(1)
+    monkeypatch.setattr(server, "_stream_executor", executor)
+    release = threading.Event()
+    started = []
+
+    def documents(label):
+        started.append(label)
+        yield "event", {"label": label}
+        assert release.wait(10)
+
+    async def run():
+        first = server._stream_documents(
+            lambda: documents("first"), server._encode_json_seq, "test"
+        )
+        assert b'"first"' in await first.__anext__()
+        # The only worker is busy, so the second stream waits for it.
+        second = server._stream_documents(
+            lambda: documents("second"), server._encode_json_seq, "test"
+        )
+        pending = asyncio.ensure_future(second.__anext__())
+        await asyncio.sleep(0.3)
+        assert not pending.done()
+        pending.cancel()
+        await asyncio.gather(pending, return_exceptions=True)
+        await second.aclose()
+        await first.aclose()
+
+    asyncio.run(run())
+    release.set()
+    executor.shutdown(wait=True)
+    # The cancelled stream never started reading.
+    assert started == ["first"]
+
+
+def test_get_table_concurrent(c, RE, hw):
+    db = c.v1
+    RE.subscribe(db.insert)
+    uids = []
+    for num in (3, 1, 4):
+        uids.extend(get_uids(RE(count([hw.det, hw.img], num))))
+    headers = [db[uid] for uid in uids]
+    expected = db.get_table(headers, fill=True)
+    actual = db.get_table(headers, fill=True, max_workers=3)
+    assert list(actual.index) == [1, 2, 3, 1, 1, 2, 3, 4]
+    assert actual["img"].iloc[3].shape == (10, 10)
+    scalars = ["det", "time"]
+    pd.testing.assert_frame_equal(actual[scalars], expected[scalars])
+    pd.testing.assert_frame_equal(
+        actual[scalars],
+        pd.concat([db.get_table(header) for header in headers])[scalars],
+    )
+
+
+def test_get_table_multidim_xarray(c, RE, hw):
+    db = c.v1
+    RE.subscribe(db.insert)
+    uids = []
+    for num in (3, 2):
+        uids.extend(get_uids(RE(count([hw.det, hw.img], num))))
+    headers = [db[uid] for uid in uids]
+    table = db.get_table(headers, fill=True)
+    dataset = db.get_table(headers, fill=True, multidim="xarray")
+    assert list(dataset["seq_num"].values) == [1, 2, 3, 1, 2]
+    assert dataset["img"].shape == (5, 10, 10)
+    assert np.array_equal(dataset["img"][3], table["img"].iloc[3])
+    assert np.array_equal(dataset["time"].values, table["time"].values)
+    assert np.array_equal(dataset["det"].values, table["det"].values)
+    assert headers[0].table(fill=True, multidim="xarray")["img"].shape == (3, 10, 10)
+    with pytest.raises(ValueError):
+        db.get_table(headers, multidim="list")
+
+
+@pytest.mark.parametrize("read_ahead", [False, True])
+def test_data_method_by_chunk(c, read_ahead):
+    db = c.v1
+    run_bundle = event_model.compose_run()
+    db.insert("start", run_bundle.start_doc)
+    desc_bundle = run_bundle.compose_descriptor(
+        data_keys={
+            "image": {
+                "dtype": "array",
+                "shape": [3, 3],
+                "source": "",
+                # Ask the server to chunk the column two rows at a time.
+                "chunks": [[2, 2, 1], [3], [3]],
+            }
+        },
+        name="primary",
+    )
+    db.insert("descriptor", desc_bundle.descriptor_doc)
+    expected = [np.full((3, 3), i) for i in range(5)]
+    for i, image in enumerate(expected):
+        db.insert(
+            "event",
+            desc_bundle.compose_event(
+                data={"image": image.tolist()},
+                timestamps={"image": ttime.time()},
+                seq_num=i + 1,
+            ),
+        )
+    db.insert("stop", run_bundle.compose_stop())
+    h = db[run_bundle.start_doc["uid"]]
+    assert h.v2["primary"]["data"]["image"].chunks[0] == (2, 2, 1)
+    actual = list(h.data("image", read_ahead=read_ahead))
+    assert len(actual) == len(expected)
+    for a, e in zip(actual, expected):
+        assert np.array_equal(a, e)
+
+
+def test_documents_fields(c, RE, hw):
+    RE.subscribe(c.v1.insert)
+    uid, = get_uids(RE(count([hw.det, hw.img], 3)))
+    run = c[uid]
+    names = collections.Counter()
+    for name, doc in run.documents(fields=["det"]):
+        names[name] += 1
+        if name == "event_page":
+            assert set(doc["data"]) == set(doc["timestamps"]) == {"det"}
+        elif name == "descriptor":
+            # Descriptors are not projected.
+            assert {"det", "img"} <= set(doc["data_keys"])
+    # No Resource or Datum is needed for the requested fields.
+    assert names["resource"] == names["datum_page"] == 0
+    for name, doc in run.documents(fill=True, fields=["img"]):
+        if name == "event_page":
+            assert set(doc["data"]) == {"img"}
+            assert np.asarray(doc["data"]["img"][0]).shape == (10, 10)
+
+    h = c.v1[uid]
+    events = list(h.events(fields=["det"]))
+    assert len(events) == 3
+    for event in events:
+        assert set(event["data"]) == {"det"}
+
+
+def test_run_resources(tmpdir, monkeypatch):
+    from tiled.client import Context, from_context
+    from tiled.server.app import build_app
+    from databroker.mongo_normalized import BlueskyRun, MongoAdapter
+
+    adapter = MongoAdapter.from_mongomock()
+    with Context.from_app(build_app(adapter)) as context:
+        client = from_context(context)
+        uids = []
+        for legacy in (False, True):
+            run_bundle = event_model.compose_run()
+            client.post_document("start", run_bundle.start_doc)
+            resource_bundle = run_bundle.compose_resource(
+                spec="NPY_SEQ", root=str(tmpdir), resource_path="x", resource_kwargs={}
+            )
+            resource = dict(resource_bundle.resource_doc)
+            if legacy:
+                del resource["run_start"]
+            client.post_document("resource", resource)
+            desc_bundle = run_bundle.compose_descriptor(
+                data_keys={
+                    "img": {"dtype": "array", "shape": [2], "source": "", "external": "X"}
+                },
+                name="primary",
+            )
+            client.post_document("descriptor", desc_bundle.descriptor_doc)
+            datum = resource_bundle.compose_datum(datum_kwargs={"index": 0})
+            client.post_document("datum", datum)
+            client.post_document(
+                "event",
+                desc_bundle.compose_event(
+                    data={"img": datum["datum_id"]},
+                    timestamps={"img": ttime.time()},
+                    filled={"img": False},
+                    seq_num=1,
+                ),
+            )
+            client.post_document("stop", run_bundle.compose_stop())
+            uids.append((run_bundle.start_doc["uid"], resource["uid"]))
+    scanned = []
+    scan_resources = BlueskyRun._scan_resources
+
+    def tracking_scan(self):
+        scanned.append(self.metadata()["start"]["uid"])
+        return scan_resources(self)
+
+    monkeypatch.setattr(BlueskyRun, "_scan_resources", tracking_scan)
+    for uid, resource_uid in uids:
+        assert [doc["uid"] for doc in adapter[uid].resources()] == [resource_uid]
+    # Only the run with a legacy Resource, lacking run_start, scanned its Events.
+    assert scanned == [uids[1][0]]
+
+
+def test_export_bulk(request, RE, tmpdir):
+    from ophyd import sim
+    from databroker.tests.utils import build_tiled_mongo_backed_broker
+
+    db1 = build_tiled_mongo_backed_broker(request)
+    db2 = build_tiled_mongo_backed_broker(request)
+    RE.subscribe(db1.insert)
+    dir1 = str(tmpdir.mkdir("a"))
+    dir2 = str(tmpdir.mkdir("b"))
+    detfs = sim.SynSignalWithRegistry(
+        name="detfs", func=lambda: np.ones((5, 5)), save_path=dir1
+    )
+    uid, = get_uids(RE(count([detfs], 7)))
+
+    h = db1[uid]
+    assert [resource["root"] for resource in h.v2.resources()] == [dir1]
+    files = list(h.v2.resource_files().values())[0]
+    assert len(files) == 7
+
+    progress = []
+    file_pairs = db1.export(
+        h, db2, new_root=dir2, progress=lambda *args: progress.append(args)
+    )
+    assert progress == [(0, 1, uid)]
+    assert sorted(old for old, _ in file_pairs) == sorted(files)
+    for old, new in file_pairs:
+        assert os.path.dirname(old) == dir1
+        assert os.path.dirname(new) == dir2
+        assert os.path.getsize(new) == os.path.getsize(old)
+    assert [resource["root"] for resource in db2[uid].v2.resources()] == [dir2]
+    expected = db1.get_table(h, fill=True)
+    actual = db2.get_table(db2[uid], fill=True)
+    assert len(actual) == 7
+    assert np.array_equal(actual["detfs"].iloc[6], expected["detfs"].iloc[6])
+
+
+def test_export_size(c, RE, tmpdir):
+    from ophyd import sim
+
+    db = c.v1
+    RE.subscribe(db.insert)
+    detfs = sim.SynSignalWithRegistry(
+        name="detfs", func=lambda: np.ones((5, 5)), save_path=str(tmpdir)
+    )
+    uid, = get_uids(RE(count([detfs], 3)))
+    h = db[uid]
+    files, = h.v2.resource_files().values()
+    expected = sum(os.path.getsize(filepath) for filepath in files) * 1e-9
+    assert expected > 0
+    assert db.export_size(h) == pytest.approx(expected)
+    # Files shared by runs are counted once.
+    assert db.export_size([h, h]) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("prefetch", [0, 2])
+def test_lazy_headers(c, RE, hw, prefetch):
+    db = c.v1
+    RE.subscribe(db.insert)
+    for _ in range(5):
+        RE(count([hw.det], 2), purpose="lazy")
+    RE(count([hw.det], 2))
+    expected = list(db(purpose="lazy"))
+    db.lazy_headers = True
+    db.header_prefetch = prefetch
+    actual = list(db(purpose="lazy"))
+    assert len(actual) == 5
+    if not prefetch:
+        # Only the RunStart documents have been fetched.
+        assert all(lazy._lazy_run is None for lazy in actual)
+    # The first Header is available before the rest are used.
+    first = next(iter(db(purpose="lazy")))
+    assert first.start == expected[0].start
+    for lazy, header in zip(actual, expected):
+        assert lazy.start == header.start
+        assert lazy.stop == header.stop
+        assert lazy.descriptors == header.descriptors
+        assert len(db.get_table(lazy)) == 2
+
+
+def test_lazy_headers_prefetch_error(c, RE, hw, monkeypatch, caplog):
+    from databroker.v1 import _LazyHeader
+
+    db = c.v1
+    RE.subscribe(db.insert)
+    RE(count([hw.det]), purpose="lazy")
+
+    def fail(self):
+        raise RuntimeError("prefetch failed")
+
+    monkeypatch.setattr(_LazyHeader, "_prefetch", fail)
+    db.lazy_headers = True
+    with caplog.at_level(logging.WARNING, logger="databroker.v1"):
+        header, = db(purpose="lazy")
+    assert "Failed to prefetch" in caplog.text
+    # The descriptors are fetched on use instead.
+    assert len(header.descriptors) == 1
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_search_cache(c, RE, hw, lazy):
+    db = c.v1
+    db.lazy_headers = lazy
+    RE.subscribe(db.insert)
+    for _ in range(2):
+        RE(count([hw.det]), sample="Au")
+    RE(count([hw.det]), sample="Ag")
+    db.search_cache_ttl = 60
+    first = list(db(sample="Au"))
+    assert len(first) == 2
+    # Reuse the runs found the first time without searching again.
+    second = list(db(sample="Au"))
+    assert [h.start for h in second] == [h.start for h in first]
+    assert db(sample="Au")._items is not None
+    assert len(list(db(sample="Ag"))) == 1
+    # A new run invalidates the cached results.
+    RE(count([hw.det]), sample="Au")
+    assert db(sample="Au")._items is None
+    assert len(list(db(sample="Au"))) == 3
+    # Searches are not reused once the TTL has elapsed.
+    db.search_cache_ttl = 0.01
+    list(db(sample="Ag"))
+    ttime.sleep(0.05)
+    assert db(sample="Ag")._items is None
+
+
+def test_get_images_across_headers(c, RE, hw):
+    db = c.v1
+    RE.subscribe(db.insert)
+    headers = [db[uid] for uid in get_uids(RE(count([hw.img], 3)))]
+    headers += [db[uid] for uid in get_uids(RE(count([hw.img], 2)))]
+    images = db.get_images(headers, "img")
+    assert len(images) == 5
+    assert images.frame_shape == (10, 10)
+    expected = [image for header in headers for image in header.data("img")]
+    for i in [0, 4, 2, 3, 1, -1]:
+        assert np.array_equal(images[i], expected[i])
+    assert images[3].frame_no == 3
+    assert len(list(images)) == 5
+
+
+def test_shared_fill_cache(RE, tmpdir):
+    from ophyd import sim
+    from tiled.client import Context, from_context
+    from tiled.server.app import build_app
+    from databroker.mongo_normalized import MongoAdapter
+
+    adapter = MongoAdapter.from_mongomock(
+        handler_registry={"NPY_SEQ": sim.NumpySeqHandler}
+    )
+    detfs = sim.SynSignalWithRegistry(
+        name="detfs", func=lambda: np.ones((5, 5)), save_path=str(tmpdir)
+    )
+    with Context.from_app(build_app(adapter)) as context:
+        client = from_context(context)
+        RE.subscribe(client.post_document)
+        uids = [get_uids(RE(count([detfs], 3)))[0] for _ in range(2)]
+        for uid in uids:
+            data = client[uid]["primary"]["data"]["detfs"].read()
+            assert np.array_equal(data, np.ones((3, 5, 5)))
+        # The handlers opened for each run are kept for the next request.
+        fill_cache = adapter.fill_cache
+        assert len(fill_cache.handlers) == 2
+        assert len(fill_cache.datums) == 6
+        run = adapter[uids[0]]
+        assert run._fill_cache is fill_cache
+        # Evicted handlers are closed.
+        closed = []
+        keys = list(fill_cache.handlers)
+        for key in keys:
+            fill_cache.handlers[key].close = functools.partial(closed.append, key)
+        fill_cache.handlers.max_size = 1
+        fill_cache.handlers["other"] = object()
+        assert closed == keys
+        client.clear_fill_cache()
+        assert len(fill_cache.handlers) == 0
+        assert len(fill_cache.datums) == 0
+
+
+def test_locked_lru_cache_threads():
+    import threading
+    from databroker.mongo_normalized import _LockedLRUCache
+
+    cache = _LockedLRUCache(50)
+    errors = []
+
+    def hammer(offset):
+        try:
+            for i in range(2000):
+                key = (offset + i) % 100
+                cache[key] = i
+                cache.get(key)
+                key in cache
+                cache.pop(key + 1, None)
+                cache.setdefault(key + 2, i)
+                len(cache)
+                list(cache.items())
+                if i % 100 == 0:
+                    cache.clear()
+        except Exception as err:
+            errors.append(err)
+
+    threads = [threading.Thread(target=hammer, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert len(cache) <= 50
+
+
+def test_fill_column_with_get_many(tmpdir):
+    from tiled.client import Context, from_context
+    from tiled.server.app import build_app
+    from databroker.assets.handlers import NpyFrameWise
+    from databroker.mongo_normalized import MongoAdapter
+
+    calls = collections.Counter()
+
+    class CountingNpyFrameWise(NpyFrameWise):
+        def __call__(self, frame_no):
+            calls["__call__"] += 1
+            return super().__call__(frame_no)
+
+        def get_many(self, datum_kwargs_list):
+            calls["get_many"] += 1
+            return super().get_many(datum_kwargs_list)
+
+    frames = np.arange(5 * 3 * 3).reshape((5, 3, 3))
+    np.save(str(tmpdir.join("frames.npy")), frames)
+    adapter = MongoAdapter.from_mongomock(
+        handler_registry={"npy_FRAMEWISE": CountingNpyFrameWise}
+    )
+    with Context.from_app(build_app(adapter)) as context:
+        client = from_context(context)
+        run_bundle = event_model.compose_run()
+        client.post_document("start", run_bundle.start_doc)
+        resource_bundle = run_bundle.compose_resource(
+            spec="npy_FRAMEWISE",
+            root=str(tmpdir),
+            resource_path="frames.npy",
+            resource_kwargs={},
+        )
+        client.post_document("resource", resource_bundle.resource_doc)
+        desc_bundle = run_bundle.compose_descriptor(
+            data_keys={
+                "image": {
+                    "dtype": "array",
+                    "shape": [3, 3],
+                    "source": "",
+                    "external": "FILESTORE:",
+                }
+            },
+            name="primary",
+        )
+        client.post_document("descriptor", desc_bundle.descriptor_doc)
+        # Read the frames out of order.
+        order = [1, 2, 0, 4, 3]
+        for seq_num, frame_no in enumerate(order, start=1):
+            datum = resource_bundle.compose_datum(datum_kwargs={"frame_no": frame_no})
+            client.post_document("datum", datum)
+            client.post_document(
+                "event",
+                desc_bundle.compose_event(
+                    data={"image": datum["datum_id"]},
+                    timestamps={"image": ttime.time()},
+                    filled={"image": False},
+                    seq_num=seq_num,
+                ),
+            )
+        client.post_document("stop", run_bundle.compose_stop())
+        run = client[run_bundle.start_doc["uid"]]
+        actual = run["primary"]["data"]["image"].read()
+        assert np.array_equal(actual, frames[order])
+        # The first Datum is filled one at a time, and the rest all at once.
+        assert calls == {"__call__": 1, "get_many": 1}
+
+
+def test_roi_columns(tmpdir):
+    import h5py
+    from tiled.client import Context, from_context
+    from tiled.server.app import build_app
+    from databroker.assets.handlers import XS3_XRF_DATA_KEY, Xspress3HDF5Handler
+    from databroker.mongo_normalized import MongoAdapter
+
+    calls = collections.Counter()
+
+    class CountingXspress3HDF5Handler(Xspress3HDF5Handler):
+        def __call__(self, frame=None, channel=None):
+            calls["__call__"] += 1
+            return super().__call__(frame=frame, channel=channel)
+
+    num_frames, num_bins = 5, 40
+    spectra = np.arange(num_frames * 2 * num_bins).reshape((num_frames, 2, num_bins))
+    with h5py.File(str(tmpdir.join("xs3.h5")), "w") as f:
+        f.create_dataset(XS3_XRF_DATA_KEY, data=spectra)
+    adapter = MongoAdapter.from_mongomock(
+        handler_registry={"XSP3": CountingXspress3HDF5Handler},
+        roi_columns={
+            "fe": {"field": "xs_channel2", "bin_low": 10, "bin_high": 15},
+            "cu": {"field": "xs_channel2", "bin_low": 30, "bin_high": 38},
+            "missing": {"field": "no_such_field", "bin_low": 0, "bin_high": 1},
+        },
+    )
+    with Context.from_app(build_app(adapter)) as context:
+        client = from_context(context)
+        run_bundle = event_model.compose_run()
+        client.post_document("start", run_bundle.start_doc)
+        resource_bundle = run_bundle.compose_resource(
+            spec="XSP3",
+            root=str(tmpdir),
+            resource_path="xs3.h5",
+            resource_kwargs={},
+        )
+        client.post_document("resource", resource_bundle.resource_doc)
+        desc_bundle = run_bundle.compose_descriptor(
+            data_keys={
+                "xs_channel2": {
+                    "dtype": "array",
+                    "shape": [num_bins],
+                    "source": "",
+                    "external": "FILESTORE:",
+                }
+            },
+            name="primary",
+        )
+        client.post_document("descriptor", desc_bundle.descriptor_doc)
+        datum_ids = []
+        for seq_num, frame in enumerate(range(num_frames), start=1):
+            datum = resource_bundle.compose_datum(
+                datum_kwargs={"frame": frame, "channel": 2}
+            )
+            datum_ids.append(datum["datum_id"])
+            client.post_document("datum", datum)
+            client.post_document(
+                "event",
+                desc_bundle.compose_event(
+                    data={"xs_channel2": datum["datum_id"]},
+                    timestamps={"xs_channel2": ttime.time()},
+                    filled={"xs_channel2": False},
+                    seq_num=seq_num,
+                ),
+            )
+        client.post_document("stop", run_bundle.compose_stop())
+        data = client[run_bundle.start_doc["uid"]]["primary"]["data"]
+        assert "missing" not in data
+        ds = data.read(["fe", "cu"])
+        assert np.array_equal(ds["fe"], spectra[:, 1, 10:15].sum(axis=1))
+        assert np.array_equal(ds["cu"], spectra[:, 1, 30:38].sum(axis=1))
+        assert data["fe"].metadata["attrs"]["roi"]["bin_low"] == 10
+        # No spectrum was read out to compute the sums.
+        assert calls["__call__"] == 0
+        # Sums for some of the frames, in any order
+        run = adapter[run_bundle.start_doc["uid"]]
+        descriptor_uid = desc_bundle.descriptor_doc["uid"]
+        sums = run.roi_sums(
+            descriptor_uid, "xs_channel2", [datum_ids[3], datum_ids[1]], [(10, 15)]
+        )
+        assert np.array_equal(sums[:, 0], spectra[[3, 1], 1, 10:15].sum(axis=1))
+        # A frame that is not in the file (yet)
+        datum = resource_bundle.compose_datum(
+            datum_kwargs={"frame": num_frames, "channel": 2}
+        )
+        client.post_document("datum", datum)
+        with pytest.raises(event_model.DataNotAccessible):
+            run.roi_sums(descriptor_uid, "xs_channel2", [datum["datum_id"]], [(10, 15)])
@@ -5,6 +5,7 @@ import glob
 import numpy as np
 import os
 import pytz
+import queue
 import sys
 import threading
 import warnings
@@ -431,3 +432,53 @@ class LazyMap(collections.abc.Mapping):
     def __setstate__(self, mapping):
         self.__mapping = mapping
         self.__lock = threading.Lock()
+
+
+_READ_AHEAD_DONE = object()
+
+
+def _read_ahead(executor, items, max_items, cancelled):
+    """
+    Iterate items() in the executor, at most max_items ahead of the consumer.
+
+    Return a generator of the items, which re-raises any exception raised by
+    items(). The reader stops, and closes items(), once cancelled is set.
+    """
+    buffer = queue.Queue(maxsize=max_items)
+
+    def put(item):
+        # Block while the queue is full, but give up once cancelled.
+        while not cancelled.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        generator = None
+        try:
+            generator = iter(items())
+            for item in generator:
+                if not put(item):
+                    return
+        except Exception as err:
+            put(err)
+        else:
+            put(_READ_AHEAD_DONE)
+        finally:
+            if generator is not None and hasattr(generator, "close"):
+                generator.close()
+
+    def consume():
+        while True:
+            item = buffer.get()
+            if item is _READ_AHEAD_DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    executor.submit(produce)
+    return consume()
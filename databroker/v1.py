@@ -1,15 +1,23 @@
+import collections
 from collections import defaultdict
+import concurrent.futures
+import functools
 from datetime import datetime
+import numpy
 import pandas
+import xarray
 import re
 import warnings
 import time
 import humanize
+import itertools
 import jinja2
+import json
+import logging
 import os
+import threading
 from types import SimpleNamespace
 
-import xarray
 import event_model
 
 # Toolz and CyToolz have identical APIs -- same test suite, docstrings.
@@ -23,13 +31,22 @@ from tiled.client.utils import ClientError
 from tiled.queries import FullText, Key
 
 from bluesky_tiled_plugins.queries import TimeRange
-from .utils import ALL, get_fields, wrap_in_deprecated_doct
+from .assets.base_registry import _transfer_files
+from .utils import ALL, _read_ahead, get_fields, wrap_in_deprecated_doct
 
 
+logger = logging.getLogger(__name__)
+
 # The v2 API is expected to grow more options for filled than just True/False
 # (e.g. 'delayed') so it expects a string instead of a boolean.
 _FILL = {True: "yes", False: "no"}
 
+# The hashlib algorithm used to verify copied files, as in Registry.copy_files
+_VERIFY_ALGORITHM = "sha256"
+
+# Number of documents (or pages of them) to send per request in Broker.export
+EXPORT_BATCH_SIZE = 100
+
 
 def temp_config():
     raise NotImplementedError("Use temp() instead, which returns a v1.Broker.")
@@ -93,9 +110,44 @@ class Registry:
         file_rename_hook=None,
         run_start_uid=None,
     ):
-        raise NotImplementedError(
-            "The copy_files functionality is not supported via a client."
+        """
+        Copy the files of a Resource into new_root.
+
+        The file paths are listed by the server, so this process must be
+        able to read them at the same paths.
+
+        Parameters
+        ----------
+        resource : dict
+            Resource document
+        new_root : str
+            The new 'root' to copy the files into
+        verify : bool, optional
+            Check each copy against a checksum of its original, computed as
+            the original is read.
+        file_rename_hook : callable, optional
+            Called as ``hook(file_counter, total_number, old_name, new_name)``
+            as each file is copied.
+        run_start_uid : str
+            The uid of the run the Resource belongs to. Required.
+
+        Returns
+        -------
+        file_pairs : list
+            list of (old_file_path, new_file_path) pairs
+        """
+        if run_start_uid is None:
+            raise ValueError("run_start_uid is required to look up the files.")
+        file_list = self._catalog[run_start_uid].resource_files()[resource["uid"]]
+        file_pairs = _relocate_files(resource, file_list, new_root)
+        _transfer_files(
+            file_pairs,
+            1,
+            _VERIFY_ALGORITHM if verify else None,
+            False,
+            file_rename_hook or _no_file_rename_hook,
         )
+        return file_pairs
 
 
 def _no_aliases():
@@ -118,6 +170,16 @@ class Broker:
     def __init__(self, catalog):
         self._catalog = catalog
         self.prepare_hook = wrap_in_deprecated_doct
+        # If True, search results yield Headers built from only the RunStart
+        # document, which fetch the rest of the run on first use. The runs of
+        # up to header_prefetch Headers ahead of the one being used are
+        # fetched in the background (0 for none).
+        self.lazy_headers = False
+        self.header_prefetch = 10
+        # If set, the results of a search are reused for this many seconds,
+        # or until the number of runs changes.
+        self.search_cache_ttl = None
+        self._search_cache = _SearchCache()
         self.v2._Broker__v1 = self
         self._reg = Registry(catalog)
 
@@ -231,11 +293,28 @@ class Broker:
     def _patch_state(self, catalog):
         "Copy references to v1 state."
         catalog.v1.prepare_hook = self.prepare_hook
+        catalog.v1.lazy_headers = self.lazy_headers
+        catalog.v1.header_prefetch = self.header_prefetch
+        catalog.v1.search_cache_ttl = self.search_cache_ttl
 
     def __call__(self, text_search=None, **kwargs):
         results_catalog = self._catalog
         since = kwargs.pop("since", None) or kwargs.pop("start_time", None)
         until = kwargs.pop("until", None) or kwargs.pop("stop_time", None)
+        items = on_complete = None
+        if self.search_cache_ttl:
+            key = json.dumps(
+                [text_search, since, until, kwargs, self.lazy_headers],
+                sort_keys=True,
+                default=repr,
+            )
+            # A new RunStart changes the count of runs, which is cheap to get.
+            count = len(self._catalog)
+            items = self._search_cache.get(key, count)
+            if items is None:
+                on_complete = functools.partial(
+                    self._search_cache.put, key, count, self.search_cache_ttl
+                )
         if (since is not None) or (until is not None):
             results_catalog = results_catalog.search(
                 TimeRange(since=since, until=until)
@@ -247,7 +326,7 @@ class Broker:
         if text_search:
             results_catalog = results_catalog.search(FullText(text_search))
         self._patch_state(results_catalog)
-        return Results(results_catalog)
+        return Results(results_catalog, items=items, on_complete=on_complete)
 
     def __getitem__(self, key):
         result = self._catalog[key]
@@ -330,6 +409,8 @@ class Broker:
             per_desc_discards = {}
             per_desc_extra_data = {}
             per_desc_extra_ts = {}
+            # The Event fields that survive filtering, to be projected by the server
+            projected_fields = set()
             for d in descs:
                 (
                     all_extra_dk,
@@ -343,6 +424,8 @@ class Broker:
                 per_desc_discards[d["uid"]] = discard_fields
                 per_desc_extra_data[d["uid"]] = all_extra_data
                 per_desc_extra_ts[d["uid"]] = all_extra_ts
+                if stream_name is ALL or d.get("name", "primary") == stream_name:
+                    projected_fields.update(set(d["data_keys"]) - set(discard_fields))
 
                 d = d.copy()
                 dict.__setitem__(d, "data_keys", d["data_keys"].copy())
@@ -363,13 +446,21 @@ class Broker:
                 event_timestamps.update(per_desc_extra_ts[desc])
                 discard_fields = per_desc_discards[desc]
                 for field in discard_fields:
-                    del event_data[field]
-                    del event_timestamps[field]
+                    # The server may already have left these out.
+                    event_data.pop(field, None)
+                    event_timestamps.pop(field, None)
 
             get_documents_router = _GetDocumentsRouter(
                 self.prepare_hook, merge_config_into_event, stream_name=stream_name
             )
-            for name, doc in self._catalog[uid].documents(fill=fill):
+            # Let the server skip the streams and fields that would be
+            # discarded here anyway.
+            kwargs = {}
+            if stream_name is not ALL:
+                kwargs["stream_name"] = stream_name
+            if not no_fields_filter and projected_fields:
+                kwargs["fields"] = sorted(projected_fields)
+            for name, doc in self._catalog[uid].documents(fill=fill, **kwargs):
                 yield from get_documents_router(name, doc)
 
     def get_events(
@@ -448,6 +539,8 @@ class Broker:
         convert_times=True,
         timezone=None,
         localize_times=True,
+        max_workers=1,
+        multidim="object",
     ):
         """
         Load the data from one or more runs as a table (``pandas.DataFrame``).
@@ -506,9 +599,22 @@ class Broker:
 
             Defaults to True to preserve back-compatibility.
 
+        max_workers : int, optional
+            The number of runs to read concurrently. The rows are in the
+            order of ``headers`` regardless. Default is 1 (one at a time).
+
+        multidim : {'object', 'xarray'}, optional
+            How to return columns with more than one dimension, such as
+            spectra or images. With 'object' (the default) each such column
+            is an object column whose rows are views into one array per run.
+            With 'xarray' the whole table is returned as an
+            ``xarray.Dataset`` along the dimension 'seq_num', which keeps
+            these columns as N-dimensional arrays. Call ``to_dataframe()`` on
+            a selection of its 1-dimensional columns to get a DataFrame.
+
         Returns
         -------
-        table : pandas.DataFrame
+        table : pandas.DataFrame or xarray.Dataset
         """
 
         if handler_registry is not None:
@@ -518,55 +624,29 @@ class Broker:
                 "in a configuration file."
             )
 
+        if multidim not in ("object", "xarray"):
+            raise ValueError(
+                f"multidim must be 'object' or 'xarray', not {multidim!r}"
+            )
         headers = _ensure_list(headers)
         fields = set(fields or [])
-        dfs = []
-        for header in headers:
-            descriptors = [
-                d for d in header.descriptors if d.get("name") == stream_name
-            ]
-            data_keys = descriptors[0]["data_keys"]
-            if not fill:
-                external_fields = {k for k, v in data_keys.items() if v.get("external")}
-                requested_external = fields.intersection(external_fields)
-                if requested_external:
-                    raise ValueError(
-                        f"The fields {requested_external} are externally stored data "
-                        "and can only be requested with fill=True."
-                    )
-                applicable_fields = (fields or set(data_keys)) - external_fields
-            else:
-                applicable_fields = fields or set(data_keys)
-            applicable_fields.add("time")
-            run = self._catalog[header.start["uid"]]
-            dataset = run[stream_name].read(variables=(applicable_fields or None))
-            dataset.load()
-            dict_of_arrays = {}
-            for var_name in dataset:
-                column = dataset[var_name][:].data
-                if column.ndim > 1:
-                    column = list(column)  # data must be 1-dimensional
-                dict_of_arrays[var_name] = column
-            df = pandas.DataFrame(dict_of_arrays)
-            # if converting to datetime64 (in utc or 'local' tz)
-            times = dataset["time"][:].data
-            if convert_times or localize_times:
-                times = pandas.to_datetime(times, unit="s")
-            # make sure this is a series
-            times = pandas.Series(times, index=df.index)
-
-            # if localizing to 'local' time
-            if localize_times:
-                times = (
-                    times.dt.tz_localize("UTC")  # first make tz aware
-                    # .dt.tz_convert(timezone)  # convert to 'local'
-                    .dt.tz_localize(None)  # make naive again
-                )
 
-            df["time"] = times
-            dfs.append(df)
-        if dfs:
-            result = pandas.concat(dfs)
+        def read(header):
+            return self._read_columns(header, stream_name, fields, fill, multidim)
+
+        if max_workers > 1 and len(headers) > 1:
+            # executor.map yields results in the order of the headers.
+            with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+                parts = list(executor.map(read, headers))
+        else:
+            parts = [read(header) for header in headers]
+        if multidim == "xarray":
+            return _concat_datasets(parts, convert_times, localize_times)
+        if parts:
+            result = _concat_columns(parts)
+            result["time"] = _convert_times(
+                result["time"].values, convert_times, localize_times
+            )
         else:
             # edge case: no data
             result = pandas.DataFrame()
@@ -575,6 +655,45 @@ class Broker:
         result.index = 1 + result.index
         return result
 
+    def _read_columns(self, header, stream_name, fields, fill, multidim="object"):
+        """
+        Read one run's stream into a dict of columns.
+
+        Columns with more than one dimension are wrapped as 1-dimensional
+        object columns, unless multidim is 'xarray', in which case the
+        xarray.Dataset itself is returned.
+        """
+        descriptors = [
+            d for d in header.descriptors if d.get("name") == stream_name
+        ]
+        data_keys = descriptors[0]["data_keys"]
+        if not fill:
+            external_fields = {k for k, v in data_keys.items() if v.get("external")}
+            requested_external = fields.intersection(external_fields)
+            if requested_external:
+                raise ValueError(
+                    f"The fields {requested_external} are externally stored data "
+                    "and can only be requested with fill=True."
+                )
+            applicable_fields = (fields or set(data_keys)) - external_fields
+        else:
+            # Copy, because fields is shared by the threads reading each run.
+            applicable_fields = set(fields or data_keys)
+        applicable_fields.add("time")
+        run = self._catalog[header.start["uid"]]
+        dataset = run[stream_name].read(variables=(applicable_fields or None))
+        dataset.load()
+        if multidim == "xarray":
+            return dataset
+        dict_of_arrays = {}
+        for var_name in dataset:
+            column = dataset[var_name][:].data
+            if column.ndim > 1:
+                column = _object_column(column)  # data must be 1-dimensional
+            dict_of_arrays[var_name] = column
+        dict_of_arrays["time"] = dataset["time"][:].data
+        return dict_of_arrays
+
     def get_images(
         self,
         headers,
@@ -603,18 +722,17 @@ class Broker:
                 # do something
         """
         # Defer this import so that pims is an optional dependency.
-        from ._legacy_images import Images
+        from ._legacy_images import ChunkedImages
 
         headers = _ensure_list(headers)
-        datasets = [header.xarray_dask(stream_name=stream_name) for header in headers]
         if handler_registry is not None:
             raise NotImplementedError(
                 "The handler_registry parameter is no longer supported "
                 "and must be None."
             )
-        dataset = xarray.merge(datasets)
-        data_array = dataset[name]
-        return Images(data_array=data_array)
+        # Frames are fetched a chunk at a time when they are accessed.
+        arrays = [header.v2[stream_name]["data"][name] for header in headers]
+        return ChunkedImages(arrays)
 
     def restream(self, headers, fields=None, fill=False):
         """
@@ -692,7 +810,16 @@ class Broker:
         for name, doc in self.get_documents(headers, fields=fields, fill=fill):
             func(name, doc)
 
-    def export(self, headers, db, new_root=None, copy_kwargs=None):
+    def export(
+        self,
+        headers,
+        db,
+        new_root=None,
+        copy_kwargs=None,
+        *,
+        max_workers=4,
+        progress=None,
+    ):
         """
         Serialize a list of runs.
 
@@ -700,6 +827,10 @@ class Broker:
         this new location, and the corresponding resource document will be
         updated with the new_root.
 
+        If db is a tiled-backed Broker, Event and Datum pages are sent to it
+        intact, many documents per request. The files are copied by a pool of
+        threads while the documents are sent.
+
         Parameters
         ----------
         headers : databroker.header
@@ -711,8 +842,14 @@ class Broker:
             optional. root directory of files that are going to
             be exported
         copy_kwargs : dict or None
-            passed through to the ``copy_files`` method on Registry;
-            None by default
+            ``verify`` and ``file_rename_hook``, as accepted by the
+            ``copy_files`` method on Registry; None by default. Copies are
+            verified unless ``verify=False`` is given.
+        max_workers : int, optional
+            The number of files to copy concurrently. Default is 4.
+        progress : callable, optional
+            Called as ``progress(header_counter, total_number, uid)`` after
+            each run is exported.
 
         Returns
         ------
@@ -720,37 +857,68 @@ class Broker:
             list of (old_file_path, new_file_path) pairs generated by
             ``copy_files`` method on Registry.
         """
-        if copy_kwargs is None:
-            copy_kwargs = {}
+        copy_kwargs = dict(copy_kwargs or {})
+        copy_kwargs.pop("run_start_uid", None)
+        verify = copy_kwargs.pop("verify", True)
+        file_rename_hook = copy_kwargs.pop("file_rename_hook", None)
+        if copy_kwargs:
+            raise TypeError(f"Unexpected copy_kwargs {set(copy_kwargs)}")
 
-        if isinstance(headers, Header):
-            headers = [headers]
+        headers = _ensure_list(headers)
+        if isinstance(db, Broker):
+            insert = _BatchInserter(db.v2.post_documents, EXPORT_BATCH_SIZE)
+        else:
+            insert = _UnpackingInserter(db.insert)
 
         file_pairs = []
-
-        for header in headers:
-            for name, doc in self._catalog[header.start["uid"]].documents(fill=False):
-                if name == "event_page":
-                    for event in event_model.unpack_event_page(doc):
-                        db.insert("event", event)
-                elif name == "resource" and new_root:
-                    copy_kwargs.setdefault("run_start_uid", header.start["uid"])
-                    file_pairs.extend(self.reg.copy_files(doc, new_root, **copy_kwargs))
-                    new_resource = doc.to_dict()
-                    new_resource["root"] = new_root
-                    db.insert(name, new_resource)
-                else:
-                    db.insert(name, doc)
+        # One background job per run, which copies up to max_workers files at once
+        with concurrent.futures.ThreadPoolExecutor(1) as executor:
+            for i, header in enumerate(headers):
+                uid = header.start["uid"]
+                run = self._catalog[uid]
+                copying = None
+                if new_root:
+                    run_file_pairs = []
+                    for resource, files in run.resources_and_files():
+                        run_file_pairs.extend(
+                            _relocate_files(resource, files, new_root)
+                        )
+                    file_pairs.extend(run_file_pairs)
+                    # Copy the files while the documents are sent.
+                    copying = executor.submit(
+                        _transfer_files,
+                        run_file_pairs,
+                        max_workers,
+                        _VERIFY_ALGORITHM if verify else None,
+                        False,
+                        file_rename_hook or _no_file_rename_hook,
+                    )
+                for name, doc in run.documents(fill=False):
+                    if name == "resource" and new_root:
+                        doc = doc.to_dict()
+                        doc["root"] = new_root
+                    insert(name, doc)
+                insert.flush()
+                if copying is not None:
+                    copying.result()
+                if progress is not None:
+                    progress(i, len(headers), uid)
         return file_pairs
 
-    def export_size(self, headers):
+    def export_size(self, headers, *, max_workers=8):
         """
         Get the size of files associated with a list of headers.
 
+        The files are listed from the runs' Resources, without streaming
+        their Events. A file shared by several runs is counted once.
+
         Parameters
         ----------
         headers : :class:databroker.Header:
             one or more headers that are going to be exported
+        max_workers : int, optional
+            The number of requests and file system calls to make
+            concurrently. Default is 8.
 
         Returns
         -------
@@ -758,18 +926,23 @@ class Broker:
             total size of all the files associated with the ``headers`` in Gb
         """
         headers = _ensure_list(headers)
-        total_size = 0
-        for header in headers:
-            run = self._catalog[header.start["uid"]]
-            for name, doc in self._catalog[header.start["uid"]].documents(fill="no"):
-                if name == "resource":
-                    for filepath in run.get_file_list(doc):
-                        total_size += os.path.getsize(filepath)
+
+        def list_files(header):
+            resource_files = self._catalog[header.start["uid"]].resource_files()
+            return itertools.chain.from_iterable(resource_files.values())
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+            filepaths = set(
+                itertools.chain.from_iterable(executor.map(list_files, headers))
+            )
+            total_size = sum(executor.map(os.path.getsize, filepaths))
 
         return total_size * 1e-9
 
     def insert(self, name, doc):
         self.v2.post_document(name, doc)
+        if name == "start":
+            self._search_cache.clear()
 
     def fill_event(*args, **kwargs):
         raise NotImplementedError(
@@ -830,15 +1003,18 @@ class Header:
 
     @property
     def descriptors(self):
-        descriptors = []
-        for stream in self._run.values():
-            descriptors.extend(stream.descriptors)
         return sorted(
-            [self.db.prepare_hook("descriptor", doc) for doc in descriptors],
+            [self.db.prepare_hook("descriptor", doc) for doc in self._get_descriptors()],
             key=lambda d: d["time"],
             reverse=True,
         )
 
+    def _get_descriptors(self):
+        descriptors = []
+        for stream in self._run.values():
+            descriptors.extend(stream.descriptors)
+        return descriptors
+
     @property
     def stream_names(self):
         return list(self._run)
@@ -884,6 +1060,7 @@ class Header:
         timezone=None,
         convert_times=True,
         localize_times=True,
+        multidim="object",
     ):
         """
         Load the data from one event stream as a table (``pandas.DataFrame``).
@@ -936,9 +1113,14 @@ class Header:
 
             Defaults to True to preserve back-compatibility.
 
+        multidim : {'object', 'xarray'}, optional
+            With 'xarray', return an ``xarray.Dataset`` that keeps columns with
+            more than one dimension as N-dimensional arrays. See
+            :meth:`Broker.get_table`.
+
         Returns
         -------
-        table : pandas.DataFrame
+        table : pandas.DataFrame or xarray.Dataset
 
         Examples
         --------
@@ -969,6 +1151,7 @@ class Header:
             timezone=timezone,
             convert_times=convert_times,
             localize_times=localize_times,
+            multidim=multidim,
         )
 
     def documents(self, stream_name=ALL, fields=None, fill=False):
@@ -1004,10 +1187,13 @@ class Header:
         for payload in gen:
             yield payload
 
-    def data(self, field, stream_name="primary", fill=True):
+    def data(self, field, stream_name="primary", fill=True, read_ahead=False):
         """
         Extract data for one field. This is convenient for loading image data.
 
+        The data is downloaded one chunk at a time, so only one chunk (two,
+        with ``read_ahead``) is held in memory at once.
+
         Parameters
         ----------
         field : string
@@ -1019,14 +1205,38 @@ class Header:
         fill : bool, optional
              If the data should be filled.
 
+        read_ahead : bool, optional
+            If True, download the next chunk in a background thread while
+            the current one is being consumed. Default is False.
+
         Yields
         ------
         data
         """
         if not fill:
             raise ValueError("Only fill=True is now supported by the data(...) method.")
-        for item in self._run[stream_name]["data"][field][:]:
-            yield item
+        array = self._run[stream_name]["data"][field]
+        # Rows are chunked along the first dimension; any chunking along
+        # the other dimensions is reassembled by the server.
+        bounds = [0, *itertools.accumulate(array.chunks[0])]
+        slices = [
+            slice(start, stop)
+            for start, stop in zip(bounds[:-1], bounds[1:])
+            if stop > start
+        ]
+        if not read_ahead:
+            for slice_ in slices:
+                yield from array[slice_]
+            return
+        if not slices:
+            return
+        with concurrent.futures.ThreadPoolExecutor(1) as executor:
+            future = executor.submit(array.__getitem__, slices[0])
+            for next_slice in slices[1:]:
+                chunk = future.result()
+                future = executor.submit(array.__getitem__, next_slice)
+                yield from chunk
+            yield from future.result()
 
     def stream(self, *args, **kwargs):
         warnings.warn(
@@ -1221,16 +1431,141 @@ class Results:
     ----------
     catalog : Catalog
         search results
+    items : list, optional
+        The runs (or, for lazy Headers, RunStart documents) of a previous
+        iteration over the same search, to be used instead of the catalog
+    on_complete : callable, optional
+        Called with the list of runs (or RunStart documents) once they
+        have all been iterated over
     """
 
-    def __init__(self, catalog):
+    def __init__(self, catalog, items=None, on_complete=None):
         self._catalog = catalog
         self._broker = Broker(catalog)
         self._broker.v1.prepare_hook = catalog.v1.prepare_hook
+        self._lazy = catalog.v1.lazy_headers
+        self._prefetch = catalog.v1.header_prefetch
+        self._items = items
+        self._on_complete = on_complete
+
+    def _iter_items(self, items):
+        if self._items is not None:
+            yield from self._items
+            return
+        seen = []
+        for item in items:
+            seen.append(item)
+            yield item
+        if self._on_complete is not None:
+            self._on_complete(seen)
 
     def __iter__(self):
-        for uid, run in self._catalog.items():
-            yield Header(run, self._broker)
+        if not self._lazy:
+            for run in self._iter_items(run for _, run in self._catalog.items()):
+                yield Header(run, self._broker)
+            return
+        starts = self._iter_items(self._catalog.start_documents())
+        if self._prefetch <= 0:
+            for start in starts:
+                yield _LazyHeader(start, self._catalog, self._broker)
+            return
+        # Yield each Header as soon as its RunStart arrives. A thread lists
+        # the RunStarts ahead of the consumer, and the runs of the next few
+        # are fetched in the background.
+        executor = concurrent.futures.ThreadPoolExecutor(
+            self._prefetch + 1, thread_name_prefix="databroker-prefetch"
+        )
+        cancelled = threading.Event()
+
+        def headers():
+            for start in starts:
+                header = _LazyHeader(start, self._catalog, self._broker)
+                executor.submit(header._prefetch).add_done_callback(
+                    functools.partial(_log_prefetch_error, header.uid)
+                )
+                yield header
+
+        try:
+            yield from _read_ahead(executor, headers, self._prefetch, cancelled)
+        finally:
+            cancelled.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _log_prefetch_error(uid, future):
+    # The Header fetches its run again on use, raising the error then.
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning(
+            "Failed to prefetch run %s", uid, exc_info=future.exception()
+        )
+
+
+class _SearchCache:
+    "Results of searches, keyed by their normalized query."
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, count):
+        "Return the cached items, if they are fresh and the count is unchanged."
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            deadline, cached_count, items = entry
+            if time.monotonic() < deadline and cached_count == count:
+                return items
+            del self._entries[key]
+            return None
+
+    def put(self, key, count, ttl, items):
+        with self._lock:
+            # Drop stale entries so that the cache does not grow unboundedly.
+            now = time.monotonic()
+            self._entries = {
+                k: v for k, v in self._entries.items() if v[0] > now
+            }
+            self._entries[key] = (now + ttl, count, items)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class _LazyHeader(Header):
+    """
+    A Header made from only a RunStart document.
+
+    The run, with its RunStop and descriptors, is fetched on first use.
+    """
+
+    def __init__(self, start, catalog, db):
+        self.db = db
+        self._catalog = catalog
+        self._start = start
+        self._stop = None
+        self._lazy_run = None
+        self._descriptors = None
+        self._lock = threading.RLock()
+        self.ext = SimpleNamespace()  # not implemented
+
+    @property
+    def _run(self):
+        with self._lock:
+            if self._lazy_run is None:
+                self._lazy_run = self._catalog[self._start["uid"]]
+            return self._lazy_run
+
+    def _get_descriptors(self):
+        with self._lock:
+            if self._descriptors is None:
+                self._descriptors = super()._get_descriptors()
+            return self._descriptors
+
+    def _prefetch(self):
+        self._stop = self._run.metadata["stop"] or {}
+        self._get_descriptors()
 
 
 def _ensure_list(headers):
@@ -1242,6 +1577,151 @@ def _ensure_list(headers):
         return [headers]
 
 
+def _object_column(array):
+    "Wrap each row of an N-dimensional array in a 1-dimensional object array."
+    column = numpy.empty(len(array), dtype=object)
+    for i, row in enumerate(array):
+        column[i] = row
+    return column
+
+
+def _convert_times(times, convert_times, localize_times):
+    "Convert an array of float timestamps in one vectorized pass."
+    if not (convert_times or localize_times):
+        return times
+    # if converting to datetime64 (in utc or 'local' tz)
+    times = pandas.to_datetime(times, unit="s")
+    # if localizing to 'local' time
+    if localize_times:
+        times = (
+            times.tz_localize("UTC")  # first make tz aware
+            # .tz_convert(timezone)  # convert to 'local'
+            .tz_localize(None)  # make naive again
+        )
+    return times.values
+
+
+def _concat_datasets(parts, convert_times, localize_times):
+    """
+    Concatenate runs' Datasets along 'seq_num', allocating each variable once.
+
+    seq_num restarts at 1 for each run, as in the DataFrame from get_table.
+    """
+    datasets = []
+    for dataset in parts:
+        # Index by seq_num, keeping time as a coordinate along it.
+        times = dataset["time"].values
+        dataset = dataset.drop_vars("time").rename_dims({"time": "seq_num"})
+        datasets.append(
+            dataset.assign_coords(
+                seq_num=1 + numpy.arange(len(times)), time=("seq_num", times)
+            )
+        )
+    if not datasets:
+        # edge case: no data
+        return xarray.Dataset()
+    if len(datasets) == 1:
+        (result,) = datasets
+    else:
+        result = xarray.concat(datasets, dim="seq_num", data_vars="all")
+    return result.assign_coords(
+        time=(
+            "seq_num",
+            _convert_times(result["time"].values, convert_times, localize_times),
+        )
+    )
+
+
+def _concat_columns(parts):
+    """
+    Concatenate dicts of columns into one DataFrame, allocating each column once.
+
+    Each part is indexed from 0, as pandas.concat would do with their
+    DataFrames.
+    """
+    index = numpy.concatenate(
+        [numpy.arange(len(part["time"])) for part in parts]
+    )
+    keys = list(parts[0])
+    if any(list(part) != keys for part in parts[1:]) or any(
+        len({part[key].dtype.kind for part in parts}) > 1 for key in keys
+    ):
+        # The runs do not share the same columns and kinds of data.
+        # Let pandas align them and reconcile their types.
+        return pandas.concat(
+            [pandas.DataFrame(part, index=numpy.arange(len(part["time"]))) for part in parts]
+        )
+    return pandas.DataFrame(
+        {key: numpy.concatenate([part[key] for part in parts]) for key in keys},
+        index=index,
+    )
+
+
+def _relocate_files(resource, file_list, new_root):
+    "Pair each file of a Resource with its path under new_root."
+    old_root = resource.get("root")
+    if not old_root:
+        warnings.warn(
+            "There is no 'root' in this resource which "
+            "is required to be able to change the root. "
+            "For now assuming '/' as root"
+        )
+        old_root = os.path.sep
+    for f in file_list:
+        if not f.startswith(old_root):
+            raise RuntimeError(
+                "something is very wrong, the files "
+                "do not all share the same root, ABORT"
+            )
+    return [(f, os.path.join(new_root, os.path.relpath(f, old_root))) for f in file_list]
+
+
+def _no_file_rename_hook(file_counter, total_number, old_name, new_name):
+    pass
+
+
+class _BatchInserter:
+    "Buffer (name, doc) pairs and post them in batches, raising on any error."
+
+    def __init__(self, post_documents, size):
+        self._post_documents = post_documents
+        self._size = size
+        self._buffer = []
+
+    def __call__(self, name, doc):
+        self._buffer.append((name, doc))
+        if len(self._buffer) >= self._size:
+            self.flush()
+
+    def flush(self):
+        buffer, self._buffer = self._buffer, []
+        errors = self._post_documents(buffer)
+        if errors:
+            raise ValueError(
+                f"{len(errors)} documents could not be exported: {errors}"
+            )
+
+
+class _UnpackingInserter:
+    "Insert (name, doc) pairs one at a time, unpacking pages."
+
+    def __init__(self, insert):
+        self._insert = insert
+
+    def __call__(self, name, doc):
+        if name == "event_page":
+            for event in event_model.unpack_event_page(doc):
+                self._insert("event", event)
+        elif name == "datum_page":
+            for datum in event_model.unpack_datum_page(doc):
+                self._insert("datum", datum)
+        else:
+            self._insert(name, doc)
+
+    def flush(self):
+        pass
+
+
 def _compile_re(fields=[]):
     """
     Return a regular expression object based on a list of regular expressions.
@@ -0,0 +1,66 @@
+#! /usr/bin/env python
+"""
+Compare serial and threaded decoding of TIFF files by AreaDetectorTiffHandler.
+
+Writes synthetic, compressed TIFF files to a temporary directory and times
+reading one datum of ``--frames`` frames with each number of decode workers.
+
+    python scripts/benchmark_decoding.py --frames 200 --workers 1 2 4 8
+"""
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import tifffile
+
+from databroker.assets.handlers import AreaDetectorTiffHandler
+
+TEMPLATE = '%s%s_%05d.tiff'
+
+
+def write_frames(path, num_frames, shape, compression):
+    rng = np.random.default_rng(0)
+    # Smooth data with noise compresses like a real detector image.
+    base = np.add.outer(np.arange(shape[0]), np.arange(shape[1])) % 1000
+    for j in range(num_frames):
+        frame = (base + rng.integers(0, 50, shape)).astype(np.uint16)
+        tifffile.imwrite(TEMPLATE % (path, 'bench', j), frame,
+                         compression=compression)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--shape', type=int, nargs=2, default=(1024, 1024))
+    parser.add_argument('--compression', default='zlib')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    path = tempfile.mkdtemp() + '/'
+    try:
+        write_frames(path, args.frames, tuple(args.shape), args.compression)
+        expected = None
+        for workers in args.workers:
+            handler = AreaDetectorTiffHandler(
+                path, TEMPLATE, 'bench', frame_per_point=args.frames,
+                decode_workers=workers)
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                data = handler(0)
+                timings.append(time.perf_counter() - start)
+            if expected is None:
+                expected = data
+            assert np.array_equal(data, expected)
+            best = min(timings)
+            print('{:>3} workers: {:7.3f} s  ({:6.1f} frames/s)'.format(
+                workers, best, args.frames / best))
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == '__main__':
+    main()
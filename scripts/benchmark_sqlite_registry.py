@@ -0,0 +1,74 @@
+#! /usr/bin/env python
+"""
+Compare concurrent retrieve throughput of the SQLite registry with and without WAL.
+
+Registers ``--datums`` datums, each in its own Resource so that every retrieve
+queries the database, and times retrieving all of them from ``--threads``
+threads, first with the single connection thread and then in WAL mode.
+
+    python scripts/benchmark_sqlite_registry.py --datums 2000 --threads 1 4 8
+"""
+import argparse
+import concurrent.futures
+import shutil
+import tempfile
+import time
+
+from databroker.assets.handlers_base import HandlerBase
+from databroker.assets.sqlite import Registry
+
+
+class EchoHandler(HandlerBase):
+    "Return the datum kwarg, so that the time is spent in the registry."
+    def __init__(self, fpath):
+        pass
+
+    def __call__(self, n):
+        return n
+
+
+def make_registry(path, wal, num_datums):
+    fs = Registry({'dbpath': path, 'wal': wal})
+    fs.register_handler('echo', EchoHandler)
+    datum_ids = []
+    for n in range(num_datums):
+        res = fs.register_resource('echo', '', '', {})
+        datum_ids.append(fs.register_datum(res, {'n': n}))
+    return fs, datum_ids
+
+
+def time_retrieve(path, wal, num_datums, threads):
+    fs, datum_ids = make_registry(path, wal, num_datums)
+    # A fresh Registry, so that no datum or Resource is cached.
+    fs = Registry({'dbpath': path, 'wal': wal})
+    fs.register_handler('echo', EchoHandler)
+    with concurrent.futures.ThreadPoolExecutor(threads) as executor:
+        start = time.perf_counter()
+        values = list(executor.map(fs.retrieve, datum_ids))
+        duration = time.perf_counter() - start
+    assert values == list(range(num_datums))
+    fs.disconnect()
+    return duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--datums', type=int, default=2000)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 8])
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    try:
+        for threads in args.threads:
+            for wal in (False, True):
+                path = '{}/{}-{}.sqlite'.format(tmp, threads, wal)
+                duration = time_retrieve(path, wal, args.datums, threads)
+                print('{:>3} threads, wal={!s:<5}: {:7.3f} s  '
+                      '({:7.1f} retrieves/s)'.format(
+                          threads, wal, duration, args.datums / duration))
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    main()